@@ -1,10 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import math
 import os
+import queue
 import sys
+import threading
+import time
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 # Adiciona o diretório raiz ao path
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -13,6 +19,20 @@ if ROOT_DIR not in sys.path:
     
 from scripts.milvus_db import ZillizClient
 import src.groq_proxy as groq
+from src.admission import AdmissionController, Rejected
+from src.dim_reduction import FULL_VECTOR_FIELD, load_reducer, rescore
+from src import fast_json
+from src.embedding import EMBEDDING_DIM, LazyEmbedder
+from src.health import HealthMonitor
+from src.ingestion import DeltaSegment, IngestionService
+from src.logger import get_logger
+from src.prefetch import Prefetcher
+from src.profiling import ProfileStore, QueryProfiler
+from src.retrieval_cache import RetrievalCache
+from src.sharding import RemoteShard, ShardedRetriever
+from src.tracing import get_tracer
+
+logger = get_logger("app")
 
 # Carregue as variáveis de ambiente
 load_dotenv()
@@ -25,6 +45,11 @@ app = FastAPI(
 
 class QueryRequest(BaseModel):
     question: str
+    session_id: Optional[str] = None  # liga o /query aos /prefetch da mesma sessão (métrica de uso)
+
+class PrefetchRequest(BaseModel):
+    question: str  # pergunta parcial
+    session_id: str
 
 class QueryResponse(BaseModel):
     response: str
@@ -34,10 +59,52 @@ class QueryResponse(BaseModel):
 
 class RAGSystem:
     def __init__(self):
-        # Modelo síncrono de embeddings
-        self.embedding_model = SentenceTransformer("Snowflake/snowflake-arctic-embed-s")
+        # Modelo de embeddings carregado sob demanda (ONNX int8 > ONNX > torch, ver src/embedding.py)
+        self.embedding_model = LazyEmbedder()
+        # Coleção ingerida com dimensão reduzida: as queries recebem a mesma projeção
+        projection_path = os.getenv("EMBEDDING_PROJECTION")
+        self.query_reducer = load_reducer(projection_path) if projection_path else None
+        # A busca é pelos vetores reduzidos: top_k * oversample candidatos são reordenados
+        # pelo vetor cheio guardado em cada entidade (src/dim_reduction.py); 0 desliga
+        self.rescore_oversample = int(os.getenv("EMBEDDING_RESCORE_OVERSAMPLE", "4"))
+        if self.query_reducer is not None and self.rescore_oversample < 1:
+            logger.warning("EMBEDDING_PROJECTION without rescoring (EMBEDDING_RESCORE_OVERSAMPLE=0): "
+                           "search runs only in the reduced space and loses recall")
         self.groq_client = groq.GroqProxyRestAPI()
         self.milvus_client = self._initialize_milvus_client()
+        # SHARDS definido: busca em vários shards (locais/remotos) em vez da coleção única
+        self.retriever = ShardedRetriever.from_env(self.milvus_client)
+        self.top_k = int(os.getenv("RETRIEVAL_TOP_K", "1"))
+        # Perguntas repetidas reaproveitam o top-k (textos + ids) sem ir ao Zilliz
+        self.retrieval_cache = RetrievalCache.from_env()
+        self.prefetch_candidates = int(os.getenv("PREFETCH_CANDIDATES", "10"))
+        # Chave primária da coleção (a de prepare_data.py); hits e gets do Zilliz vêm com ela, não com "id"
+        self.primary_field = os.getenv("INGEST_PRIMARY_FIELD", "primary_key")
+        # INGEST_ENABLED: POST /ingest grava num segmento delta buscado junto com o índice principal
+        self.ingestion = None
+        if os.getenv("INGEST_ENABLED", "false").lower() == "true":
+            self._initialize_ingestion()
+
+    def _initialize_ingestion(self):
+        """Delta em memória como shard extra do retriever; a compactação grava no índice principal"""
+        main = self.retriever
+        if main is None:
+            # Coleção única: sem prazo de shard (só o timeout/retries do ZillizClient), como antes do delta;
+            # SHARD_TIMEOUT_MS descartaria a coleção inteira e a query ficaria só com o delta.
+            # Os hits vêm com a chave primária do schema (primary_key no prepare_data.py), não com "id"
+            main = ShardedRetriever({"main": RemoteShard(self.milvus_client, os.getenv("collection_name"))},
+                                    timeout=None, primary_field=self.primary_field)
+
+            def compactor(entities):
+                self.milvus_client.insert_vectors(os.getenv("collection_name"), entities)
+        else:
+            compactor = main.insert
+        delta = DeltaSegment(self.query_reducer.dim if self.query_reducer is not None else EMBEDDING_DIM)
+        self.retriever = ShardedRetriever(dict(main.shards, delta=delta), main.router, main.timeout,
+                                          main.primary_field, main.vector_field, delta_shards=["delta"])
+        self.ingestion = IngestionService.from_env(self.embedding_model, delta, compactor,
+                                                   reducer=self.query_reducer, primary_field=main.primary_field,
+                                                   on_change=self.retrieval_cache.bump if self.retrieval_cache else None)
 
     def _initialize_milvus_client(self) -> ZillizClient:
         """Initialize and return Milvus/Zilliz client"""
@@ -47,41 +114,62 @@ class RAGSystem:
         if not ZILLIZ_API_KEY or not ZILLIZ_CLUSTER_ID:
             raise RuntimeError("Milvus/Zilliz credentials not configured")
             
+        # Réplica local opcional (ex.: Milvus do docker-compose) usada quando o cluster cai
+        MILVUS_LOCAL_URL = os.getenv("MILVUS_LOCAL_URL")
+        fallback_client = None
+        if MILVUS_LOCAL_URL:
+            fallback_client = ZillizClient(
+                api_key=os.getenv("MILVUS_LOCAL_TOKEN", "root:Milvus"),
+                cluster_id=None,
+                base_url=MILVUS_LOCAL_URL,
+                hedge=False
+            )
+
         return ZillizClient(
             api_key=ZILLIZ_API_KEY,
-            cluster_id=ZILLIZ_CLUSTER_ID
+            cluster_id=ZILLIZ_CLUSTER_ID,
+            base_url=os.getenv("ZILLIZ_BASE_URL"),  # ex.: stub local (scripts/stub_servers.py)
+            max_retries=int(os.getenv("ZILLIZ_MAX_RETRIES", "2")),
+            hedge=os.getenv("ZILLIZ_HEDGE", "true").lower() == "true",
+            hedge_workers=int(os.getenv("ZILLIZ_HEDGE_WORKERS", "32")),
+            fallback_client=fallback_client
         )
 
     def generate_embedding(self, text: str) -> List[float]:
         """Generate normalized embeddings for input text (synchronous)"""
-        return self.embedding_model.encode([text], normalize_embeddings=True)[0].tolist()
+        return self.embedding_model.encode([text])[0].tolist()
+
+    def _query_vector(self, text: str) -> Tuple[List[float], Optional[np.ndarray]]:
+        """Vetor de busca (reduzido, com projeção) e o vetor cheio para o rescoring (None se não houver)."""
+        embedding = self.embedding_model.encode([text])[0]
+        if self.query_reducer is None:
+            return embedding.tolist(), None
+        full = embedding if self.rescore_oversample >= 1 else None
+        return self.query_reducer.transform(embedding)[0].tolist(), full
+
+    def _candidates(self, k: int, full_vector) -> int:
+        return k * self.rescore_oversample if full_vector is not None else k
 
     def process_query(self, question: str) -> Dict:
         try:
-            question_embedding = self.generate_embedding(question)
+            question_embedding, full_embedding = self._query_vector(question)
             
-            search_results = self.milvus_client.search_vectors(
-                collection_name=os.getenv("collection_name"),
-                vector=question_embedding
-            )
-            
-            if not search_results or not search_results.get("data"):
-                return {
-                    "response": "No relevant information found.",
-                    "context": [],
-                    "source_ids": [],
-                    "success": False
-                }
+            cache_key = generation = None
+            if self.retrieval_cache is not None:
+                cache_key = self.retrieval_cache.key(question_embedding, self.top_k)
+                generation = self.retrieval_cache.generation  # lida antes do índice (ver src/retrieval_cache.py)
+                cached = self.retrieval_cache.get(cache_key)
+                if cached is not None:
+                    return self._answer(question, cached.context, cached.source_ids)
 
-            # Conversão crucial dos IDs para string
-            relevant_ids = [str(hit["id"]) for hit in search_results["data"]]
-            
-            entities_data = self.milvus_client.get_entities_by_ids(
-                collection_name=os.getenv("collection_name"),
-                ids=relevant_ids
-            )
+            relevant_ids, texts, degraded = self._search_texts(question_embedding, self.top_k, full_embedding)
+            if not relevant_ids:
+                message = "No relevant information found." if not degraded else \
+                    f"No relevant information found (unavailable shards: {', '.join(degraded)})."
+                return {"response": message, "context": [], "source_ids": [], "success": False}
 
-            if not entities_data or not entities_data.get("data"):
+            source_ids = [id_ for id_ in relevant_ids if id_ in texts]
+            if not source_ids:
                 return {
                     "response": "Could not retrieve document contents.",
                     "context": [],
@@ -89,20 +177,14 @@ class RAGSystem:
                     "success": False
                 }
 
-            context = [entity["text"] for entity in entities_data["data"]]
-            llm_answer = self.groq_client.generate_response(
-                context=context, 
-                question=question
-            )
-            
-            return {
-                "response": llm_answer,
-                "context": context,
-                "source_ids": relevant_ids,  # Já convertidos
-                "success": True
-            }
+            context = [texts[id_] for id_ in source_ids]
+            # Resultado parcial (shard degradado ou texto faltando) não vai para o cache
+            if cache_key is not None and not degraded and len(source_ids) == len(relevant_ids):
+                self.retrieval_cache.put(cache_key, context, source_ids, generation)
+            return self._answer(question, context, source_ids)
 
         except Exception as e:
+            logger.exception("process_query failed")
             return {
                 "response": f"Error: {str(e)}",
                 "context": [],
@@ -110,43 +192,335 @@ class RAGSystem:
                 "success": False
             }
 
+    def _search_texts(self, vector, k: int, full=None) -> Tuple[List[str], Dict[str, str], List[str]]:
+        """
+        Top-k do índice: ids (formato de source_ids), textos por id e shards degradados.
+        Com `full` (vetor cheio da query) os candidatos são reordenados antes do get.
+        Textos já em cache (aquecidos pelo /prefetch) não passam pelo get por ids.
+        """
+        candidates = self._candidates(k, full)
+        if self.retriever is not None:
+            # Fan-out nos shards; shards lentos ou fora do ar só reduzem o contexto
+            result = self.retriever.search(vector, k=k, full=full, candidates=candidates)
+            ids = [f"{hit.shard}:{hit.id}" for hit in result.hits]
+            texts = self.retrieval_cache.get_chunks(ids) if self.retrieval_cache is not None else {}
+            missing = [hit for hit, id_ in zip(result.hits, ids) if id_ not in texts]
+            if missing:
+                texts.update((f"{entity['shard']}:{entity['id']}", entity["text"])
+                             for entity in self.retriever.fetch(missing))
+            return ids, texts, result.degraded
+
+        search_results = self.milvus_client.search_vectors(
+            collection_name=os.getenv("collection_name"),
+            vector=vector,
+            limit=candidates,
+            output_fields=[FULL_VECTOR_FIELD] if full is not None else None
+        )
+        hits = (search_results or {}).get("data") or []
+        # Conversão crucial dos IDs para string (mesmo fallback para "id" do RemoteShard)
+        ids = [str(hit.get(self.primary_field, hit.get("id"))) for hit in hits]
+        if full is not None:
+            ids = [id_ for id_, _ in rescore(full, [(id_, float(hit["distance"]), hit.get(FULL_VECTOR_FIELD))
+                                                    for id_, hit in zip(ids, hits)], k)]
+        texts = self.retrieval_cache.get_chunks(ids) if self.retrieval_cache is not None else {}
+        missing = [id_ for id_ in ids if id_ not in texts]
+        if missing:
+            entities_data = self.milvus_client.get_entities_by_ids(
+                collection_name=os.getenv("collection_name"),
+                ids=missing
+            )
+            texts.update((str(entity.get(self.primary_field, entity.get("id"))), entity.get("text", ""))
+                         for entity in (entities_data or {}).get("data") or [])
+        return ids, texts, []
+
+    def prefetch(self, prefix: str) -> List[str]:
+        """Retrieval especulativo de um prefixo (src/prefetch.py): aquece o cache e devolve os candidatos"""
+        vector, full = self._query_vector(prefix)
+        generation = self.retrieval_cache.generation
+        ids, texts, degraded = self._search_texts(vector, max(self.prefetch_candidates, self.top_k), full)
+        self.retrieval_cache.put_chunks(texts, generation)
+        # ids já vêm na ordem final; com rescoring, de um conjunto de candidatos maior que o do /query
+        top = ids[:self.top_k]
+        if not degraded and all(id_ in texts for id_ in top):
+            # Pergunta final igual ao prefixo: retrieval inteiro do cache
+            self.retrieval_cache.put(self.retrieval_cache.key(vector, self.top_k), [texts[id_] for id_ in top], top,
+                                     generation)
+        return ids
+
+    def _answer(self, question: str, context: List[str], source_ids: List[str]) -> Dict:
+        return {
+            "response": self.groq_client.generate_response(context=context, question=question),
+            "context": context,
+            "source_ids": source_ids,
+            "success": True,
+        }
+
 # Initialize the RAG system at startup
 rag_system = RAGSystem()
 
+def _embedding_probe():
+    if not rag_system.embedding_model.loaded:
+        raise RuntimeError("embedding model not loaded yet")
+
+probe_timeout = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+health_monitor = HealthMonitor(
+    interval=float(os.getenv("HEALTH_PROBE_INTERVAL", "10")),
+    timeout=probe_timeout
+)
+health_monitor.register("milvus", lambda: rag_system.milvus_client.ping(timeout=probe_timeout))
+health_monitor.register("llm", lambda: rag_system.groq_client.ping(timeout=probe_timeout))
+# Com EMBEDDING_WARMUP=off o modelo só carrega no primeiro /query; se o probe fosse
+# crítico o pod nunca ficaria ready e esse primeiro /query nunca chegaria
+embedding_warmup = os.getenv("EMBEDDING_WARMUP", "background")
+health_monitor.register("embedding", _embedding_probe, critical=embedding_warmup != "off")
+
+profile_store = ProfileStore.from_env()
+query_profiler = QueryProfiler.from_env(profile_store)
+# /prefetch aquece o cache de retrieval; sem cache não há o que aquecer
+prefetcher = Prefetcher.from_env(rag_system.prefetch) if rag_system.retrieval_cache is not None else None
+
+# Fila com prioridade e prazo na frente do /query (opt-in: None sem ADMISSION_ENABLED=true)
+admission = AdmissionController.from_env()
+
 @app.post("/query", response_model=QueryResponse)
-def query_document(request: QueryRequest):
+async def query_document(request: QueryRequest, http_request: Request, response: Response,
+                         x_priority: str = Header("interactive"), x_deadline_ms: Optional[float] = Header(None)):
     """
-    Synchronous endpoint to query the Dr. Voss diary documents
+    Endpoint to query the Dr. Voss diary documents
     
     Parameters:
     - question: The question about Veridia's world
+    - X-Priority header: "interactive" (default) or "batch" (evals, bulk jobs);
+      interactive requests are admitted first and batch never takes every slot
+    - X-Deadline-Ms header: time budget in milliseconds (default per priority)
     
     Returns:
     - response: Generated answer
     - context: Relevant chunks used
     - source_ids: IDs of source documents
     - success: Whether the operation succeeded
-    """
-    result = rag_system.process_query(request.question)
-    
-    if not result["success"]:
-        raise HTTPException(
-            status_code=404,
-            detail=result["response"]
-        )
     
+    503 with Retry-After when the priority's queue is full or the deadline
+    cannot be met (already passed, expected wait too long, or expired in the queue).
+    """
+    if admission is None:
+        return await run_in_threadpool(_query_document, request, http_request, response, {})
+    if x_priority not in admission.lanes:
+        raise HTTPException(status_code=400, detail=f"X-Priority must be one of {list(admission.lanes)}")
+    arrived = time.monotonic()
+    try:
+        async with admission.admit(x_priority, admission.deadline(x_priority, x_deadline_ms, arrived)):
+            attributes = {"admission.lane": x_priority,
+                          "admission.wait_ms": round((time.monotonic() - arrived) * 1000, 3)}
+            return await run_in_threadpool(_query_document, request, http_request, response, attributes)
+    except Rejected as e:
+        detail = "Query queue is full" if e.reason == "queue_full" else "Deadline cannot be met"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(e.retry_after)})
+
+def _query_document(request: QueryRequest, http_request: Request, response: Response, attributes: Dict) -> Dict:
+    # Trace amostrado (TRACE_SAMPLE_RATE) ou continuado do header traceparent recebido
+    with get_tracer().start_trace("POST /query", http_request.headers.get("traceparent"),
+                                  **{"http.route": "/query", "question.chars": len(request.question)},
+                                  **attributes) as trace:
+        # cProfile opt-in: header X-Profile (= ADMIN_TOKEN; ignorado sem ele) ou PROFILE_SAMPLE_RATE
+        with query_profiler.maybe_profile(http_request.headers.get("X-Profile"), "process_query",
+                                          trace_id=trace.trace_id) as profile:
+            result = rag_system.process_query(request.question)
+        if profile.id:
+            response.headers["X-Profile-Id"] = profile.id
+        if prefetcher is not None and request.session_id:
+            trace.set_attribute("prefetch.used", prefetcher.record_query(request.session_id, result["source_ids"]))
+        trace.set_attribute("rag.success", result["success"])
+        trace.set_attribute("rag.context_chunks", len(result["context"]))
+        if trace.traceparent:
+            response.headers["traceparent"] = trace.traceparent
+
+        if not result["success"]:
+            raise HTTPException(
+                status_code=404,
+                detail=result["response"],
+                headers=dict(response.headers)  # traceparent / X-Profile-Id também no erro
+            )
+
     return result
 
+@app.post("/prefetch", status_code=202)
+def prefetch_partial_question(request: PrefetchRequest):
+    """
+    Speculative retrieval for a partial question while the user types. Returns
+    at once; the latest prefix per session is embedded and searched in the
+    background, warming the retrieval cache for the final /query (send the same
+    session_id there). 429 with Retry-After when the session's or the global
+    budget is spent.
+    """
+    if prefetcher is None:
+        raise HTTPException(status_code=404, detail="Prefetch is disabled (PREFETCH_ENABLED, RETRIEVAL_CACHE_MB)")
+    status = prefetcher.submit(request.session_id, request.question)
+    if status == "over_budget":
+        raise HTTPException(status_code=429, detail="Prefetch budget exceeded for this session",
+                            headers={"Retry-After": str(math.ceil(prefetcher.period / prefetcher.max_per_session))})
+    if status == "over_global_budget":
+        raise HTTPException(status_code=429, detail="Prefetch budget exceeded",
+                            headers={"Retry-After": str(math.ceil(prefetcher.period / prefetcher.max_total))})
+    return {"status": status}
+
+@app.get("/metrics")
+def metrics():
+    """Client-side counters: Zilliz retries/hedging/circuit state, Groq rate limiting and tracing"""
+    return {
+        "milvus": rag_system.milvus_client.get_metrics(),
+        "embedding": rag_system.embedding_model.get_stats(),
+        "llm": dict(rag_system.groq_client.rate_limiter.stats,
+                    concurrency_limit=rag_system.groq_client.rate_limiter.concurrency.limit),
+        "tracing": dict(get_tracer().stats, sample_rate=get_tracer().sample_rate),
+        "shards": rag_system.retriever.get_stats() if rag_system.retriever else None,
+        "ingestion": rag_system.ingestion.get_stats() if rag_system.ingestion else None,
+        "retrieval_cache": rag_system.retrieval_cache.get_stats() if rag_system.retrieval_cache else None,
+        "prefetch": prefetcher.get_stats() if prefetcher else None,
+        "admission": admission.get_stats() if admission else None
+    }
+
+def _get_ingestion() -> IngestionService:
+    if rag_system.ingestion is None:
+        raise HTTPException(status_code=404, detail="Ingestion is disabled (set INGEST_ENABLED=true)")
+    return rag_system.ingestion
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """Corpo da requisição, com 413 assim que passar de `max_bytes` (sem ler o resto)"""
+    too_large = HTTPException(status_code=413, detail=f"Body exceeds {max_bytes} bytes (INGEST_MAX_MB)")
+    try:
+        if int(request.headers.get("content-length", "0")) > max_bytes:
+            raise too_large
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@app.post("/ingest", status_code=202)
+async def ingest_document(request: Request, source: str = ""):
+    """
+    Queue a document for ingestion; returns at once with the job id.
+
+    Body: raw PDF (Content-Type application/pdf), plain text, or JSON
+    {"text": ..., "source": ...}. The chunks are searchable as soon as the job
+    is done (GET /ingest/{job_id}); 503 with Retry-After when the queue is full,
+    413 when the body is larger than INGEST_MAX_MB.
+    """
+    ingestion = _get_ingestion()
+    content_type = request.headers.get("content-type", "")
+    data = await _read_body(request, ingestion.max_bytes)
+    if content_type.startswith("application/json"):
+        try:
+            payload = fast_json.loads(data)
+            data, content_type = payload["text"].encode("utf-8"), "text/plain"
+            source = payload.get("source", source)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise HTTPException(status_code=400, detail='JSON body must be {"text": ..., "source": ...}')
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty document")
+    try:
+        job = ingestion.submit(data, content_type, source)
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Ingestion queue is full",
+                            headers={"Retry-After": "5"})
+    return {"job_id": job["id"], "status": job["status"]}
+
+@app.get("/ingest/{job_id}")
+def ingest_status(job_id: str):
+    """Job status: queued, processing, done (with the chunk count) or failed (with the error)"""
+    job = _get_ingestion().job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/health")
 def health_check():
-    """Health check endpoint (synchronous)"""
+    """Health check endpoint (synchronous); dependency status is under /health/ready"""
     return {"status": "healthy", "services": ["milvus", "embedding", "llm"]}
 
-@app.on_event("startup")
-def startup_event():
-    """Initialize components when app starts (synchronous)"""
+@app.get("/health/live")
+def liveness():
+    """Liveness: the process is up and serving; never touches dependencies"""
+    return health_monitor.liveness()
+
+@app.get("/health/ready")
+def readiness():
+    """
+    Readiness from the background probes: per-dependency status, latency and
+    last error. Returns 503 while any critical dependency is down or stale.
+    """
+    report = health_monitor.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+def _check_admin(token: str):
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        # Sem token configurado as rotas de admin não existem (nada de acesso aberto por omissão)
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token != expected:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/profiles")
+def list_profiles(x_admin_token: str = Header(None)):
+    """Profiles in the on-disk ring buffer (cProfile of /query, tracemalloc of the ingestion)"""
+    _check_admin(x_admin_token)
+    return {"profiles": profile_store.list()}
+
+@app.post("/admin/cache/invalidate")
+def invalidate_retrieval_cache(x_admin_token: str = Header(None)):
+    """Drop cached retrieval results (e.g. after re-running prepare_data.py against the live collection)"""
+    _check_admin(x_admin_token)
+    if rag_system.retrieval_cache is None:
+        raise HTTPException(status_code=404, detail="Retrieval cache is disabled (RETRIEVAL_CACHE_MB=0)")
+    rag_system.retrieval_cache.bump()
+    return {"generation": rag_system.retrieval_cache.generation}
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, format: str = "txt", x_admin_token: str = Header(None)):
+    """Text report (format=txt) or raw pstats dump (format=prof, for snakeviz/pstats)"""
+    _check_admin(x_admin_token)
+    path = profile_store.path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "prof":
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    with open(path, encoding="utf-8") as f:
+        return PlainTextResponse(f.read())
+
+def _warm_up_embedding():
     try:
         test_embedding = rag_system.generate_embedding("test")
-        assert len(test_embedding) == 384
+        assert len(test_embedding) == EMBEDDING_DIM
     except Exception as e:
-        raise RuntimeError(f"Embedding model initialization failed: {str(e)}")
\ No newline at end of file
+        raise RuntimeError(f"Embedding model initialization failed: {str(e)}")
+
+@app.on_event("startup")
+def startup_event():
+    """
+    Warm up the embedding model according to EMBEDDING_WARMUP:
+    "background" (default) loads it in a thread so the server accepts connections
+    immediately, "eager" blocks startup until it is loaded, "off" loads on first query.
+    """
+    health_monitor.start()
+    if rag_system.ingestion is not None:
+        rag_system.ingestion.start()
+    if prefetcher is not None:
+        prefetcher.start()
+    if embedding_warmup == "eager":
+        _warm_up_embedding()
+    elif embedding_warmup == "background":
+        threading.Thread(target=_warm_up_embedding, name="embedding-warmup", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    health_monitor.stop()
+    if rag_system.ingestion is not None:
+        rag_system.ingestion.stop()
+    if prefetcher is not None:
+        prefetcher.stop()
+    get_tracer().flush()
@@ -0,0 +1,61 @@
+"""
+Memória e tempo de serialização: lista de dicts (formato de `process_diary_chunks`,
+com `palavras_maiusculas` por chunk como nas versões archive) vs. `ChunkTable`.
+
+    python scripts/benchmarks/bench_chunk_memory.py --scale 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from scripts.benchmarks.corpus import load_diary_text
+from src.chunking_strategy import build_chunk_table
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 2**20, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=20, help="quantas cópias do diário")
+    args = parser.parse_args()
+
+    text = load_diary_text(args.scale)
+    print(f"corpus: {len(text) / 2**20:.1f} MiB")
+
+    legacy, legacy_mib, legacy_build = measure(
+        lambda: build_chunk_table(text).to_legacy_dict(include_terms=True))
+    table, table_mib, table_build = measure(lambda: build_chunk_table(text))
+    table.buffer  # junta os pedaços antes de medir a serialização
+
+    start = time.perf_counter()
+    legacy_json = json.dumps(legacy, ensure_ascii=False)
+    legacy_ser = time.perf_counter() - start
+    start = time.perf_counter()
+    table_json = table.to_json()
+    table_ser = time.perf_counter() - start
+
+    print(f"chunks: {len(table)}")
+    print(f"{'format':<12} {'memory MiB':>11} {'build s':>8} {'serialize s':>12} {'JSON MiB':>9}")
+    print(f"{'dicts':<12} {legacy_mib:>11.1f} {legacy_build:>8.2f} {legacy_ser:>12.3f} "
+          f"{len(legacy_json.encode()) / 2**20:>9.1f}")
+    print(f"{'ChunkTable':<12} {table_mib:>11.1f} {table_build:>8.2f} {table_ser:>12.3f} "
+          f"{len(table_json) / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Throughput (MB/s) do motor de passada única (`src/chunking_engine.py`) contra as
+implementações em `src/archive`, checando que a saída é a mesma.
+
+    python scripts/benchmarks/bench_chunking.py --scale 20
+
+As variantes cloud/docker usam o mesmo algoritmo da v3, mas carregam o modelo de
+embeddings e o pymilvus no import, então não entram aqui.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from scripts.benchmarks.corpus import load_diary_text
+from src.archive import chunking_strategy as archive_paragraph
+from src.archive import chunking_strategy_v3 as archive_v3
+from src.chunking_engine import chunk_by_day_and_paragraph, chunk_by_line_window
+
+
+def throughput(fn, text: str, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return result, len(text.encode("utf-8")) / 2**20 / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=20)
+    args = parser.parse_args()
+
+    # Uma linha em branco a cada 5 linhas para haver parágrafos
+    lines = load_diary_text(args.scale).split("\n")
+    text = "\n".join(line + ("\n" if i % 5 == 4 else "") for i, line in enumerate(lines))
+    print(f"corpus: {len(text) / 2**20:.1f} MiB")
+
+    cases = [
+        ("day+paragraph", archive_paragraph.chunk_diary_by_day_and_paragraph, chunk_by_day_and_paragraph,
+         lambda old, new: old == new),
+        ("4-line window + terms", archive_v3.process_diary_chunks, lambda t: chunk_by_line_window(t, 4),
+         lambda old, new: [c["chunk_text"] for c in old["chunks"]] == new.texts()),
+    ]
+    print(f"{'strategy':<24} {'archive MB/s':>13} {'engine MB/s':>12} {'speedup':>8} {'same output':>12}")
+    for name, old_fn, new_fn, same in cases:
+        old, old_mbs = throughput(old_fn, text)
+        new, new_mbs = throughput(new_fn, text)
+        print(f"{name:<24} {old_mbs:>13.1f} {new_mbs:>12.1f} {new_mbs / old_mbs:>7.1f}x {str(same(old, new)):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+A/B offline das estratégias de chunking registradas em `src/chunking_registry.py`:
+chunking -> embeddings -> índice local, e então as perguntas de data/questions.txt.
+
+Reporta número de chunks, tamanho do índice, tempo de ingestão (chunking +
+embeddings + índice), latência de busca e recall@1/recall@k, onde um chunk é
+relevante se contém os termos-chave da resposta esperada (src/retrieval_eval.py).
+
+    python scripts/benchmarks/bench_chunking_strategies.py --pdf data/dr_voss_diary.pdf
+
+Sem --pdf usa o texto reconstruído de tests/diary_line_chunks.json, que não tem
+as linhas em branco do PDF (as estratégias por parágrafo viram um chunk por dia).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from scripts.benchmarks.corpus import load_diary_text
+from scripts.eval import parse_qa_files
+from src.chunking_registry import get_strategy, list_strategies
+from src.embedding import EMBEDDING_DIM, load_embedder
+from src.local_index import LocalIndex
+from src.retrieval_eval import recall_at_k
+
+
+def run_strategy(name, text, embedder, question_vectors, qa_pairs, k):
+    start = time.perf_counter()
+    chunks = get_strategy(name)(text)
+    chunk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = embedder.encode(chunks)
+    embed_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = LocalIndex(EMBEDDING_DIM)
+    index.add(list(range(1, len(chunks) + 1)), vectors, chunks)
+    index.vectors  # consolida a matriz
+    index_s = time.perf_counter() - start
+
+    latencies, retrieved = [], []
+    for vector in question_vectors:
+        start = time.perf_counter()
+        hits = index.search(vector, k)[0]
+        latencies.append(time.perf_counter() - start)
+        retrieved.append([entity["text"] for entity in index.get([id_ for id_, _ in hits])])
+
+    return {
+        "chunks": len(chunks),
+        "index_mib": index.nbytes / 2**20,
+        "ingest_s": chunk_s + embed_s + index_s,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "recall@1": recall_at_k(retrieved, qa_pairs, 1),
+        f"recall@{k}": recall_at_k(retrieved, qa_pairs, k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF do diário (padrão: texto reconstruído dos testes)")
+    parser.add_argument("--strategies", nargs="+", default=list_strategies())
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--runtime", default=None, help="runtime de embedding (padrão: auto)")
+    args = parser.parse_args()
+
+    if args.pdf:
+        from src.chunking_strategy import extract_text_with_multiple_breaks
+        text = extract_text_with_multiple_breaks(args.pdf)
+    else:
+        text = load_diary_text()
+    qa_pairs = parse_qa_files(os.path.join(ROOT_DIR, "data", "questions.txt"),
+                              os.path.join(ROOT_DIR, "data", "answers.txt"))
+    embedder = load_embedder(args.runtime)
+    question_vectors = embedder.encode([qa["question"] for qa in qa_pairs])
+    print(f"embedding runtime: {embedder.runtime} | questions: {len(qa_pairs)} | corpus: {len(text) / 1024:.0f} KiB")
+
+    header = f"{'strategy':<20} {'chunks':>7} {'index MiB':>10} {'ingest s':>9} {'p50 ms':>7} {'p95 ms':>7} {'R@1':>6} {'R@' + str(args.k):>6}"
+    print(header)
+    for name in args.strategies:
+        r = run_strategy(name, text, embedder, question_vectors, qa_pairs, args.k)
+        print(f"{name:<20} {r['chunks']:>7} {r['index_mib']:>10.2f} {r['ingest_s']:>9.2f} "
+              f"{r['p50_ms']:>7.3f} {r['p95_ms']:>7.3f} {r['recall@1']:>6.2f} {r[f'recall@{args.k}']:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Mede o cold start (import + carga + primeiro encode) e a latência por query de
+cada runtime de embedding disponível. Cada runtime roda num processo novo para
+que imports de torch/onnxruntime não sejam compartilhados entre as medições.
+
+    python scripts/benchmarks/bench_cold_start.py [--runtimes torch onnx onnx-int8]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+CHILD = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.append({root!r})
+from src.embedding import load_embedder
+embedder = load_embedder({runtime!r})
+t_load = time.perf_counter()
+embedder.encode(["warm up"])
+t_first = time.perf_counter()
+with open(os.path.join({root!r}, "data", "questions.txt")) as f:
+    questions = [q.strip() for q in f if q.strip()]
+latencies = []
+for q in questions:
+    start = time.perf_counter()
+    embedder.encode([q])
+    latencies.append(time.perf_counter() - start)
+latencies.sort()
+print(json.dumps({{
+    "runtime": embedder.runtime,
+    "load_s": t_load - t0,
+    "cold_start_s": t_first - t0,
+    "query_ms_p50": latencies[len(latencies) // 2] * 1000,
+    "query_ms_p95": latencies[int(len(latencies) * 0.95)] * 1000,
+}}))
+"""
+
+
+def run(runtime: str):
+    proc = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT_DIR, runtime=runtime)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"runtime": runtime, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runtimes", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    args = parser.parse_args()
+
+    print(f"{'runtime':<10} {'load s':>8} {'cold start s':>13} {'p50 ms':>8} {'p95 ms':>8}")
+    for runtime in args.runtimes:
+        r = run(runtime)
+        if "error" in r:
+            print(f"{runtime:<10} unavailable: {r['error']}")
+            continue
+        print(f"{r['runtime']:<10} {r['load_s']:>8.2f} {r['cold_start_s']:>13.2f} "
+              f"{r['query_ms_p50']:>8.2f} {r['query_ms_p95']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
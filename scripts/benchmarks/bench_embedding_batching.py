@@ -0,0 +1,66 @@
+"""
+Compara o caminho atual de `PDFProcessor.generate_embeddings` (`encode` na
+ordem dos chunks, batch de 32) com o `BucketedEmbeddingRunner` (batches por
+tamanho em tokens), em processo e com um pool de processos.
+
+    python scripts/benchmarks/bench_embedding_batching.py --strategy day-paragraph-800 --processes 0 2
+
+tokens/s conta só os tokens reais (sem padding).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from scripts.benchmarks.corpus import load_diary_text
+from src.chunking_registry import get_strategy
+from src.embedding import load_embedder
+from src.embedding_batching import BucketedEmbeddingRunner, token_lengths
+from src.token_chunker import default_tokenizer, padding_fraction
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strategy", default="day-paragraph-800")
+    parser.add_argument("--runtime", default=None)
+    parser.add_argument("--processes", nargs="+", type=int, default=[0])
+    parser.add_argument("--max-tokens-per-batch", type=int, default=2048)
+    args = parser.parse_args()
+
+    texts = get_strategy(args.strategy)(load_diary_text())
+    lengths = token_lengths(texts, default_tokenizer())
+    tokens = int(lengths.sum())
+    embedder = load_embedder(args.runtime)
+    embedder.encode(["warm up"])
+    print(f"runtime: {embedder.runtime} | strategy: {args.strategy} | chunks: {len(texts)} | tokens: {tokens}")
+    print(f"{'mode':<22} {'seconds':>8} {'tokens/s':>10} {'padding':>8} {'speedup':>8}")
+
+    start = time.perf_counter()
+    baseline = embedder.encode(texts)
+    baseline_s = time.perf_counter() - start
+    print(f"{'current (batch 32)':<22} {baseline_s:>8.2f} {tokens / baseline_s:>10.0f} "
+          f"{padding_fraction(lengths, 32):>8.1%} {1.0:>8.2f}")
+
+    for processes in args.processes:
+        runner = BucketedEmbeddingRunner(embedder if processes == 0 else None, processes=processes,
+                                         runtime=embedder.runtime, max_tokens_per_batch=args.max_tokens_per_batch)
+        with runner:
+            if processes:
+                runner.encode(texts[:processes])  # sobe os processos e carrega os modelos fora da medição
+                runner.stats.update(texts=0, batches=0, tokens=0, padded_tokens=0, seconds=0.0)
+            vectors = runner.encode(texts)
+        stats = runner.get_stats()
+        assert np.allclose(vectors, baseline, atol=1e-3), "vetores diferentes do caminho atual"
+        label = "bucketed" if processes == 0 else f"bucketed x{processes} proc"
+        print(f"{label:<22} {stats['seconds']:>8.2f} {stats['tokens_per_second']:>10.0f} "
+              f"{stats['padding_fraction']:>8.1%} {baseline_s / stats['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Escalonamento da ingestão de embeddings em 1..N processos (`SharedEmbeddingPool`),
+cada um com `cpu_count // N` threads, contra um único processo com todas as
+threads. Os chunks são agrupados por tamanho (`plan_batches`) nos dois casos.
+
+    python scripts/benchmarks/bench_embedding_scaling.py --processes 1 2 4 --runtime onnx-int8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from scripts.benchmarks.corpus import load_diary_text
+from src.chunking_registry import get_strategy
+from src.embedding_batching import BucketedEmbeddingRunner
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", nargs="+", type=int,
+                        default=sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1))))
+    parser.add_argument("--runtime", default=None)
+    parser.add_argument("--strategy", default="line-window-3")
+    parser.add_argument("--scale", type=int, default=1, help="repete o diário N vezes")
+    args = parser.parse_args()
+
+    texts = get_strategy(args.strategy)(load_diary_text(args.scale))
+    print(f"cpus: {cpus} | strategy: {args.strategy} | chunks: {len(texts)}")
+    print(f"{'mode':<18} {'threads':>7} {'startup s':>9} {'encode s':>9} {'tokens/s':>10} {'speedup':>8} {'efficiency':>10}")
+
+    start = time.perf_counter()
+    runner = BucketedEmbeddingRunner(runtime=args.runtime)
+    runner.encode(["warm up"])
+    startup_s = time.perf_counter() - start
+    runner.stats.update(texts=0, batches=0, tokens=0, padded_tokens=0, seconds=0.0)
+    reference = runner.encode(texts)
+    base = runner.get_stats()
+    print(f"{'in-process':<18} {cpus:>7} {startup_s:>9.2f} {base['seconds']:>9.2f} "
+          f"{base['tokens_per_second']:>10.0f} {1.0:>8.2f} {'':>10}")
+
+    for processes in args.processes:
+        start = time.perf_counter()
+        with BucketedEmbeddingRunner(processes=processes, runtime=args.runtime) as pooled:
+            pooled.start()
+            startup_s = time.perf_counter() - start
+            vectors = pooled.encode(texts)
+        stats = pooled.get_stats()
+        assert np.allclose(vectors, reference, atol=1e-3), "vetores diferentes do processo único"
+        speedup = base["seconds"] / stats["seconds"]
+        print(f"{f'{processes} proc':<18} {max(1, cpus // processes):>7} {startup_s:>9.2f} {stats['seconds']:>9.2f} "
+              f"{stats['tokens_per_second']:>10.0f} {speedup:>8.2f} {speedup / processes:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
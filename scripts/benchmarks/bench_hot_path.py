@@ -0,0 +1,69 @@
+"""
+Microbenchmark do caminho quente de requisições: compara o tratamento antigo
+(dois `response.json()` + `print` do corpo) com o atual (um parse via
+`src.fast_json` + log DEBUG preguiçoso).
+
+    python scripts/benchmarks/bench_hot_path.py
+"""
+import io
+import json
+import os
+import random
+import sys
+import timeit
+from contextlib import redirect_stdout
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src import fast_json
+from src.logger import configure_logging, get_logger
+
+
+def make_payloads(n_entities: int = 50, dim: int = 384):
+    rng = random.Random(0)
+    text = "The Aralith Mountains form the northern border of Veridia. " * 14
+    get_response = {"code": 0, "data": [{"primary_key": i, "text": text} for i in range(n_entities)]}
+    insert_request = {
+        "collectionName": "dr_voss",
+        "data": [{"primary_key": i, "vector": [rng.random() for _ in range(dim)], "text": text}
+                 for i in range(n_entities)],
+    }
+    return json.dumps(get_response).encode(), insert_request
+
+
+def old_path(body: bytes, request: dict, sink: io.StringIO):
+    json.dumps(request)
+    with redirect_stdout(sink):
+        print(json.loads(body))
+    return json.loads(body)
+
+
+def new_path(body: bytes, request: dict, logger):
+    fast_json.dumps(request)
+    result = fast_json.loads(body)
+    logger.debug("POST %s -> %d bytes", "vectordb/entities/get", len(body))
+    return result
+
+
+def main(repeat: int = 200):
+    configure_logging(level="INFO")
+    logger = get_logger("bench")
+    body, request = make_payloads()
+    sink = io.StringIO()
+
+    old = min(timeit.repeat(lambda: old_path(body, request, sink), number=repeat, repeat=3)) / repeat
+    sink.seek(0)
+    sink.truncate()
+    new = min(timeit.repeat(lambda: new_path(body, request, logger), number=repeat, repeat=3)) / repeat
+
+    print(f"payload: response {len(body) / 1024:.0f} KiB, request {len(fast_json.dumps(request)) / 1024:.0f} KiB")
+    print(f"json backend: {'orjson' if fast_json.orjson else 'stdlib json'}")
+    print(f"old (2x json + print): {old * 1e3:.3f} ms/request")
+    print(f"new (1x parse + lazy log): {new * 1e3:.3f} ms/request")
+    print(f"speedup: {old / new:.1f}x (print to a real terminal costs more than the in-memory sink used here)")
+
+
+if __name__ == "__main__":
+    main()
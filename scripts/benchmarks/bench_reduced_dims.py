@@ -0,0 +1,93 @@
+"""
+Recall x latência da busca com dimensão reduzida (`src/dim_reduction.py`):
+busca exata em 384 dimensões, só o estágio reduzido e dois estágios (reduzido +
+rescoring em 384) para PCA e truncamento em cada dimensão.
+
+    python scripts/benchmarks/bench_reduced_dims.py --dims 64 128 192 --tile 20
+
+recall vs exact: fração do top-k exato recuperada. answer recall: recall@k pelos
+termos-chave das respostas (`src/retrieval_eval.py`). `--tile N` repete os
+vetores do diário N vezes com um pouco de ruído para medir a latência num
+índice maior.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from scripts.benchmarks.corpus import load_diary_text
+from scripts.eval import parse_qa_files
+from src.chunking_registry import get_strategy
+from src.dim_reduction import make_reducer
+from src.embedding import EMBEDDING_DIM, _normalize
+from src.embedding_batching import BucketedEmbeddingRunner
+from src.local_index import LocalIndex, TwoStageIndex
+from src.retrieval_eval import recall_at_k
+
+
+def measure(index, search, question_vectors, qa_pairs, exact, k):
+    latencies, hits = [], []
+    for vector in question_vectors:
+        start = time.perf_counter()
+        hits.append(search(vector, k)[0])
+        latencies.append(time.perf_counter() - start)
+    overlap = np.mean([len({i for i, _ in h} & {i for i, _ in e}) / k for h, e in zip(hits, exact)])
+    texts = [[entity["text"] for entity in index.get([i for i, _ in h])] for h in hits]
+    return np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000, overlap, \
+        recall_at_k(texts, qa_pairs, k), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", nargs="+", type=int, default=[64, 128, 192])
+    parser.add_argument("--kinds", nargs="+", default=["pca", "truncate"])
+    parser.add_argument("--oversample", type=int, default=4)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--strategy", default="line-window-3")
+    parser.add_argument("--tile", type=int, default=1)
+    parser.add_argument("--runtime", default=None)
+    args = parser.parse_args()
+
+    texts = get_strategy(args.strategy)(load_diary_text())
+    qa_pairs = parse_qa_files(os.path.join(ROOT_DIR, "data", "questions.txt"),
+                              os.path.join(ROOT_DIR, "data", "answers.txt"))
+    runner = BucketedEmbeddingRunner(runtime=args.runtime)
+    vectors = runner.encode(texts)
+    question_vectors = runner.encode([qa["question"] for qa in qa_pairs])
+    rng = np.random.default_rng(0)
+    all_vectors = np.concatenate([vectors] + [
+        _normalize(vectors + rng.normal(0, 0.01, vectors.shape).astype(np.float32))
+        for _ in range(args.tile - 1)
+    ])
+    all_texts = texts * args.tile
+    ids = list(range(1, len(all_texts) + 1))
+    print(f"vectors: {len(ids)} x {EMBEDDING_DIM} | questions: {len(qa_pairs)} | k={args.k} "
+          f"oversample={args.oversample}")
+    print(f"{'mode':<26} {'index MiB':>9} {'p50 ms':>7} {'p95 ms':>7} {'recall vs exact':>15} {'answer recall':>13}")
+
+    index = LocalIndex(EMBEDDING_DIM)
+    index.add(ids, all_vectors, all_texts)
+    exact = [index.search(v, args.k)[0] for v in question_vectors]
+    p50, p95, overlap, answer, _ = measure(index, index.search, question_vectors, qa_pairs, exact, args.k)
+    print(f"{f'exact {EMBEDDING_DIM}':<26} {index.vectors.nbytes / 2**20:>9.2f} {p50:>7.3f} {p95:>7.3f} "
+          f"{overlap:>15.2f} {answer:>13.2f}")
+
+    for kind in args.kinds:
+        for dim in args.dims:
+            two_stage = TwoStageIndex(EMBEDDING_DIM, make_reducer(kind, dim), oversample=args.oversample)
+            two_stage.add(ids, all_vectors, all_texts)
+            reduced_mib = two_stage.reduced_vectors.nbytes / 2**20
+            for label, search in ((f"{kind} {dim}", two_stage.search_reduced),
+                                  (f"{kind} {dim} + rescore", two_stage.search)):
+                p50, p95, overlap, answer, _ = measure(two_stage, search, question_vectors, qa_pairs, exact, args.k)
+                print(f"{label:<26} {reduced_mib:>9.2f} {p50:>7.3f} {p95:>7.3f} {overlap:>15.2f} {answer:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
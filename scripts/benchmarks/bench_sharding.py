@@ -0,0 +1,91 @@
+"""
+Latência da busca em N shards locais (fan-out + merge por heap) contra um
+índice único com os mesmos vetores, e o efeito do timeout por shard quando
+um shard fica lento.
+
+    python scripts/benchmarks/bench_sharding.py --rows 200000 --shards 1 2 4 8 --slow-ms 200
+
+Vetores aleatórios normalizados (dimensão do modelo); o resultado do merge é
+conferido contra o índice único (mesmo top-k).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+os.environ.setdefault("LOG_LEVEL", "ERROR")  # um warning por busca degradada poluiria a tabela
+
+from src.embedding import EMBEDDING_DIM
+from src.local_index import LocalIndex
+from src.sharding import LocalShard, ShardedRetriever
+
+
+class DelayedShard(LocalShard):
+    def __init__(self, index, delay: float):
+        super().__init__(index)
+        self.delay = delay
+
+    def search(self, vector, k):
+        time.sleep(self.delay)
+        return super().search(vector, k)
+
+
+def percentiles(samples):
+    return np.percentile(np.asarray(samples) * 1000, [50, 95])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--shards", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--timeout-ms", type=float, default=100)
+    parser.add_argument("--slow-ms", type=float, default=200, help="atraso de um shard no cenário degradado")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.rows, EMBEDDING_DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(args.rows, args.queries, replace=False)]
+
+    single = LocalIndex(EMBEDDING_DIM)
+    single.add(list(range(args.rows)), vectors, [""] * args.rows)
+    expected, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        expected.append([id_ for id_, _ in single.search(query, args.k)[0]])
+        timings.append(time.perf_counter() - start)
+    p50, p95 = percentiles(timings)
+    print(f"{'setup':>20} {'p50 ms':>8} {'p95 ms':>8} {'same top-k':>10} {'degraded':>9}")
+    print(f"{'single index':>20} {p50:8.2f} {p95:8.2f} {'-':>10} {'-':>9}")
+
+    for n_shards in args.shards:
+        for slow in ([False, True] if n_shards > 1 and args.slow_ms else [False]):
+            indexes = [LocalIndex(EMBEDDING_DIM) for _ in range(n_shards)]
+            for shard, index in enumerate(indexes):
+                rows = np.arange(shard, args.rows, n_shards)
+                index.add(rows.tolist(), vectors[rows], [""] * len(rows))
+            shards = {f"s{i}": LocalShard(index) for i, index in enumerate(indexes)}
+            if slow:
+                shards["s0"] = DelayedShard(indexes[0], args.slow_ms / 1000)
+            retriever = ShardedRetriever(shards, timeout=args.timeout_ms / 1000)
+            timings, same, degraded = [], 0, 0
+            for query, ids in zip(queries, expected):
+                start = time.perf_counter()
+                result = retriever.search(query, args.k)
+                timings.append(time.perf_counter() - start)
+                same += [hit.id for hit in result.hits] == ids
+                degraded += bool(result.degraded)
+            p50, p95 = percentiles(timings)
+            label = f"{n_shards} shards" + (" (1 slow)" if slow else "")
+            print(f"{label:>20} {p50:8.2f} {p95:8.2f} {same / len(queries):10.0%} {degraded / len(queries):9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Custo do tracing por requisição: um trace com os mesmos spans de um `/query`
+(raiz, embedding, search e get no Zilliz, Groq), com exportação para arquivo,
+em cada taxa de amostragem. O overhead é comparado com `--request-ms`, a
+latência típica de um `/query`.
+
+    python scripts/benchmarks/bench_tracing.py --rates 0 0.01 0.1 1 --request-ms 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src.tracing import SPAN_KIND_CLIENT, FileSpanExporter, Tracer, inject_headers, span
+
+
+def fake_query(tracer: Tracer):
+    with tracer.start_trace("POST /query", None, **{"http.route": "/query", "question.chars": 42}) as root:
+        with span("embedding.encode", **{"embedding.runtime": "onnx-int8", "embedding.texts": 1}):
+            pass
+        for endpoint in ("vectordb/entities/search", "vectordb/entities/get"):
+            with span(f"zilliz {endpoint}", SPAN_KIND_CLIENT) as trace:
+                inject_headers({"Authorization": "Bearer x"})
+                trace.add("zilliz.attempts")
+                trace.add("http.request.bytes", 1800)
+                trace.set_attribute("http.status_code", 200)
+        with span("groq chat.completions", SPAN_KIND_CLIENT) as trace:
+            inject_headers({"Authorization": "Bearer x"})
+            trace.add("groq.attempts")
+            trace.set_attribute("gen_ai.usage.total_tokens", 900)
+        root.set_attribute("rag.success", True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", nargs="+", type=float, default=[0.0, 0.01, 0.1, 1.0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--request-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"{'sample rate':>11} {'us/request':>10} {'overhead':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rate in args.rates:
+            tracer = Tracer(rate, FileSpanExporter(os.path.join(tmp, "traces.jsonl")))
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                fake_query(tracer)
+            tracer.flush()  # inclui o custo de exportação
+            us = (time.perf_counter() - start) / args.requests * 1e6
+            print(f"{rate:>11} {us:>10.1f} {us / (args.request_ms * 1000):>9.4%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Memória por worker e throughput de embeddings vs. número de workers, para os três
+modos de servir: cada worker com seu modelo (independent), modelo carregado antes
+do fork com gc.freeze (prefork) e sidecar compartilhado via Unix socket (sidecar).
+
+    python scripts/benchmarks/bench_workers.py --workers 1 2 4 --duration 10
+
+Memória é PSS (Proportional Set Size, /proc/<pid>/smaps_rollup): páginas
+compartilhadas são divididas entre os processos, então a soma é o custo real.
+"""
+import argparse
+import gc
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src.embedding import load_embedder
+from src.embedding_server import RemoteEmbedder
+
+with open(os.path.join(ROOT_DIR, "data", "questions.txt")) as f:
+    QUESTIONS = [q.strip() for q in f if q.strip()]
+
+_PREFORK_EMBEDDER = None
+
+
+def pss_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _limit_threads(threads: int):
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def _worker(mode, socket_path, threads, duration, ready, start, results):
+    if mode == "sidecar":
+        embedder = RemoteEmbedder(socket_path)
+    elif mode == "prefork":
+        embedder = _PREFORK_EMBEDDER
+    else:
+        embedder = load_embedder()
+    _limit_threads(threads)
+    embedder.encode(["warm up"])
+    ready.put(os.getpid())
+    start.wait()
+    count = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        embedder.encode([QUESTIONS[count % len(QUESTIONS)]])
+        count += 1
+    results.put(count)
+
+
+def run(mode: str, workers: int, duration: float):
+    global _PREFORK_EMBEDDER
+    extra_pids = []
+    sidecar = None
+    socket_path = os.path.join(tempfile.gettempdir(), f"bench-embedding-{os.getpid()}.sock")
+    if mode == "prefork":
+        ctx = mp.get_context("fork")
+        _PREFORK_EMBEDDER = load_embedder()
+        gc.freeze()
+        extra_pids.append(os.getpid())
+    else:
+        ctx = mp.get_context("spawn")
+    if mode == "sidecar":
+        sidecar = subprocess.Popen([sys.executable, "-m", "src.embedding_server", "--socket", socket_path],
+                                   cwd=ROOT_DIR)
+        while not os.path.exists(socket_path):
+            if sidecar.poll() is not None:
+                raise RuntimeError("sidecar failed to start")
+            time.sleep(0.1)
+        extra_pids.append(sidecar.pid)
+
+    ready, results, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    procs = [ctx.Process(target=_worker, args=(mode, socket_path, threads, duration, ready, start, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    pids = [ready.get() for _ in procs]
+    worker_pss = [pss_mib(pid) for pid in pids]
+    total_pss = sum(worker_pss) + sum(pss_mib(pid) for pid in extra_pids)
+    start.set()
+    total = sum(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+
+    if sidecar is not None:
+        sidecar.terminate()
+        sidecar.wait()
+    if mode == "prefork":
+        gc.unfreeze()
+        _PREFORK_EMBEDDER = None
+    return {
+        "worker_pss": sum(worker_pss) / len(worker_pss),
+        "total_pss": total_pss,
+        "qps": total / duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=["independent", "prefork", "sidecar"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'workers':>7} {'PSS/worker MiB':>15} {'total PSS MiB':>14} {'queries/s':>10}")
+    for mode in args.modes:
+        for workers in args.workers:
+            r = run(mode, workers, args.duration)
+            print(f"{mode:<12} {workers:>7} {r['worker_pss']:>15.1f} {r['total_pss']:>14.1f} {r['qps']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""Corpus de benchmark: o diário reconstruído de tests/diary_line_chunks.json (o PDF não é versionado)."""
+import json
+import os
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+LINES_FILE = os.path.join(ROOT_DIR, "tests", "diary_line_chunks.json")
+
+
+def load_diary_text(scale: int = 1) -> str:
+    """Texto do diário, uma linha por linha extraída do PDF, repetido `scale` vezes."""
+    with open(LINES_FILE, encoding="utf-8") as f:
+        lines = [chunk["line_text"] for chunk in json.load(f)["chunks"]]
+    return "\n".join(lines * scale)
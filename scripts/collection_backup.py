@@ -0,0 +1,61 @@
+"""
+Backup e migração de coleções (formato de `src/collection_io.py`).
+
+    python scripts/collection_backup.py export --collection dr_voss --output backups/dr_voss
+    python scripts/collection_backup.py import --collection dr_voss --input backups/dr_voss \\
+        --base-url http://localhost:19530/v2 --token root:Milvus
+
+Sem --base-url usa o cluster Zilliz de ZILLIZ_API_KEY / ZILLIZ_CLUSTER_ID / ZILLIZ_REGION.
+Na importação a coleção de destino precisa existir com a mesma dimensão.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from scripts.milvus_db import ZillizClient
+from src.collection_io import export_collection, import_collection
+
+
+def make_client(args) -> ZillizClient:
+    if args.base_url:
+        return ZillizClient(api_key=args.token or os.getenv("MILVUS_LOCAL_TOKEN", "root:Milvus"),
+                            cluster_id=None, base_url=args.base_url, hedge=False)
+    return ZillizClient(api_key=os.getenv("ZILLIZ_API_KEY"), cluster_id=os.getenv("ZILLIZ_CLUSTER_ID"),
+                        region=os.getenv("ZILLIZ_REGION", "gcp-us-west1"), hedge=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--collection", default=os.getenv("collection_name"))
+    parser.add_argument("--output", help="diretório de destino (export)")
+    parser.add_argument("--input", help="diretório exportado (import)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4, help="inserts em paralelo (import)")
+    parser.add_argument("--primary-field", help="chave primária (padrão: lida do describe da coleção)")
+    parser.add_argument("--vector-field", default="vector")
+    parser.add_argument("--base-url", help="API v2 de outro Milvus (ex.: http://localhost:19530/v2)")
+    parser.add_argument("--token")
+    args = parser.parse_args()
+
+    client = make_client(args)
+    start = time.perf_counter()
+    if args.command == "export":
+        primary_field = args.primary_field or client.get_primary_field(args.collection)
+        batches = client.iter_entities(args.collection, args.batch_size, primary_field=primary_field)
+        manifest = export_collection(batches, args.output or os.path.join("backups", args.collection),
+                                     args.collection, args.vector_field, primary_field)
+        rows = manifest["rows"]
+    else:
+        rows = import_collection(client, args.collection, args.input, args.batch_size, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {args.command}: {rows} entities in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
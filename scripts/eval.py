@@ -1,9 +1,14 @@
+import argparse
+import hashlib
 import os
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+
+import numpy as np
 
 # Adiciona o diretório raiz ao path
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -12,6 +17,9 @@ if ROOT_DIR not in sys.path:
     
 from scripts.milvus_db import ZillizClient
 import src.groq_proxy as groq
+from src.embedding import EMBEDDING_MODEL_NAME, LazyEmbedder
+from src.judge import LLMJudge
+from src.retrieval_eval import evaluate_retrieval
 
 # Carregue as variáveis de ambiente
 load_dotenv()
@@ -21,11 +29,11 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
-def generate_embedding(text: str):
-    """Gera o embedding de um texto usando o modelo Sentence Transformer."""
+_embedding_model = LazyEmbedder()
 
-    model = SentenceTransformer("Snowflake/snowflake-arctic-embed-s")
-    return model.encode([text], normalize_embeddings=True)[0].tolist()
+def generate_embedding(text: str):
+    """Gera o embedding de um texto com o runtime mais rápido disponível (ver src/embedding.py)."""
+    return _embedding_model.encode([text])[0].tolist()
 
 def parse_qa_files(questions_file: str, answers_file: str) -> List[Dict[str, str]]:
     """
@@ -55,7 +63,7 @@ def parse_qa_files(questions_file: str, answers_file: str) -> List[Dict[str, str
         print(f"Erro ao carregar arquivos: {e}")
     return qa_pairs
 
-def evaluate_rag_with_groq(qa_pairs: List[Dict[str, str]], groq_client: groq.GroqProxyRestAPI, milvus_client: ZillizClient) -> List[Dict[str, any]]:
+def evaluate_rag_with_groq(qa_pairs: List[Dict[str, str]], groq_client: groq.GroqProxyRestAPI, milvus_client: ZillizClient, max_workers: int = None, judge: LLMJudge = None) -> List[Dict[str, any]]:
     """
     Avalia o RAG pipeline usando o Groq para avaliar as respostas do LLM.
 
@@ -63,13 +71,15 @@ def evaluate_rag_with_groq(qa_pairs: List[Dict[str, str]], groq_client: groq.Gro
         qa_pairs: Lista de dicionários contendo perguntas e respostas esperadas.
         groq_client: Instância do cliente GroqProxy.
          milvus_client: Instância do cliente Zilliz para interagir com o banco de dados vetorial.
+        max_workers: Número de avaliações simultâneas (padrão: EVAL_WORKERS ou 4).
+        judge: Juiz das respostas (padrão: LLMJudge.from_env, ver src/judge.py).
 
     Returns:
-        Uma lista de dicionários contendo os resultados da avaliação, incluindo a nota do Groq.
+        Uma lista de dicionários contendo os resultados da avaliação, incluindo a nota do Groq
+        (`groq_evaluation`, de 0 a 1, ou None se o juiz falhou) e o motivo (`judge_reason`).
     """
 
-    evaluation_results = []
-    for qa in qa_pairs:
+    def evaluate_pair(qa: Dict[str, str]) -> Dict[str, any]:
         question = qa["question"]
         expected_answer = qa["expected_answer"]
 
@@ -80,6 +90,7 @@ def evaluate_rag_with_groq(qa_pairs: List[Dict[str, str]], groq_client: groq.Gro
         search_results = milvus_client.search_vectors(
             collection_name=os.getenv("collection_name"),  # Use a variável de ambiente
             vector=question_embedding,
+            limit=int(os.getenv("RETRIEVAL_TOP_K", "1")),
         )
 
         if search_results and search_results.get("data"):
@@ -102,48 +113,134 @@ def evaluate_rag_with_groq(qa_pairs: List[Dict[str, str]], groq_client: groq.Gro
         else:
             predicted_answer = "Não encontrei informações relevantes para sua pergunta."
 
-        # 5. Evaluation with LLM
-        evaluation_prompt = f"""
-        You are a question and answer system response evaluator.
-        Given the question: "{question}", the expected answer: "{expected_answer}" and the system's answer: "{predicted_answer}",
-        assign a grade from 0 to 1, where 1 indicates that the system's answer is perfectly aligned with the expected answer and 0 indicates that there is no alignment at all.
-
-        Grade (0-1):
-        """
-        groq_evaluation = groq_client.eval(context=evaluation_prompt) # Pass an empty list as context
-
-        evaluation_results.append({
+        return {
             "question": question,
             "expected_answer": expected_answer,
-            "predicted_answer": predicted_answer,
-            "groq_evaluation": groq_evaluation
-        })
+            "predicted_answer": predicted_answer
+        }
+
+    # As chamadas à Groq passam pelo rate limiter do cliente, então várias
+    # avaliações podem rodar em paralelo sem estourar os limites RPM/TPM.
+    if max_workers is None:
+        max_workers = int(os.getenv("EVAL_WORKERS", "4"))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        evaluation_results = list(executor.map(evaluate_pair, qa_pairs))
+
+    # 5. Evaluation with LLM: vários pares por prompt, nota estruturada, cache por (pergunta, esperada, resposta)
+    if judge is None:
+        judge = LLMJudge.from_env(groq_client)
+    for result, judgement in zip(evaluation_results, judge.judge(evaluation_results)):
+        result["groq_evaluation"] = judgement["score"]
+        result["judge_reason"] = judgement["reason"]
+        result["judge_cached"] = judgement["cached"]
+    print(f"Judge: {judge.stats['cached']} cached, {judge.stats['judged']} judged in {judge.stats['batches']} "
+          f"batches, {judge.stats['failed']} failed", file=sys.stderr)
 
     return evaluation_results
 
-if __name__ == "__main__":
-    # Substitua pelos caminhos corretos dos seus arquivos e suas chaves de API
-    questions_file = r"data\questions.txt"
-    answers_file = r"data\answers.txt"
-
-    # Inicialize o cliente GroqProxy
-    groq_client = groq.GroqProxyRestAPI()
-    ZILLIZ_API_KEY = os.getenv("ZILLIZ_API_KEY")
-    ZILLIZ_CLUSTER_ID = os.getenv("ZILLIZ_CLUSTER_ID")
+def embed_questions(questions: List[str], cache_path: str = None) -> np.ndarray:
+    """
+    Vetores das perguntas num único batch. Com `cache_path`, reaproveita os
+    vetores de uma execução anterior com as mesmas perguntas e o mesmo modelo
+    (nem carrega o modelo); apague o arquivo ao trocar o runtime de embedding.
+    """
+    key = hashlib.sha256(json.dumps([EMBEDDING_MODEL_NAME, os.getenv("EMBEDDING_RUNTIME", "auto"),
+                                     os.getenv("EMBEDDING_ONNX_DIR", ""), questions]).encode("utf-8")).hexdigest()
+    if cache_path and os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if str(cached["key"]) == key:
+            return cached["vectors"]
+    vectors = _embedding_model.encode(questions, batch_size=len(questions))
+    if cache_path:
+        np.savez(cache_path, key=key, vectors=vectors)
+    return vectors
+
+def build_local_index(directory: str, pdf_path: str = None, strategy: str = None) -> Dict:
+    """Chunking + embeddings do diário gravados como exportação de coleção (lida por load_local_index)."""
+    from scripts.benchmarks.corpus import load_diary_text
+    from src.chunking_registry import get_strategy
+    from src.collection_io import export_collection
+
+    if pdf_path:
+        from src.chunking_strategy import extract_text_with_multiple_breaks
+        text = extract_text_with_multiple_breaks(pdf_path)
+    else:
+        text = load_diary_text()  # texto reconstruído de tests/diary_line_chunks.json
+    chunks = get_strategy(strategy or os.getenv("CHUNKING_STRATEGY", "day-paragraph"))(text)
+    vectors = _embedding_model.encode(chunks)
+    entities = [{"id": i, "vector": vector, "text": chunk} for i, (chunk, vector) in enumerate(zip(chunks, vectors), 1)]
+    return export_collection([entities], directory, "local-eval", primary_field="id")
+
+def evaluate_retrieval_locally(qa_pairs: List[Dict[str, str]], index_dir: str, k: int = 5) -> Dict:
+    """
+    Avaliação só do retrieval, sem rede e sem LLM: perguntas embedadas num batch
+    (ou lidas do cache em `index_dir`), busca no índice local e relevância pelos
+    termos-chave da resposta esperada (src/retrieval_eval.py).
+    """
+    from src.collection_io import load_local_index
+
+    timings = {}
+    start = time.perf_counter()
+    index = load_local_index(index_dir)
+    timings["load_index_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = embed_questions([qa["question"] for qa in qa_pairs], os.path.join(index_dir, "question_vectors.npz"))
+    if vectors.shape[1] != index.dim:
+        # Índice com dimensão reduzida: a mesma projeção das queries da API
+        from src.dim_reduction import load_reducer
+        vectors = load_reducer(os.environ["EMBEDDING_PROJECTION"]).transform(vectors)
+    timings["embed_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = evaluate_retrieval(index, vectors, qa_pairs, k)
+    timings["search_and_score_s"] = time.perf_counter() - start
+    results["summary"]["timings"] = {name: round(seconds, 4) for name, seconds in timings.items()}
+    return results
 
-    # Inicialize o cliente Zilliz
-    milvus_client = ZillizClient(
-        api_key=ZILLIZ_API_KEY,
-        cluster_id=ZILLIZ_CLUSTER_ID
-    )
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação do RAG (full: retrieval + LLM + juiz; retrieval: só o índice local)")
+    parser.add_argument("--mode", choices=["full", "retrieval"], default="full")
+    parser.add_argument("--questions", default=os.path.join(ROOT_DIR, "data", "questions.txt"))
+    parser.add_argument("--answers", default=os.path.join(ROOT_DIR, "data", "answers.txt"))
+    parser.add_argument("--index", default=os.getenv("EVAL_LOCAL_INDEX", os.path.join(ROOT_DIR, "data", "local_index")),
+                        help="exportação de coleção usada no modo retrieval")
+    parser.add_argument("--build-index", action="store_true", help="recria --index a partir do diário (CHUNKING_STRATEGY)")
+    parser.add_argument("--pdf", help="PDF do diário para --build-index (padrão: texto reconstruído dos testes)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", help="padrão: evaluation_results.json ou retrieval_eval_results.json")
+    args = parser.parse_args()
 
     # 1. Parsear os arquivos de perguntas e respostas
-    qa_pairs = parse_qa_files(questions_file, answers_file)
+    qa_pairs = parse_qa_files(args.questions, args.answers)
+
+    if args.mode == "retrieval":
+        if args.build_index or not os.path.exists(os.path.join(args.index, "manifest.json")):
+            manifest = build_local_index(args.index, args.pdf)
+            print(f"Índice local criado em {args.index}: {manifest['rows']} chunks", file=sys.stderr)
+        start = time.perf_counter()
+        results = evaluate_retrieval_locally(qa_pairs, args.index, args.k)
+        results["summary"]["timings"]["total_s"] = round(time.perf_counter() - start, 4)
+        print(json.dumps(results["summary"], indent=4, ensure_ascii=False))
+        with open(args.output or "retrieval_eval_results.json", "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=4, ensure_ascii=False)
+    else:
+        # Inicialize o cliente GroqProxy
+        groq_client = groq.GroqProxyRestAPI()
+        ZILLIZ_API_KEY = os.getenv("ZILLIZ_API_KEY")
+        ZILLIZ_CLUSTER_ID = os.getenv("ZILLIZ_CLUSTER_ID")
+
+        # Inicialize o cliente Zilliz
+        milvus_client = ZillizClient(
+            api_key=ZILLIZ_API_KEY,
+            cluster_id=ZILLIZ_CLUSTER_ID,
+            base_url=os.getenv("ZILLIZ_BASE_URL")
+        )
 
-    # 2. Avaliar o pipeline RAG
-    evaluation_results = evaluate_rag_with_groq(qa_pairs, groq_client, milvus_client)
+        # 2. Avaliar o pipeline RAG
+        evaluation_results = evaluate_rag_with_groq(qa_pairs, groq_client, milvus_client)
 
-    # 3. Imprimir os resultados em JSON
-    print(json.dumps(evaluation_results, indent=4, ensure_ascii=False))
-    with open("evaluation_results.json", "w", encoding="utf-8") as json_file:
-        json.dump(evaluation_results, json_file, indent=4, ensure_ascii=False)
\ No newline at end of file
+        # 3. Imprimir os resultados em JSON
+        print(json.dumps(evaluation_results, indent=4, ensure_ascii=False))
+        with open(args.output or "evaluation_results.json", "w", encoding="utf-8") as json_file:
+            json.dump(evaluation_results, json_file, indent=4, ensure_ascii=False)
@@ -0,0 +1,30 @@
+"""
+Exporta o modelo de embeddings para ONNX (+ int8 quantizado) para o loader de
+`src/embedding.py`, que passa a preferir o runtime ONNX quando os arquivos existem.
+
+    python scripts/export_onnx.py --output models/snowflake-arctic-embed-s-onnx
+"""
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src.embedding import DEFAULT_ONNX_DIR, EMBEDDING_MODEL_NAME, export_onnx
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--no-quantize", action="store_true", help="não gera model_quantized.onnx")
+    args = parser.parse_args()
+
+    output_dir = export_onnx(args.output, args.model, quantize=not args.no_quantize)
+    print(f"✅ Modelo exportado em: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Teste de carga do `/query` (ou de outro endpoint) com as perguntas de
+`data/questions.txt` (ver `src/loadgen.py`).
+
+    # open loop: 20 req/s por 60 s contra uma API já no ar
+    python scripts/load_test.py --url http://localhost:8000 --mode open --rate 20 --duration 60
+
+    # closed loop: 8 usuários sem think time
+    python scripts/load_test.py --mode closed --concurrency 8 --duration 60
+
+    # capacidade: sobe os stubs + a API e procura a maior taxa que cumpre o SLO
+    python scripts/load_test.py --with-stubs --mode open --sweep 5 10 20 40 80 --slo-p99-ms 1000 \\
+        --stub-args "--zilliz-latency lognormal:15:0.5 --groq-ttft lognormal:300:0.4" --output load.json
+
+Com `--with-stubs` a API roda num subprocesso apontada para `scripts/stub_servers.py`
+(diário de teste embedado, latências dos stubs em `--stub-args`), então o número de
+capacidade é comparável entre releases e não depende de Zilliz/Groq reais.
+"""
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+import requests
+
+from src.loadgen import HttpTarget, QuestionSampler, load_questions, run_closed_loop, run_open_loop
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout: float = 300, method: str = "get"):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Processo terminou antes de responder em {url}")
+        try:
+            getattr(requests, method)(url, timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Timeout esperando {url}")
+
+
+def start_with_stubs(port: int, stub_args: str, collection: str):
+    """Stubs + API (uvicorn) em subprocessos; devolve os processos para encerrar no fim."""
+    stubs = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, "scripts", "stub_servers.py"), "--seed-diary",
+                              "--collection", collection] + shlex.split(stub_args), cwd=ROOT_DIR)
+    processes = [stubs]
+    try:
+        wait_for("http://127.0.0.1:8101/_stub/stats", stubs)
+        wait_for("http://127.0.0.1:8102/_stub/stats", stubs)
+        env = dict(os.environ, ZILLIZ_BASE_URL="http://127.0.0.1:8101/v2",
+                   GROQ_BASE_URL="http://127.0.0.1:8102/openai/v1", ZILLIZ_API_KEY="stub", ZILLIZ_CLUSTER_ID="stub",
+                   groq_key="stub", collection_name=collection, EMBEDDING_WARMUP="eager",
+                   GROQ_RPM=os.getenv("GROQ_RPM", "100000"), GROQ_TPM=os.getenv("GROQ_TPM", "100000000"))
+        api = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+                                "--log-level", "warning"], cwd=ROOT_DIR, env=env)
+        processes.append(api)
+        wait_for(f"http://127.0.0.1:{port}/health/live", api)
+    except Exception:
+        stop(processes)
+        raise
+    return processes
+
+
+def stop(processes):
+    for process in reversed(processes):
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_once(args, target: HttpTarget, sampler: QuestionSampler, rate=None, concurrency=None) -> dict:
+    if args.warmup:
+        run_closed_loop(target, sampler, concurrency=min(4, concurrency or 4), duration=args.warmup)
+    if args.mode == "open":
+        report = run_open_loop(target, sampler, rate, args.duration, max_in_flight=args.max_in_flight,
+                               arrivals=args.arrivals, seed=args.seed)
+    else:
+        report = run_closed_loop(target, sampler, concurrency, args.duration, think_time=args.think_ms / 1000)
+    return report.summary()
+
+
+def meets_slo(summary: dict, args) -> bool:
+    p99 = summary["corrected_latency_ms"]["p99"]
+    return (summary["error_rate"] is not None and summary["error_rate"] <= args.max_error_rate
+            and p99 is not None and p99 <= args.slo_p99_ms)
+
+
+def print_summary(summary: dict):
+    load = f"{summary['offered_rate']} req/s" if summary["mode"] == "open" else f"{summary['concurrency']} users"
+    latency, corrected = summary["latency_ms"], summary["corrected_latency_ms"]
+    print(f"[{summary['mode']} {load}] {summary['requests']} requests, {summary['throughput_rps']} req/s, "
+          f"errors {summary['error_rate'] or 0:.2%} {summary['statuses']}")
+    print(f"    latency   p50 {latency['p50']} p90 {latency['p90']} p99 {latency['p99']} max {latency['max']} ms")
+    print(f"    corrected p50 {corrected['p50']} p90 {corrected['p90']} p99 {corrected['p99']} "
+          f"p99.9 {corrected['p99.9']} ms")
+    if "ttfb_ms" in summary:
+        print(f"    ttfb      p50 {summary['ttfb_ms']['p50']} p99 {summary['ttfb_ms']['p99']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/query")
+    parser.add_argument("--field", default="question", help="campo do JSON com a pergunta")
+    parser.add_argument("--stream", action="store_true", help="lê a resposta em streaming e mede o TTFB")
+    parser.add_argument("--header", action="append", default=[], help="Nome: valor (repetível)")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open")
+    parser.add_argument("--rate", type=float, default=10.0, help="open loop: requisições/s")
+    parser.add_argument("--arrivals", choices=["constant", "poisson"], default="constant")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4, help="closed loop: usuários")
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--sweep", nargs="+", type=float,
+                        help="taxas (open) ou usuários (closed) em sequência; relata a maior dentro do SLO")
+    parser.add_argument("--slo-p99-ms", type=float, default=1000.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="segundos de aquecimento (não medidos)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--questions", help="arquivo de perguntas (padrão data/questions.txt)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-stubs", action="store_true", help="sobe stubs + API localmente")
+    parser.add_argument("--port", type=int, default=8000, help="porta da API com --with-stubs")
+    parser.add_argument("--stub-args", default="", help="argumentos extras para scripts/stub_servers.py")
+    parser.add_argument("--collection", default=os.getenv("collection_name") or "dr_voss")
+    parser.add_argument("--output", help="grava o relatório JSON")
+    args = parser.parse_args()
+
+    processes = start_with_stubs(args.port, args.stub_args, args.collection) if args.with_stubs else []
+    url = f"http://127.0.0.1:{args.port}" if args.with_stubs else args.url
+    headers = dict(header.split(":", 1) for header in args.header)
+    target = HttpTarget(url, args.endpoint, args.field, args.stream, args.timeout,
+                        {name.strip(): value.strip() for name, value in headers.items()})
+    sampler = QuestionSampler(load_questions(args.questions), args.seed)
+    try:
+        levels = args.sweep or [args.rate if args.mode == "open" else args.concurrency]
+        runs = []
+        for level in levels:
+            if args.mode == "open":
+                summary = run_once(args, target, sampler, rate=level)
+            else:
+                summary = run_once(args, target, sampler, concurrency=int(level))
+            summary["meets_slo"] = meets_slo(summary, args)
+            print_summary(summary)
+            runs.append(summary)
+    finally:
+        stop(processes)
+
+    passing = [run for run in runs if run["meets_slo"]]
+    capacity = max((run["ok_rps"] for run in passing), default=None)
+    report = {"endpoint": args.endpoint, "mode": args.mode, "slo_p99_ms": args.slo_p99_ms,
+              "max_error_rate": args.max_error_rate, "capacity_rps": capacity, "runs": runs}
+    print(f"Capacity within SLO (p99 <= {args.slo_p99_ms:g} ms corrected, errors <= {args.max_error_rate:.1%}): "
+          f"{capacity if capacity is not None else 'none'} req/s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,334 @@
 import requests
+import contextvars
 import json
-from typing import Dict, List, Optional
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
 import os
+import sys
 from dotenv import load_dotenv
 import numpy as np
 
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src import fast_json
+from src.logger import get_logger
+from src.tracing import SPAN_KIND_CLIENT, current_span, inject_headers, span
+
+logger = get_logger("milvus")
+
 # from pymilvus import MilvusClient
 # client = MilvusClient("./milvus_demo.db")
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+class CircuitBreaker:
+    """
+    Abre após `failure_threshold` falhas consecutivas; depois de `reset_timeout`
+    segundos deixa passar uma única requisição de teste (half-open) antes de
+    fechar. As outras continuam barradas enquanto o teste não termina (ou até
+    outro `reset_timeout`, se o resultado do teste nunca vier).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            if self.probe_started is not None and now - self.probe_started < self.reset_timeout:
+                return False
+            self.probe_started = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+            self.probe_started = None
+
+
+class LatencyTracker:
+    """Janela deslizante de latências usada para calcular o atraso do hedge."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self.lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ZillizAPIError(requests.exceptions.RequestException):
+    """
+    Erro no corpo de uma resposta HTTP 200: a API v2 sinaliza falhas com
+    `code` diferente de 0. É um `RequestException` para passar pelos mesmos
+    retries, circuit breaker e fallback que um erro HTTP.
+    """
+
+    # Indisponibilidade/sobrecarga do servidor (Milvus: not ready, unavailable, internal,
+    # rate limit; Zilliz: 65535 "unexpected error" e códigos que espelham o HTTP)
+    RETRYABLE_CODES = {1, 2, 5, 8, 429, 500, 502, 503, 504, 65535}
+
+    def __init__(self, code: int, message: str = "", response=None):
+        super().__init__(f"Zilliz code {code}: {message}", response=response)
+        self.code = code
+
+    @property
+    def retryable(self) -> bool:
+        return self.code in self.RETRYABLE_CODES
+
+
+def _check_code(result, response=None):
+    if isinstance(result, dict) and result.get("code", 0) != 0:
+        raise ZillizAPIError(result["code"], result.get("message", ""), response)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, ZillizAPIError):
+        return error.retryable
+    # Corpo que não é JSON vem de proxy/gateway no caminho (página de erro), não do nosso pedido
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          requests.exceptions.InvalidJSONError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
 class ZillizClient:
-    def __init__(self, api_key: str, cluster_id: str, region: str = "gcp-us-west1"):
-        self.base_url = f"https://{cluster_id}.serverless.{region}.cloud.zilliz.com/v2"
+    # Endpoints de leitura podem ser re-tentados com segurança; insert/create não.
+    IDEMPOTENT_ENDPOINTS = {
+        "vectordb/collections/list",
+        "vectordb/collections/describe",
+        "vectordb/entities/query",
+        "vectordb/entities/get",
+        "vectordb/entities/search",
+    }
+    HEDGED_ENDPOINTS = {"vectordb/entities/search"}
+
+    def __init__(self, api_key: str, cluster_id: str, region: str = "gcp-us-west1",
+                 base_url: Optional[str] = None, timeout: float = 10.0,
+                 max_retries: int = 2, backoff_base: float = 0.1, backoff_max: float = 2.0,
+                 hedge: bool = True, hedge_percentile: float = 0.95, hedge_min_delay: float = 0.05,
+                 hedge_min_samples: int = 20, hedge_workers: int = 32,
+                 fallback_client: Optional["ZillizClient"] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url or f"https://{cluster_id}.serverless.{region}.cloud.zilliz.com/v2"
         self.headers = {
             "accept": "application/json",
             "authorization": f"Bearer {api_key}",
             "content-type": "application/json"
         }
-    
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict:
-        url = f"{self.base_url}/{endpoint}"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        # Réplica local (ex.: Milvus standalone do docker-compose) usada com o circuito aberto
+        self.fallback_client = fallback_client
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._primary_fields: Dict[str, str] = {}
+        # Uma vaga por worker: o que vai para o pool começa na hora, nunca espera na fila dele
+        self._hedge_pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="zilliz-hedge")
+        self._hedge_slots = threading.BoundedSemaphore(hedge_workers)
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "hedged_requests": 0,
+            "hedge_wins": 0,
+            "hedge_skipped": 0,
+            "fallback_requests": 0,
+        }
+
+    def _count(self, key: str, amount: int = 1):
+        with self._metrics_lock:
+            self.metrics[key] += amount
+
+    def get_metrics(self) -> Dict:
+        """Retorna contadores de retry/hedge/fallback, estado do circuito e latências."""
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        metrics["circuit_state"] = self.circuit_breaker.state
+        metrics["latency_p50"] = self.latency.percentile(0.5)
+        metrics["latency_p95"] = self.latency.percentile(0.95)
+        metrics["hedge_delay"] = self._hedge_delay()
+        return metrics
+
+    def _send(self, method: str, url: str, data: Optional[Dict]) -> Dict:
+        start = time.monotonic()
+        body = fast_json.dumps(data if data else {})
+        trace = current_span()
+        trace.add("http.request.bytes", len(body))
         response = requests.request(
             method=method,
             url=url,
-            headers=self.headers,
-            json=data if data else {}
+            headers=inject_headers(self.headers),
+            data=body,
+            timeout=self.timeout
         )
+        trace.set_attribute("http.status_code", response.status_code)
         response.raise_for_status()
-        
-        print(response.json())
-        return response.json()
+        elapsed = time.monotonic() - start
+        self.latency.record(elapsed)
+        trace.add("http.response.bytes", len(response.content))
+
+        # Parse único do corpo; o log é preguiçoso e amostrado (nada é formatado abaixo de DEBUG)
+        result = fast_json.loads_response(response)
+        logger.debug("%s %s -> %d bytes in %.1f ms", method, url, len(response.content), elapsed * 1000)
+        _check_code(result, response)
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+
+    def _submit(self, method: str, url: str, data: Optional[Dict]):
+        """Manda `_send` para o pool só se houver worker livre agora; senão devolve None."""
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+        # As threads do pool não herdam o contexto: copia para o span do trace continuar valendo
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                return context.run(self._send, method, url, data)
+            finally:
+                self._hedge_slots.release()
+
+        return self._hedge_pool.submit(run)
+
+    def _send_hedged(self, method: str, url: str, data: Optional[Dict]) -> Dict:
+        """
+        Dispara uma segunda requisição se a primeira passar do p95 e usa a que chegar primeiro.
+
+        Uma thread bloqueada na própria requisição não consegue devolver a do hedge,
+        então a primária só vai para o pool se houver worker livre (e começa na
+        hora: o atraso do hedge conta a partir do envio). Com o pool cheio a
+        primária roda na thread de quem chamou, sem hedge, e o hedge também só
+        sai se houver worker livre: sob sobrecarga não se duplica carga.
+        """
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._send(method, url, data)
+        primary = self._submit(method, url, data)
+        if primary is None:
+            self._count("hedge_skipped")
+            return self._send(method, url, data)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        hedge = self._submit(method, url, data)
+        if hedge is None:
+            self._count("hedge_skipped")
+            return primary.result()
+        self._count("hedged_requests")
+        current_span().set_attribute("zilliz.hedged", True)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict:
+        with span(f"zilliz {endpoint}", SPAN_KIND_CLIENT,
+                  **{"db.system": "milvus", "server.address": self.base_url}) as trace:
+            return self._request_with_retries(method, endpoint, data, trace)
+
+    def _request_with_retries(self, method: str, endpoint: str, data: Optional[Dict], trace) -> Dict:
+        url = f"{self.base_url}/{endpoint}"
+        self._count("requests")
+        if not self.circuit_breaker.allow_request() and self.fallback_client is not None:
+            self._count("fallback_requests")
+            trace.set_attribute("zilliz.fallback", "circuit_open")
+            return self.fallback_client._make_request(method, endpoint, data)
+
+        idempotent = endpoint in self.IDEMPOTENT_ENDPOINTS
+        hedged = self.hedge and endpoint in self.HEDGED_ENDPOINTS
+        attempts = self.max_retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            trace.add("zilliz.attempts")
+            try:
+                result = self._send_hedged(method, url, data) if hedged else self._send(method, url, data)
+                self.circuit_breaker.record_success()
+                return result
+            except requests.exceptions.RequestException as e:
+                retryable = _is_retryable(e)
+                # Um 4xx/código de parâmetro inválido é erro nosso: o servidor respondeu, o circuito não abre
+                if retryable:
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+                if attempt + 1 < attempts and retryable:
+                    self._count("retries")
+                    # Backoff exponencial com "full jitter"
+                    time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                    continue
+                self._count("failures")
+                if self.fallback_client is not None and idempotent:
+                    self._count("fallback_requests")
+                    trace.set_attribute("zilliz.fallback", "retries_exhausted")
+                    return self.fallback_client._make_request(method, endpoint, data)
+                raise
     
+    def ping(self, timeout: float = 2.0):
+        """Uma única chamada leve (sem retry/hedge/fallback) para os health checks."""
+        response = requests.post(f"{self.base_url}/vectordb/collections/list",
+                                 headers=self.headers, data=b"{}", timeout=timeout)
+        response.raise_for_status()
+        _check_code(fast_json.loads_response(response), response)
+
     def list_collections(self) -> List[Dict]:
         """Lista todas as coleções no cluster"""
         return self._make_request("POST", "vectordb/collections/list")
@@ -48,12 +344,13 @@ class ZillizClient:
         }
         return self._make_request("POST", "vectordb/collections/create", data)
     
-    def query_entities(self, collection_name: str, filter: str = "", output_fields: List[str] = ["*"], limit: int = 10):
+    def query_entities(self, collection_name: str, filter: str = "", output_fields: Optional[List[str]] = None,
+                       limit: int = 10):
         """Consulta entidades com filtro"""
         payload = {
             "collectionName": collection_name,
             "filter": filter,
-            "outputFields": output_fields,
+            "outputFields": output_fields or ["*"],
             "limit": limit
         }
         return self._make_request("POST", "vectordb/entities/query", payload)
@@ -74,27 +371,50 @@ class ZillizClient:
         }
         return self._make_request("POST", "vectordb/collections/describe", payload)
     
-    def get_all_entities(self, collection_name: str, batch_size: int = 100):
-        """Obtém todas as entidades de uma coleção (em lotes)"""
-        all_entities = []
-        offset = 0
-        
+    def get_primary_field(self, collection_name: str) -> str:
+        """Nome da chave primária da coleção, lido do describe (ex.: `primary_key` do prepare_data.py)."""
+        if collection_name not in self._primary_fields:
+            fields = (self.get_collection_stats(collection_name).get("data") or {}).get("fields") or []
+            primary = next((field["name"] for field in fields if field.get("primaryKey")), None)
+            if primary is None:
+                raise ValueError(f"Could not find the primary key field of collection {collection_name!r}")
+            self._primary_fields[collection_name] = primary
+        return self._primary_fields[collection_name]
+
+    def iter_entities(self, collection_name: str, batch_size: int = 1000, output_fields: Optional[List[str]] = None,
+                      primary_field: Optional[str] = None, filter: str = "") -> Iterator[List[Dict]]:
+        """
+        Percorre a coleção em lotes com paginação por cursor na chave primária
+        (`id > último id`), em vez de offset: cada página custa o mesmo no
+        servidor e só um lote fica em memória. O query do Milvus devolve as
+        entidades ordenadas pela chave primária. Sem `primary_field`, o nome vem
+        do describe da coleção.
+        """
+        primary_field = primary_field or self.get_primary_field(collection_name)
+        output_fields = output_fields or ["*"]
+        last_key = None
         while True:
+            conditions = [f"({filter})"] if filter else []
+            if last_key is not None:
+                key = f'"{last_key}"' if isinstance(last_key, str) else last_key
+                conditions.append(f"{primary_field} > {key}")
             payload = {
                 "collectionName": collection_name,
-                "outputFields": ["*"],
-                "limit": batch_size,
-                "offset": offset
+                "filter": " and ".join(conditions),
+                "outputFields": output_fields,
+                "limit": batch_size
             }
-            result = self._make_request("POST", "vectordb/entities/query", payload)
-            
-            if not result.get("data"):
-                break
-                
-            all_entities.extend(result["data"])
-            offset += batch_size
-            
-        return all_entities
+            batch = self._make_request("POST", "vectordb/entities/query", payload).get("data") or []
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last_key = max(entity[primary_field] for entity in batch)
+
+    def get_all_entities(self, collection_name: str, batch_size: int = 100):
+        """Obtém todas as entidades de uma coleção (em lotes)"""
+        return [entity for batch in self.iter_entities(collection_name, batch_size) for entity in batch]
     
     def get_entities_by_ids(self, collection_name: str, ids: List[int]) -> Dict:
         """Obtém entidades por seus IDs."""
@@ -104,13 +424,16 @@ class ZillizClient:
         }
         return self._make_request("POST", "vectordb/entities/get", payload)
     
-    def search_vectors(self, collection_name: str, vector: List[float], limit: int = 5) -> Dict:
-        """Realiza uma busca por similaridade"""
+    def search_vectors(self, collection_name: str, vector: List[float], limit: int = 1,
+                       output_fields: Optional[List[str]] = None) -> Dict:
+        """Realiza uma busca por similaridade (top-`limit`); `output_fields` voltam em cada hit"""
         payload = {
             "collectionName": collection_name,
             "data": [vector],
-            "limit": 1
+            "limit": limit
         }
+        if output_fields:
+            payload["outputFields"] = output_fields
         return self._make_request("POST", "vectordb/entities/search", payload)
 
 # Exemplo de uso:
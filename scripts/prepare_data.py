@@ -1,25 +1,29 @@
 import os
 import sys
 from PyPDF2 import PdfReader
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import numpy as np
-from milvus_db import ZillizClient  # Importando a classe do arquivo separado
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if ROOT_DIR not in sys.path:
     sys.path.append(ROOT_DIR)
 
-from src.archive.chunking_strategy import chunk_diary_by_day_and_paragraph
+from scripts.milvus_db import ZillizClient  # Importando a classe do arquivo separado
+from src.chunking_registry import get_strategy
+from src.dim_reduction import FULL_VECTOR_FIELD, make_reducer
+from src.embedding import EMBEDDING_DIM, LazyEmbedder
+from src.embedding_batching import BucketedEmbeddingRunner
+from src.profiling import memory_profile
+from src.sharding import ShardedRetriever
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
 class PDFProcessor:
     def __init__(self):
-        # Model - embeddings
-        self.model = SentenceTransformer("Snowflake/snowflake-arctic-embed-s")
-        self.embedding_dim = 384  # Dimensão dos embeddings do modelo Arctic-S
+        # Model - embeddings; carregado no primeiro encode (com EMBEDDING_PROCESSES > 0 só os workers carregam)
+        self.model = LazyEmbedder()
+        self.embedding_dim = EMBEDDING_DIM
         self.collection_name = os.getenv("collection_name")
         # Client Milvus
         self.milvus_client = ZillizClient(
@@ -27,6 +31,8 @@ class PDFProcessor:
             cluster_id=os.getenv("ZILLIZ_CLUSTER_ID"),
             region=os.getenv("ZILLIZ_REGION", "gcp-us-west1")
         )
+        # SHARDS definido: os chunks são distribuídos pelos shards (SHARD_ROUTING) em vez da coleção única
+        self.retriever = ShardedRetriever.from_env(self.milvus_client)
 
     def extract_text_from_pdf(self, pdf_path) -> str:
         """Extrai texto de um arquivo PDF com metadados de página"""
@@ -43,64 +49,111 @@ class PDFProcessor:
 
 
     def chunk_text(self, text) -> list[str]:
-        """Divides Text into Chunks from Strategy set in - chunking_strategy.py."""
-        print("Taking the chunks from chunking_strategy.py...")
-        return chunk_diary_by_day_and_paragraph(text)
+        """Divides Text into Chunks with the strategy named in CHUNKING_STRATEGY (chunking_registry.py)."""
+        strategy = os.getenv("CHUNKING_STRATEGY", "day-paragraph")
+        print(f"Taking the chunks with strategy '{strategy}'...")
+        return get_strategy(strategy)(text)
 
     def generate_embeddings(self, chunks) -> list[np.ndarray]:
         """Generates embeddings using model Snowflake Arctic"""
         print("Generating embeddings...")
         texts = [chunk for chunk in chunks]  # A função de chunking já retorna uma lista de strings
-        return self.model.encode(texts, normalize_embeddings=True)
+        # Batches agrupados por tamanho em tokens; EMBEDDING_PROCESSES > 0 distribui entre processos
+        processes = int(os.getenv("EMBEDDING_PROCESSES", "0"))
+        # Os workers resolvem o runtime pelo mesmo EMBEDDING_RUNTIME, sem modelo no processo principal
+        with BucketedEmbeddingRunner(self.model if processes == 0 else None, processes=processes) as runner:
+            embeddings = runner.encode(texts)
+        stats = runner.get_stats()
+        throughput = f"{stats['tokens_per_second']:.0f}" if stats["tokens_per_second"] is not None else "-"
+        print(f"{stats['tokens']} tokens in {stats['seconds']:.1f}s ({throughput} tokens/s, "
+              f"{stats['padding_fraction']:.0%} padding)")
+        return embeddings
+
+    def reduce_dimensions(self, embeddings):
+        """Optional PCA/truncation to EMBEDDING_REDUCED_DIM; the projection is saved for the query side."""
+        reduced_dim = os.getenv("EMBEDDING_REDUCED_DIM")
+        if not reduced_dim:
+            return embeddings
+        reducer = make_reducer(os.getenv("EMBEDDING_REDUCTION", "pca"), int(reduced_dim)).fit(embeddings)
+        projection_path = os.getenv("EMBEDDING_PROJECTION", os.path.join("models", "embedding_projection.npz"))
+        os.makedirs(os.path.dirname(projection_path) or ".", exist_ok=True)
+        reducer.save(projection_path)
+        self.embedding_dim = reducer.dim
+        print(f"Reduced embeddings to {reducer.dim} dims ({reducer.kind}), projection saved to {projection_path}. "
+              f"The collection must be created with dimension={reducer.dim}.")
+        return reducer.transform(embeddings)
 
     def process_pdf(self, pdf_path):
         """Pipeline completo de processamento"""
-        try:
-            # 1. Extrair texto com metadados de página
-            text = self.extract_text_from_pdf(pdf_path)
+        # PROFILE_MEMORY=1: snapshots do tracemalloc por etapa, servidos em /admin/profiles
+        with memory_profile("prepare_data", os.getenv("PROFILE_MEMORY") == "1") as memory:
+            try:
+                # 1. Extrair texto com metadados de página
+                text = self.extract_text_from_pdf(pdf_path)
+                if memory:
+                    memory.checkpoint("extract_text")
             
-            # 2. Dividir em chunks com metadados
-            chunks = self.chunk_text(text)
-            total_chunks = len(chunks)
-            print(f"Total de chunks = {total_chunks}")
-            print("\n--- Primeiros 3 Chunks e seus tamanhos ---")
-            for i, chunk in enumerate(chunks[:3]):
-                print(f"Chunk {i+1}:")
-                print(f"  Tamanho: {len(chunk)} caracteres")
-                print(f"  Conteúdo (primeiros 50 caracteres): {chunk[:50]}...")
-                print("-" * 20)
+                # 2. Dividir em chunks com metadados
+                chunks = self.chunk_text(text)
+                if memory:
+                    memory.checkpoint("chunk_text")
+                total_chunks = len(chunks)
+                print(f"Total de chunks = {total_chunks}")
+                print("\n--- Primeiros 3 Chunks e seus tamanhos ---")
+                for i, chunk in enumerate(chunks[:3]):
+                    print(f"Chunk {i+1}:")
+                    print(f"  Tamanho: {len(chunk)} caracteres")
+                    print(f"  Conteúdo (primeiros 50 caracteres): {chunk[:50]}...")
+                    print("-" * 20)
                 
                 
-            # 3. Gerar embeddings
-            embeddings = self.generate_embeddings(chunks)
+                # 3. Gerar embeddings
+                full_embeddings = self.generate_embeddings(chunks)
+                embeddings = self.reduce_dimensions(full_embeddings)
+                # Com redução, o vetor cheio vai junto (campo dinâmico) para o rescoring da API
+                reduced = embeddings is not full_embeddings
+                if memory:
+                    memory.checkpoint("embeddings")
             
-            # 4. Preparar dados para o Milvus
-            entities = []
-            for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings), start=1):
-                # Garante que todos os campos obrigatórios existam
-                entity = {
-                    "primary_key": int(idx),  # must be int
-                    "vector": embedding.tolist(),
-                    "text": chunk,
-                }
+                # 4. Preparar dados para o Milvus
+                entities = []
+                primary_field = self.retriever.primary_field if self.retriever else "primary_key"
+                for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings), start=1):
+                    # Garante que todos os campos obrigatórios existam
+                    entity = {
+                        primary_field: int(idx),  # must be int
+                        "vector": embedding.tolist(),
+                        "text": chunk,
+                    }
+                    if reduced:
+                        entity[FULL_VECTOR_FIELD] = np.asarray(full_embeddings[idx - 1]).tolist()
+                    if self.retriever:
+                        # Metadado para SHARD_ROUTING=field:source
+                        entity["source"] = os.path.splitext(os.path.basename(pdf_path))[0]
             
-                # Remove campos vazios ou None (opcional)
-                entity = {k: v for k, v in entity.items() if v is not None}
+                    # Remove campos vazios ou None (opcional)
+                    entity = {k: v for k, v in entity.items() if v is not None}
                 
-                entities.append(entity)
+                    entities.append(entity)
                 
-                # 5. Armazenar no Milvus
-                self.milvus_client.insert_vectors(self.collection_name, entities)
+                    # 5. Armazenar no Milvus
+                    if self.retriever is None:
+                        self.milvus_client.insert_vectors(self.collection_name, entities)
                 
-                print(f"✅ Process done! {idx} chunk sent.")
+                        print(f"✅ Process done! {idx} chunk sent.")
+                if self.retriever is not None:
+                    for shard, count in self.retriever.insert(entities).items():
+                        print(f"✅ Process done! {count} chunks sent to shard {shard}.")
+                if memory:
+                    memory.checkpoint("insert")
             
-        except Exception as e:
-            print(f"❌ Error within the process: {e}")
-            raise
+            except Exception as e:
+                print(f"❌ Error within the process: {e}")
+                raise
 
     def test_similarity(self, sentences):
         """Testa a similaridade entre frases"""
-        embeddings = self.model.encode(sentences, normalize_embeddings=True)
+        embeddings = self.model.encode(sentences)
         similarities = np.dot(embeddings, embeddings.T)
         print("Matriz de Similaridade:")
         print(similarities)
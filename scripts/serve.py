@@ -0,0 +1,96 @@
+"""
+Sobe a API com vários workers sem carregar uma cópia do modelo por processo.
+
+    python scripts/serve.py --mode sidecar --workers 4   # um processo de embeddings + N workers uvicorn
+    python scripts/serve.py --mode prefork --workers 4   # gunicorn carrega o modelo no master e faz fork
+
+sidecar: os workers usam `RemoteEmbedder` (Unix socket) e nunca importam torch/onnxruntime.
+prefork: o master carrega os pesos (sem inferência), chama gc.freeze() e os workers
+         compartilham as páginas via copy-on-write. Requer gunicorn.
+"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src.embedding_server import DEFAULT_SOCKET
+
+
+def serve_sidecar(host: str, port: int, workers: int, socket_path: str):
+    import uvicorn
+
+    sidecar = subprocess.Popen(
+        [sys.executable, "-m", "src.embedding_server", "--socket", socket_path], cwd=ROOT_DIR
+    )
+    try:
+        deadline = time.monotonic() + 300
+        while not os.path.exists(socket_path):
+            if sidecar.poll() is not None:
+                raise RuntimeError("Sidecar de embeddings terminou antes de abrir o socket")
+            if time.monotonic() > deadline:
+                raise RuntimeError("Timeout esperando o sidecar de embeddings")
+            time.sleep(0.1)
+        os.environ["EMBEDDING_RUNTIME"] = "remote"
+        os.environ["EMBEDDING_SOCKET"] = socket_path
+        os.chdir(ROOT_DIR)
+        uvicorn.run("app:app", host=host, port=port, workers=workers)
+    finally:
+        sidecar.terminate()
+        sidecar.wait()
+
+
+def serve_prefork(host: str, port: int, workers: int):
+    from gunicorn.app.base import BaseApplication
+
+    # Sessões do ONNX Runtime criam thread pools na inicialização e não sobrevivem a fork;
+    # os pesos do torch sim, desde que nenhuma inferência rode no master.
+    os.environ.setdefault("EMBEDDING_RUNTIME", "torch")
+
+    def post_fork(server, worker):
+        if "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    class PreforkApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            import app as rag_app
+
+            rag_app.rag_system.embedding_model.load()
+            # Move tudo que já existe para a geração permanente: o GC dos workers não
+            # toca nesses objetos e as páginas continuam compartilhadas.
+            gc.freeze()
+            return rag_app.app
+
+    os.chdir(ROOT_DIR)
+    PreforkApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["sidecar", "prefork"], default="sidecar")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SOCKET", DEFAULT_SOCKET))
+    args = parser.parse_args()
+
+    if args.mode == "sidecar":
+        serve_sidecar(args.host, args.port, args.workers, args.socket)
+    else:
+        serve_prefork(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Sobe os stubs do Zilliz e da Groq (`src/stubs`) para rodar o app, o eval e os
+benchmarks sem credenciais nem rede.
+
+    python scripts/stub_servers.py --seed-diary                       # embeda o diário de teste
+    python scripts/stub_servers.py --seed backups/dr_voss \\
+        --zilliz-latency lognormal:15:0.6 --groq-ttft lognormal:250:0.4 --groq-tps 300 \\
+        --groq-throttle-rate 0.05 --zilliz-error-rate 0.01
+
+Depois, no app / eval:
+
+    ZILLIZ_BASE_URL=http://127.0.0.1:8101/v2 GROQ_BASE_URL=http://127.0.0.1:8102/openai/v1 \\
+    ZILLIZ_API_KEY=stub ZILLIZ_CLUSTER_ID=stub groq_key=stub collection_name=dr_voss uvicorn app:app
+
+As falhas podem ser trocadas com os servidores no ar:
+`curl -X POST localhost:8102/_stub/faults -d '{"throttle_rate": 0.2}'` (e `/_stub/stats`).
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src.logger import get_logger
+from src.stubs import FaultInjector, GroqStub, ZillizStub, create_groq_app, create_zilliz_app
+
+logger = get_logger("stubs")
+
+
+def seed_diary(stub: ZillizStub, collection_name: str):
+    """Chunks do diário de teste (estratégia de CHUNKING_STRATEGY) com o modelo de embeddings local."""
+    from scripts.benchmarks.corpus import load_diary_text
+    from src.chunking_registry import get_strategy
+    from src.embedding import load_embedder
+
+    chunks = get_strategy(os.getenv("CHUNKING_STRATEGY", "day-paragraph"))(load_diary_text())
+    vectors = load_embedder().encode(chunks, batch_size=32)
+    stub.load_texts(collection_name, chunks, vectors)
+
+
+async def serve(apps):
+    import uvicorn
+
+    servers = [uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+               for app, host, port in apps]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--zilliz-port", type=int, default=8101)
+    parser.add_argument("--groq-port", type=int, default=8102)
+    parser.add_argument("--collection", default=os.getenv("collection_name") or "dr_voss")
+    parser.add_argument("--seed", help="exportação de scripts/collection_backup.py para carregar na coleção")
+    parser.add_argument("--seed-diary", action="store_true", help="embeda o diário de teste na coleção")
+    for service in ("zilliz", "groq"):
+        parser.add_argument(f"--{service}-latency", default="0",
+                            help="fixed:ms | uniform:lo:hi | lognormal:mediana:sigma")
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"--{service}-error-status", type=int, default=503)
+        parser.add_argument(f"--{service}-throttle-rate", type=float, default=0.0, help="fração de respostas 429")
+        parser.add_argument(f"--{service}-retry-after", type=float, default=1.0)
+    parser.add_argument("--groq-ttft", default="0", help="latência até o primeiro token")
+    parser.add_argument("--groq-tps", type=float, default=0.0, help="tokens por segundo gerados (0 = sem atraso)")
+    parser.add_argument("--seed-rng", type=int, default=None, help="semente das falhas (execuções reproduzíveis)")
+    args = parser.parse_args()
+
+    faults = {service: FaultInjector(
+        latency=getattr(args, f"{service}_latency"),
+        error_rate=getattr(args, f"{service}_error_rate"),
+        error_status=getattr(args, f"{service}_error_status"),
+        throttle_rate=getattr(args, f"{service}_throttle_rate"),
+        retry_after=getattr(args, f"{service}_retry_after"),
+        seed=args.seed_rng,
+    ) for service in ("zilliz", "groq")}
+
+    zilliz = ZillizStub()
+    if args.seed:
+        zilliz.load_export(args.collection, args.seed)
+    if args.seed_diary:
+        seed_diary(zilliz, args.collection)
+    for name, collection in zilliz.collections.items():
+        logger.info("Collection %s: %d entities, dim %d", name, len(collection), collection.dimension)
+
+    groq = GroqStub(ttft=args.groq_ttft, tokens_per_second=args.groq_tps)
+    logger.info("Zilliz stub on http://%s:%d/v2, Groq stub on http://%s:%d/openai/v1",
+                args.host, args.zilliz_port, args.host, args.groq_port)
+    asyncio.run(serve([
+        (create_zilliz_app(zilliz, faults["zilliz"]), args.host, args.zilliz_port),
+        (create_groq_app(groq, faults["groq"]), args.host, args.groq_port),
+    ]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Controle de admissão do `/query`.
+
+Sem isto, uma rajada de requisições (um eval batendo na API, por exemplo)
+entra inteira no thread pool do Starlette e fica na fila dele, FIFO, até o
+cliente desistir; uma pergunta interativa que chega no meio espera atrás de
+todas. Aqui a espera acontece no event loop, antes do thread pool:
+
+- no máximo `max_concurrency` queries em processamento;
+- uma fila limitada por faixa de prioridade (`lanes`, da mais para a menos
+  prioritária: `interactive`, `batch`). Quando uma vaga abre, vai para a
+  primeira faixa com alguém esperando;
+- cada faixa pode ter um teto de vagas (`max_active`): o batch nunca ocupa
+  todas, então uma pergunta interativa só espera a próxima vaga das que
+  sobraram, nunca o fim de uma fila de eval;
+- cada requisição tem um prazo (header `X-Deadline-Ms` ou o padrão da faixa).
+  É descartada com 503 + Retry-After se o prazo já passou na chegada, se a
+  espera estimada (fila à frente x tempo médio de serviço / vagas) não cabe
+  no prazo, ou se o prazo vence na fila. Fila cheia também dá 503.
+
+Desligado por padrão: ligado, limita o `/query` a `ADMISSION_CONCURRENCY`
+queries em paralelo, abaixo das 40 threads do pool.
+
+    ADMISSION_ENABLED=false               # opt-in
+    ADMISSION_CONCURRENCY=8               # queries em processamento (<= threads do pool, 40)
+    ADMISSION_BATCH_CONCURRENCY=6         # teto do batch; o resto fica reservado ao interativo
+    ADMISSION_INTERACTIVE_QUEUE=32        # requisições esperando, por faixa
+    ADMISSION_BATCH_QUEUE=64
+    ADMISSION_INTERACTIVE_TIMEOUT_MS=15000  # prazo sem X-Deadline-Ms; 0 = sem prazo
+    ADMISSION_BATCH_TIMEOUT_MS=120000
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional
+
+
+class Rejected(Exception):
+    """Requisição recusada; `reason` é "queue_full" ou "deadline" e `retry_after` está em segundos."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    def __init__(self, name: str, max_queue: int, max_active: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """timeout: prazo padrão em segundos para requisições sem prazo explícito (None = sem prazo)."""
+        self.name = name
+        self.max_queue = max_queue
+        self.max_active = max_active
+        self.timeout = timeout
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.stats = {"admitted": 0, "rejected": 0, "shed": 0, "cancelled": 0, "wait_seconds": 0.0,
+                      "max_wait_seconds": 0.0}
+
+    def has_room(self) -> bool:
+        return self.max_active is None or self.active < self.max_active
+
+
+class AdmissionController:
+    """
+    Usado só a partir do event loop (sem locks): `admit` é um context manager
+    assíncrono que espera a vez e libera a vaga na saída.
+    """
+
+    def __init__(self, max_concurrency: int = 8, lanes: Optional[List[Lane]] = None, alpha: float = 0.2):
+        self.max_concurrency = max(1, max_concurrency)
+        lanes = lanes or [Lane("interactive", 32), Lane("batch", 64)]
+        self.lanes: Dict[str, Lane] = {lane.name: lane for lane in lanes}  # ordem = prioridade
+        self.active = 0
+        self.alpha = alpha
+        self.service_time: Optional[float] = None  # média móvel (EWMA) do tempo em processamento
+
+    @classmethod
+    def from_env(cls) -> Optional["AdmissionController"]:
+        if os.getenv("ADMISSION_ENABLED", "false").lower() != "true":
+            return None
+        concurrency = int(os.getenv("ADMISSION_CONCURRENCY", "8"))
+
+        def timeout(name: str, default: str) -> Optional[float]:
+            value = float(os.getenv(f"ADMISSION_{name}_TIMEOUT_MS", default))
+            return value / 1000 if value > 0 else None
+
+        return cls(concurrency, [
+            Lane("interactive", int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "32")),
+                 timeout=timeout("INTERACTIVE", "15000")),
+            Lane("batch", int(os.getenv("ADMISSION_BATCH_QUEUE", "64")),
+                 max_active=int(os.getenv("ADMISSION_BATCH_CONCURRENCY", str(max(1, concurrency - 2)))),
+                 timeout=timeout("BATCH", "120000")),
+        ])
+
+    def deadline(self, lane: str, budget_ms: Optional[float] = None, now: Optional[float] = None) -> Optional[float]:
+        """Prazo absoluto (`time.monotonic()`) a partir do orçamento do cliente ou do padrão da faixa."""
+        now = time.monotonic() if now is None else now
+        if budget_ms is not None:
+            return now + budget_ms / 1000
+        timeout = self.lanes[lane].timeout
+        return now + timeout if timeout is not None else None
+
+    def _slots(self, lane: Lane) -> int:
+        return min(self.max_concurrency, lane.max_active or self.max_concurrency)
+
+    def estimated_wait(self, lane: Lane) -> float:
+        """Espera estimada de quem entrar agora no fim da fila de `lane` (0 sem amostras de serviço)."""
+        if self.service_time is None:
+            return 0.0
+        ahead = 0
+        for other in self.lanes.values():
+            ahead += len(other.waiters)  # as faixas mais prioritárias passam na frente
+            if other is lane:
+                break
+        return (ahead + 1) * self.service_time / self._slots(lane)
+
+    def _retry_after(self, lane: Lane) -> int:
+        return max(1, math.ceil(self.estimated_wait(lane)))
+
+    def _grant(self, lane: Lane):
+        self.active += 1
+        lane.active += 1
+        lane.stats["admitted"] += 1
+
+    def _dispatch(self):
+        """Entrega as vagas livres às faixas em ordem de prioridade."""
+        while self.active < self.max_concurrency:
+            lane = next((lane for lane in self.lanes.values() if lane.waiters and lane.has_room()), None)
+            if lane is None:
+                return
+            waiter = lane.waiters.popleft()
+            if waiter.done():  # desistiu (prazo ou cliente); a vaga vai para o próximo
+                continue
+            self._grant(lane)
+            waiter.set_result(None)
+
+    def _reject(self, lane: Lane, reason: str) -> Rejected:
+        lane.stats["rejected" if reason == "queue_full" else "shed"] += 1
+        return Rejected(reason, self._retry_after(lane))
+
+    async def acquire(self, lane_name: str, deadline: Optional[float] = None):
+        """Espera uma vaga em `lane_name` até `deadline` (monotonic); levanta `Rejected`."""
+        lane = self.lanes[lane_name]
+        now = time.monotonic()
+        if deadline is not None and deadline <= now:
+            raise self._reject(lane, "deadline")
+        if self.active < self.max_concurrency and lane.has_room() and not lane.waiters:
+            self._grant(lane)
+            return
+        if len(lane.waiters) >= lane.max_queue:
+            raise self._reject(lane, "queue_full")
+        if deadline is not None and now + self.estimated_wait(lane) > deadline:
+            raise self._reject(lane, "deadline")  # não daria tempo: descarta já, sem ocupar a fila
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - now)
+            await asyncio.wait([waiter], timeout=timeout)
+        except asyncio.CancelledError:
+            # Cliente desconectou: devolve a vaga se ela já tinha sido entregue
+            if waiter.done() and not waiter.cancelled():
+                self.release(lane_name)
+            else:
+                waiter.cancel()
+                self._remove(lane, waiter)
+            lane.stats["cancelled"] += 1
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self._remove(lane, waiter)
+            raise self._reject(lane, "deadline")
+        waited = time.monotonic() - now
+        lane.stats["wait_seconds"] += waited
+        lane.stats["max_wait_seconds"] = max(lane.stats["max_wait_seconds"], waited)
+
+    @staticmethod
+    def _remove(lane: Lane, waiter: asyncio.Future):
+        try:
+            lane.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, lane_name: str, service_time: Optional[float] = None):
+        lane = self.lanes[lane_name]
+        self.active -= 1
+        lane.active -= 1
+        if service_time is not None:
+            self.service_time = service_time if self.service_time is None else \
+                self.alpha * service_time + (1 - self.alpha) * self.service_time
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, lane_name: str, deadline: Optional[float] = None):
+        await self.acquire(lane_name, deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(lane_name, time.monotonic() - start)
+
+    def get_stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "service_time_ms": round(self.service_time * 1000, 3) if self.service_time is not None else None,
+            "lanes": {name: dict(lane.stats, active=lane.active, queued=len(lane.waiters),
+                                 max_active=lane.max_active, max_queue=lane.max_queue,
+                                 estimated_wait_ms=round(self.estimated_wait(lane) * 1000, 3))
+                      for name, lane in self.lanes.items()},
+        }
@@ -0,0 +1,226 @@
+"""
+Representação compacta dos chunks do diário.
+
+Em vez de um dict por chunk (com `day_metadata` e lista de palavras próprias),
+a `ChunkTable` guarda colunas em `array` (struct-of-arrays), um único buffer de
+texto indexado por offsets, um `DayMetadata` internado por dia e as palavras
+maiúsculas como ids num vocabulário compartilhado.
+"""
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from src import fast_json
+
+
+class DayMetadata:
+    __slots__ = ("full_date", "title")
+
+    def __init__(self, full_date: str, title: str):
+        self.full_date = sys.intern(full_date)
+        self.title = sys.intern(title)
+
+    def to_dict(self) -> Dict:
+        return {"full_date": self.full_date, "title": self.title}
+
+
+class ChunkRecord:
+    """Visão de uma linha da tabela; não copia dados."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "ChunkTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def chunk_number(self) -> int:
+        return self.table.chunk_number[self.index]
+
+    @property
+    def chunk_text(self) -> str:
+        return self.table.text(self.index)
+
+    @property
+    def day(self) -> DayMetadata:
+        return self.table.days[self.table.day_index[self.index]]
+
+    @property
+    def date(self) -> str:
+        return self.day.full_date
+
+    @property
+    def line_count(self) -> int:
+        return self.table.line_count[self.index]
+
+    @property
+    def word_count(self) -> int:
+        return self.table.word_count[self.index]
+
+    @property
+    def is_date_chunk(self) -> bool:
+        return bool(self.table.is_date_chunk[self.index])
+
+    @property
+    def palavras_maiusculas(self) -> List[str]:
+        return self.table.terms(self.index)
+
+
+class ChunkTable:
+    def __init__(self):
+        self.days: List[DayMetadata] = []
+        self.vocabulary: List[str] = []
+        self._term_ids: Dict[str, int] = {}
+        self._pieces: List[str] = []
+        self._buffer: Optional[str] = None
+        self._length = 0
+        self.text_offsets = array("L", [0])
+        self.chunk_number = array("L")
+        self.day_index = array("L")
+        self.line_count = array("L")
+        self.word_count = array("L")
+        self.is_date_chunk = array("b")
+        self.term_ids = array("L")
+        self.term_offsets = array("L", [0])
+
+    def __len__(self) -> int:
+        return len(self.chunk_number)
+
+    def __getitem__(self, index: int) -> ChunkRecord:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return ChunkRecord(self, index)
+
+    def __iter__(self) -> Iterator[ChunkRecord]:
+        return (ChunkRecord(self, i) for i in range(len(self)))
+
+    def add_day(self, full_date: str, title: str) -> int:
+        self.days.append(DayMetadata(full_date, title))
+        return len(self.days) - 1
+
+    def _intern_term(self, term: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.vocabulary)
+            self._term_ids[term] = term_id
+            self.vocabulary.append(sys.intern(term))
+        return term_id
+
+    def append(self, chunk_number: int, text: str, day: int, line_count: int, word_count: int,
+               is_date_chunk: bool = False, terms: Optional[List[str]] = None):
+        self._pieces.append(text)
+        self._buffer = None
+        self._length += len(text)
+        self.text_offsets.append(self._length)
+        self.chunk_number.append(chunk_number)
+        self.day_index.append(day)
+        self.line_count.append(line_count)
+        self.word_count.append(word_count)
+        self.is_date_chunk.append(1 if is_date_chunk else 0)
+        if terms:
+            self.term_ids.extend(self._intern_term(term) for term in terms)
+        self.term_offsets.append(len(self.term_ids))
+
+    @property
+    def buffer(self) -> str:
+        """Todo o texto concatenado; os pedaços são unidos uma vez e descartados."""
+        if self._buffer is None:
+            self._buffer = "".join(self._pieces)
+            self._pieces = [self._buffer]
+        return self._buffer
+
+    def text(self, index: int) -> str:
+        return self.buffer[self.text_offsets[index]:self.text_offsets[index + 1]]
+
+    def texts(self) -> List[str]:
+        buffer, offsets = self.buffer, self.text_offsets
+        return [buffer[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+    def terms(self, index: int) -> List[str]:
+        start, end = self.term_offsets[index], self.term_offsets[index + 1]
+        return [self.vocabulary[t] for t in self.term_ids[start:end]]
+
+    def chunks_per_day(self) -> Dict[str, int]:
+        counts = [0] * len(self.days)
+        for day in self.day_index:
+            counts[day] += 1
+        result: Dict[str, int] = {}
+        for day, count in zip(self.days, counts):
+            # Datas repetidas no diário somam no mesmo dia, como no formato antigo
+            result[day.full_date] = result.get(day.full_date, 0) + count
+        return result
+
+    def to_legacy_dict(self, include_terms: bool = False) -> Dict:
+        """Converte para o formato de `process_diary_chunks` (um dict por chunk)."""
+        day_dicts = [day.to_dict() for day in self.days]
+        chunks = []
+        for i in range(len(self)):
+            day_metadata = day_dicts[self.day_index[i]]
+            if include_terms:
+                day_metadata = dict(day_metadata, palavras_maiusculas=self.terms(i))
+            chunks.append({
+                "chunk_number": self.chunk_number[i],
+                "chunk_text": self.text(i),
+                "date": day_dicts[self.day_index[i]]["full_date"],
+                "day_metadata": day_metadata,
+                "line_count": self.line_count[i],
+                "word_count": self.word_count[i],
+                "is_date_chunk": bool(self.is_date_chunk[i]),
+            })
+        total_days, total_chunks = len(self.days), len(self)
+        return {
+            "metadata": {
+                "total_days": total_days,
+                "total_chunks": total_chunks,
+                "chunks_per_day": self.chunks_per_day(),
+                "avg_chunks_per_day": total_chunks / total_days if total_days else 0.0,
+            },
+            "chunks": chunks,
+        }
+
+    def to_json(self) -> bytes:
+        """Serialização colunar: cada coluna vira uma lista, o texto um único string."""
+        return fast_json.dumps({
+            "days": [[day.full_date, day.title] for day in self.days],
+            "vocabulary": self.vocabulary,
+            "text": self.buffer,
+            "columns": {
+                "text_offsets": self.text_offsets.tolist(),
+                "chunk_number": self.chunk_number.tolist(),
+                "day_index": self.day_index.tolist(),
+                "line_count": self.line_count.tolist(),
+                "word_count": self.word_count.tolist(),
+                "is_date_chunk": self.is_date_chunk.tolist(),
+                "term_ids": self.term_ids.tolist(),
+                "term_offsets": self.term_offsets.tolist(),
+            },
+        })
+
+    @classmethod
+    def from_json(cls, data) -> "ChunkTable":
+        payload = fast_json.loads(data)
+        table = cls()
+        for full_date, title in payload["days"]:
+            table.add_day(full_date, title)
+        for term in payload["vocabulary"]:
+            table._intern_term(term)
+        table._pieces = [payload["text"]]
+        table._length = len(payload["text"])
+        columns = payload["columns"]
+        for name in ("text_offsets", "chunk_number", "day_index", "line_count", "word_count",
+                     "term_ids", "term_offsets"):
+            setattr(table, name, array("L", columns[name]))
+        table.is_date_chunk = array("b", columns["is_date_chunk"])
+        return table
+
+    def to_entities(self, embeddings, start_id: int = 1) -> Iterator[Dict]:
+        """Gera as entidades para `ZillizClient.insert_vectors` sem materializar a lista inteira."""
+        buffer, offsets = self.buffer, self.text_offsets
+        for i, vector in enumerate(embeddings):
+            yield {
+                "primary_key": start_id + i,
+                "vector": vector,
+                "text": buffer[offsets[i]:offsets[i + 1]],
+            }
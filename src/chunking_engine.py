@@ -0,0 +1,176 @@
+"""
+Motor de chunking de passada única.
+
+O `ChunkingEngine` percorre o texto uma vez, linha a linha, com os padrões já
+compilados, e emite eventos (data, linha, linha em branco) para uma política de
+chunking. As palavras maiúsculas são extraídas por linha nessa mesma passada,
+em vez de um `re.findall` sobre cada chunk montado. As políticas decidem como
+agrupar as linhas:
+
+- `LineWindowPolicy`: linha de data como chunk próprio + um chunk a cada N linhas
+  (`process_diary_chunks`, N=3; versões v3/cloud/docker, N=4), gerando `ChunkTable`.
+- `DayParagraphPolicy`: parágrafos de cada dia (`chunk_diary_by_day_and_paragraph`).
+"""
+import re
+from typing import List, Optional, Pattern
+
+from src.chunk_table import ChunkTable
+
+DATE_PATTERN = re.compile(
+    r'^(?P<day>\d{1,2})(?:st|nd|rd|th)? Day of (?P<month>[A-Za-z]+) (?P<year>18\d{2}) - (?P<title>.+)$'
+)
+# Padrão não ancorado no fim usado por chunk_diary_by_day_and_paragraph
+PARAGRAPH_DATE_PATTERN = re.compile(
+    r"(\d{1,2})(?:st|nd|rd|th)? Day of ([A-Za-z]+) (18\d{2}) - ([A-Za-z\s]+)"
+)
+CAPITALIZED_PATTERN = re.compile(r'\b[A-Z]\w*\b')
+
+
+def split_large_chunk(chunk: str, max_size: int = 800) -> List[str]:
+    """Corta no último ponto (ou espaço) antes de `max_size` caracteres."""
+    parts = []
+    while len(chunk) > max_size:
+        cut_index = chunk.rfind('.', 0, max_size)
+        if cut_index == -1:
+            cut_index = chunk.rfind(' ', 0, max_size)
+        if cut_index == -1:
+            cut_index = max_size  # Não achou ponto nem espaço, corta bruto
+        parts.append(chunk[:cut_index + 1].strip())
+        chunk = chunk[cut_index + 1:].strip()
+    if chunk:
+        parts.append(chunk)
+    return parts
+
+
+class LineWindowPolicy:
+    """Um chunk por linha de data e um a cada `lines_per_chunk` linhas não vazias do dia."""
+
+    date_pattern = DATE_PATTERN
+    strip_lines = True
+
+    def __init__(self, lines_per_chunk: int = 3, extract_terms: bool = True):
+        self.lines_per_chunk = lines_per_chunk
+        self.wants_terms = extract_terms
+        self.table = ChunkTable()
+        self.current_day = None
+        self.chunk_number = 0
+        self.buffer: List[str] = []
+        self.buffer_terms: List[str] = []
+
+    def _flush(self):
+        chunk_text = '\n'.join(self.buffer)
+        self.table.append(self.chunk_number, chunk_text, self.current_day, len(self.buffer),
+                          len(chunk_text.split()), terms=self.buffer_terms if self.wants_terms else None)
+        self.chunk_number += 1
+        self.buffer = []
+        self.buffer_terms = []
+
+    def date(self, line: str, match, terms: Optional[List[str]]):
+        # Processa buffer antes de nova data
+        if self.buffer and self.current_day is not None:
+            self._flush()
+        self.current_day = self.table.add_day(line, match.group('title'))
+        self.table.append(self.chunk_number, line, self.current_day, 1, len(line.split()),
+                          is_date_chunk=True, terms=terms)
+        self.chunk_number += 1
+
+    def line(self, line: str, terms: Optional[List[str]]):
+        self.buffer.append(line)
+        if terms:
+            self.buffer_terms.extend(terms)
+        if len(self.buffer) >= self.lines_per_chunk and self.current_day is not None:
+            self._flush()
+
+    def blank(self):
+        pass  # Linhas vazias são ignoradas
+
+    def finish(self) -> ChunkTable:
+        if self.buffer and self.current_day is not None:
+            self._flush()
+        return self.table
+
+
+class DayParagraphPolicy:
+    """
+    Parágrafos (separados por linha vazia) de cada dia; a linha de data abre o
+    primeiro parágrafo do dia. Como em `chunk_diary_by_day_and_paragraph`, só o
+    último dia passa por `split_large_chunk`, a menos que `split_every_day=True`.
+    """
+
+    date_pattern = PARAGRAPH_DATE_PATTERN
+    strip_lines = False
+    wants_terms = False
+
+    def __init__(self, max_size: int = 800, split_every_day: bool = False):
+        self.max_size = max_size
+        self.split_every_day = split_every_day
+        self.chunks: List[str] = []
+        self.day_paragraphs: List[str] = []
+        self.paragraph: List[str] = []
+
+    def _end_paragraph(self):
+        if self.paragraph:
+            text = '\n'.join(self.paragraph).strip()
+            if text:
+                self.day_paragraphs.append(text)
+            self.paragraph = []
+
+    def _end_day(self, split: bool):
+        self._end_paragraph()
+        for paragraph in self.day_paragraphs:
+            if split and len(paragraph) > self.max_size:
+                self.chunks.extend(split_large_chunk(paragraph, self.max_size))
+            else:
+                self.chunks.append(paragraph)
+        self.day_paragraphs = []
+
+    def date(self, line: str, match, terms):
+        self._end_day(self.split_every_day)
+        self.paragraph.append(line)
+
+    def line(self, line: str, terms):
+        self.paragraph.append(line)
+
+    def blank(self):
+        self._end_paragraph()
+
+    def finish(self) -> List[str]:
+        self._end_day(True)
+        return [chunk for chunk in self.chunks if chunk]
+
+
+class ChunkingEngine:
+    """Passada única sobre o texto, delegando o agrupamento à política."""
+
+    def __init__(self, date_pattern: Optional[Pattern] = None, terms_pattern: Pattern = CAPITALIZED_PATTERN):
+        self.date_pattern = date_pattern
+        self.terms_pattern = terms_pattern
+
+    def run(self, text: str, policy):
+        date_match = (self.date_pattern or policy.date_pattern).match
+        find_terms = self.terms_pattern.findall if policy.wants_terms else None
+        strip = policy.strip_lines
+        on_date, on_line, on_blank = policy.date, policy.line, policy.blank
+
+        for line in text.splitlines():
+            if strip:
+                line = line.strip()
+            if not line:
+                on_blank()
+                continue
+            # Toda linha de data começa com dígito: evita o regex nas demais
+            match = date_match(line) if line[0].isdigit() else None
+            terms = find_terms(line) if find_terms else None
+            if match:
+                on_date(line, match, terms)
+            else:
+                on_line(line, terms)
+        return policy.finish()
+
+
+def chunk_by_line_window(text: str, lines_per_chunk: int = 3, extract_terms: bool = True) -> ChunkTable:
+    return ChunkingEngine().run(text, LineWindowPolicy(lines_per_chunk, extract_terms))
+
+
+def chunk_by_day_and_paragraph(text: str, max_size: int = 800) -> List[str]:
+    return ChunkingEngine().run(text, DayParagraphPolicy(max_size))
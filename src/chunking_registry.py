@@ -0,0 +1,74 @@
+"""
+Registro de estratégias de chunking. Cada estratégia recebe o texto do diário e
+devolve a lista de textos dos chunks; `scripts/prepare_data.py` escolhe pelo
+nome (`CHUNKING_STRATEGY`) e o harness de `scripts/benchmarks` compara todas.
+"""
+from typing import Callable, Dict, List
+
+from src.chunking_engine import ChunkingEngine, DayParagraphPolicy, chunk_by_line_window
+
+ChunkingStrategy = Callable[[str], List[str]]
+
+_STRATEGIES: Dict[str, ChunkingStrategy] = {}
+
+
+def register_strategy(name: str):
+    """Decorator: `@register_strategy("nome")` sobre uma função `texto -> [chunks]`."""
+    def decorator(fn: ChunkingStrategy) -> ChunkingStrategy:
+        if name in _STRATEGIES:
+            raise ValueError(f"Estratégia de chunking já registrada: {name}")
+        _STRATEGIES[name] = fn
+        return fn
+    return decorator
+
+
+def get_strategy(name: str) -> ChunkingStrategy:
+    try:
+        return _STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Estratégia de chunking desconhecida: {name} "
+                         f"(disponíveis: {', '.join(list_strategies())})") from None
+
+
+def list_strategies() -> List[str]:
+    return sorted(_STRATEGIES)
+
+
+@register_strategy("day-paragraph")
+def day_paragraph(text: str) -> List[str]:
+    """chunk_diary_by_day_and_paragraph: parágrafos por dia (só o último dia é cortado em 800)."""
+    return ChunkingEngine().run(text, DayParagraphPolicy(max_size=800))
+
+
+@register_strategy("day-paragraph-800")
+def day_paragraph_800(text: str) -> List[str]:
+    """Parágrafos por dia, todos limitados a 800 caracteres."""
+    return ChunkingEngine().run(text, DayParagraphPolicy(max_size=800, split_every_day=True))
+
+
+@register_strategy("line-window-3")
+def line_window_3(text: str) -> List[str]:
+    """process_diary_chunks: linha de data + blocos de 3 linhas."""
+    return chunk_by_line_window(text, 3, extract_terms=False).texts()
+
+
+@register_strategy("line-window-4")
+def line_window_4(text: str) -> List[str]:
+    """Versões v3/cloud/docker: linha de data + blocos de 4 linhas."""
+    return chunk_by_line_window(text, 4, extract_terms=False).texts()
+
+
+@register_strategy("token-window-512")
+def token_window_512(text: str) -> List[str]:
+    """Janelas de até 512 tokens do modelo (sem truncamento), 64 de sobreposição, cortes em frase."""
+    from src.token_chunker import TokenWindowChunker, default_tokenizer
+
+    return TokenWindowChunker(default_tokenizer(), max_tokens=512, overlap_tokens=64).chunk(text)
+
+
+@register_strategy("token-window-256")
+def token_window_256(text: str) -> List[str]:
+    """Janelas de até 256 tokens, 32 de sobreposição, cortes em frase."""
+    from src.token_chunker import TokenWindowChunker, default_tokenizer
+
+    return TokenWindowChunker(default_tokenizer(), max_tokens=256, overlap_tokens=32).chunk(text)
@@ -1,9 +1,16 @@
-import re
+import os
+import sys
 import json
-from typing import Dict, List
-from collections import defaultdict
+from typing import Dict
 from PyPDF2 import PdfReader
 
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from src.chunk_table import ChunkTable
+from src.chunking_engine import chunk_by_line_window
+
 def extract_text_with_multiple_breaks(pdf_path: str) -> str:
     """Extrai texto do PDF preservando múltiplas quebras de linha"""
     text = ""
@@ -16,6 +23,14 @@ def extract_text_with_multiple_breaks(pdf_path: str) -> str:
         return None
     return text
 
+def build_chunk_table(text: str, lines_per_chunk: int = 3, extract_terms: bool = True) -> ChunkTable:
+    """
+    Mesma segmentação de `process_diary_chunks` (linha de data como chunk
+    próprio + um chunk a cada `lines_per_chunk` linhas não vazias), mas
+    preenchendo uma `ChunkTable` colunar em vez de uma lista de dicts.
+    """
+    return chunk_by_line_window(text, lines_per_chunk, extract_terms)
+
 def process_diary_chunks(text: str) -> Dict:
     """
     Processa o texto do diário criando chunks a cada 3 quebras de linha
@@ -42,98 +57,11 @@ def process_diary_chunks(text: str) -> Dict:
             }
         ]
     }
-    """
-    date_pattern = re.compile(
-        r'^(?P<day>\d{1,2})(?:st|nd|rd|th)? Day of (?P<month>[A-Za-z]+) (?P<year>18\d{2}) - (?P<title>.+)$'
-    )
-    
-    result = {
-        "metadata": {
-            "total_days": 0,
-            "total_chunks": 0,
-            "chunks_per_day": defaultdict(int),
-            "avg_chunks_per_day": 0.0
-        },
-        "chunks": []
-    }
-    
-    current_date = None
-    current_metadata = None
-    chunk_number = 0
-    buffer = []
-    line_counter = 0
-    
-    for line in text.split('\n'):
-        line = line.strip()
-        date_match = date_pattern.match(line)
-        
-        if date_match:
-            # Processa buffer antes de nova data
-            if buffer and current_date:
-                _create_chunk(result, buffer, current_date, current_metadata, chunk_number)
-                chunk_number += 1
-                buffer = []
-                line_counter = 0
-            
-            # Nova data encontrada
-            current_date = line
-            current_metadata = {
-                "full_date": line,
-                "title": date_match.group('title')
-            }
-            result["metadata"]["total_days"] += 1
-            
-            # Adiciona a linha de data como chunk separado
-            result["chunks"].append({
-                "chunk_number": chunk_number,
-                "chunk_text": line,
-                "date": current_date,
-                "day_metadata": current_metadata,
-                "line_count": 1,
-                "word_count": len(line.split()),
-                "is_date_chunk": True
-            })
-            result["metadata"]["chunks_per_day"][current_date] += 1
-            result["metadata"]["total_chunks"] += 1
-            chunk_number += 1
-        else:
-            if line:  # Ignora linhas vazias
-                buffer.append(line)
-                line_counter += 1
-                
-                # Cria chunk a cada 3 quebras de linha significativas
-                if line_counter >= 3 and current_date:
-                    _create_chunk(result, buffer, current_date, current_metadata, chunk_number)
-                    chunk_number += 1
-                    buffer = []
-                    line_counter = 0
-    
-    # Processa qualquer conteúdo restante no buffer
-    if buffer and current_date:
-        _create_chunk(result, buffer, current_date, current_metadata, chunk_number)
-    
-    # Calcula média de chunks por dia
-    if result["metadata"]["total_days"] > 0:
-        result["metadata"]["avg_chunks_per_day"] = (
-            result["metadata"]["total_chunks"] / result["metadata"]["total_days"]
-        )
-    
-    return result
 
-def _create_chunk(result: Dict, buffer: List[str], date: str, metadata: Dict, chunk_number: int):
-    """Cria um novo chunk a partir do buffer"""
-    chunk_text = '\n'.join(buffer)
-    result["chunks"].append({
-        "chunk_number": chunk_number,
-        "chunk_text": chunk_text,
-        "date": date,
-        "day_metadata": metadata,
-        "line_count": len(buffer),
-        "word_count": len(chunk_text.split()),
-        "is_date_chunk": False
-    })
-    result["metadata"]["chunks_per_day"][date] += 1
-    result["metadata"]["total_chunks"] += 1
+    Para corpora grandes use `build_chunk_table`, que guarda o mesmo conteúdo
+    em colunas e serializa direto para o vector store.
+    """
+    return build_chunk_table(text, extract_terms=False).to_legacy_dict()
 
 def save_chunks_to_json(pdf_path: str, output_file: str) -> Dict:
     """Processa o PDF e salva os chunks em JSON"""
@@ -0,0 +1,142 @@
+"""
+Exportação e importação de coleções em streaming.
+
+Formato (diretório):
+
+    manifest.json        coleção, campos, dimensão e partes (escrito por último)
+    part-00000.npy       vetores float32 (n, dim) do lote
+    part-00000.jsonl     demais campos, uma entidade por linha, na mesma ordem
+
+Cada lote lido de `ZillizClient.iter_entities` vira uma parte, então a memória
+fica limitada a um lote na exportação e a `workers` lotes na importação. O
+mesmo diretório carrega um `LocalIndex` para uso sem cluster.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src import fast_json
+from src.logger import get_logger
+
+logger = get_logger("collection_io")
+
+FORMAT = "npy+jsonl"
+MANIFEST_FILE = "manifest.json"
+
+
+def _part_paths(directory: str, index: int) -> Tuple[str, str]:
+    base = os.path.join(directory, f"part-{index:05d}")
+    return base + ".npy", base + ".jsonl"
+
+
+def write_part(directory: str, index: int, entities: List[Dict], vector_field: str = "vector") -> Dict:
+    vectors_path, rows_path = _part_paths(directory, index)
+    np.save(vectors_path, np.asarray([entity[vector_field] for entity in entities], dtype=np.float32))
+    with open(rows_path, "wb") as f:
+        for entity in entities:
+            f.write(fast_json.dumps({k: v for k, v in entity.items() if k != vector_field}))
+            f.write(b"\n")
+    return {"name": os.path.basename(vectors_path)[:-len(".npy")], "rows": len(entities)}
+
+
+def export_collection(batches: Iterator[List[Dict]], directory: str, collection_name: str = "",
+                      vector_field: str = "vector", primary_field: str = "id") -> Dict:
+    """
+    Grava cada lote de entidades (ex.: `client.iter_entities(...)`) como uma
+    parte e, no fim, o manifesto; sem manifesto a exportação está incompleta.
+    """
+    os.makedirs(directory, exist_ok=True)
+    parts, dim = [], None
+    for index, batch in enumerate(batches):
+        parts.append(write_part(directory, index, batch, vector_field))
+        dim = dim or len(batch[0][vector_field])
+        logger.debug("Exported part %d (%d rows)", index, len(batch))
+    manifest = {
+        "format": FORMAT,
+        "version": 1,
+        "collection": collection_name,
+        "vector_field": vector_field,
+        "primary_field": primary_field,
+        "dim": dim,
+        "rows": sum(part["rows"] for part in parts),
+        "parts": parts,
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "wb") as f:
+        f.write(fast_json.dumps(manifest))
+    logger.info("Exported %d rows of %s to %s", manifest["rows"], collection_name, directory)
+    return manifest
+
+
+def read_manifest(directory: str) -> Dict:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} não existe: exportação ausente ou incompleta")
+    with open(path, "rb") as f:
+        manifest = fast_json.loads(f.read())
+    if manifest.get("format") != FORMAT:
+        raise ValueError(f"Formato de exportação desconhecido: {manifest.get('format')}")
+    return manifest
+
+
+def iter_parts(directory: str) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+    """(vetores, linhas) de cada parte; os vetores são mapeados do disco, não copiados."""
+    manifest = read_manifest(directory)
+    for part in manifest["parts"]:
+        vectors = np.load(os.path.join(directory, part["name"] + ".npy"), mmap_mode="r")
+        with open(os.path.join(directory, part["name"] + ".jsonl"), "rb") as f:
+            rows = [fast_json.loads(line) for line in f if line.strip()]
+        yield vectors, rows
+
+
+def iter_entities(directory: str, batch_size: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Entidades no formato de inserção, em lotes de `batch_size` (padrão: uma parte)."""
+    vector_field = read_manifest(directory)["vector_field"]
+    pending: List[Dict] = []
+    for vectors, rows in iter_parts(directory):
+        for vector, row in zip(vectors, rows):
+            row[vector_field] = vector.tolist()
+            pending.append(row)
+            if batch_size and len(pending) >= batch_size:
+                yield pending
+                pending = []
+        if not batch_size:
+            yield pending
+            pending = []
+    if pending:
+        yield pending
+
+
+def import_collection(client, collection_name: str, directory: str, batch_size: int = 500,
+                      workers: int = 4) -> int:
+    """
+    Carrega uma exportação numa coleção (existente, com a mesma dimensão) com
+    até `workers` inserts em paralelo. Devolve o número de entidades inseridas.
+    """
+    inserted = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = []
+        for batch in iter_entities(directory, batch_size):
+            in_flight.append((executor.submit(client.insert_vectors, collection_name, batch), len(batch)))
+            if len(in_flight) >= workers:
+                future, rows = in_flight.pop(0)
+                future.result()
+                inserted += rows
+        for future, rows in in_flight:
+            future.result()
+            inserted += rows
+    logger.info("Imported %d rows into %s", inserted, collection_name)
+    return inserted
+
+
+def load_local_index(directory: str, text_field: str = "text"):
+    """`LocalIndex` com os vetores e textos de uma exportação (backend local, sem cluster)."""
+    from src.local_index import LocalIndex
+
+    manifest = read_manifest(directory)
+    index = LocalIndex(manifest["dim"])
+    for vectors, rows in iter_parts(directory):
+        index.add([row[manifest["primary_field"]] for row in rows], vectors,
+                  [row.get(text_field, "") for row in rows])
+    return index
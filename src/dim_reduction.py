@@ -0,0 +1,115 @@
+"""
+Redução de dimensão dos embeddings.
+
+- `Truncation`: mantém as primeiras `dim` dimensões (modelos treinados com
+  Matryoshka, ex. arctic-embed-m-v1.5; no arctic-embed-s perde mais recall).
+- `PCAProjection`: projeção PCA ajustada nos vetores da ingestão e salva em
+  `.npz` junto do índice, para aplicar a mesma transformação às queries.
+
+As duas renormalizam a saída, então produto interno continua sendo cosseno.
+
+Os vetores reduzidos perdem recall. Num índice remoto (Zilliz) a busca é
+pela versão reduzida, e o vetor cheio vai junto em cada entidade, no campo
+`FULL_VECTOR_FIELD` (campo dinâmico, gravado pelo `prepare_data.py` e pela
+compactação do /ingest). `rescore` refaz a ordem de `k * oversample`
+candidatos pelo produto interno com esse vetor, que volta no próprio search
+(`outputFields`): é o rescoring do `TwoStageIndex`, sem encode extra.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.embedding import _normalize
+
+
+class Truncation:
+    kind = "truncate"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    @property
+    def fitted(self) -> bool:
+        return True
+
+    def fit(self, vectors) -> "Truncation":
+        return self
+
+    def transform(self, vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        return _normalize(vectors[:, :self.dim])
+
+    def save(self, path: str):
+        np.savez(path, kind=self.kind, dim=self.dim)
+
+
+class PCAProjection:
+    kind = "pca"
+
+    def __init__(self, dim: int, mean: Optional[np.ndarray] = None, components: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.mean = mean
+        self.components = components
+        self.explained_variance_ratio: Optional[float] = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.components is not None
+
+    def fit(self, vectors) -> "PCAProjection":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) < self.dim:
+            raise ValueError(f"PCA com {self.dim} dimensões precisa de pelo menos {self.dim} vetores")
+        self.mean = vectors.mean(axis=0)
+        _, singular_values, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:self.dim], dtype=np.float32)
+        variance = singular_values ** 2
+        self.explained_variance_ratio = float(variance[:self.dim].sum() / variance.sum())
+        return self
+
+    def transform(self, vectors) -> np.ndarray:
+        if not self.fitted:
+            raise RuntimeError("PCAProjection.transform antes de fit")
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        return _normalize((vectors - self.mean) @ self.components.T)
+
+    def save(self, path: str):
+        np.savez(path, kind=self.kind, dim=self.dim, mean=self.mean, components=self.components)
+
+
+FULL_VECTOR_FIELD = "vector_full"
+
+
+def rescore(query, hits: Sequence[Tuple[object, float, Optional[Sequence[float]]]],
+            k: Optional[int] = None) -> List[Tuple[object, float]]:
+    """
+    `(id, score)` dos hits `(id, score reduzido, vetor cheio ou None)` em ordem
+    de cosseno com `query` na dimensão cheia. Um hit sem vetor cheio (linha
+    gravada antes do campo existir) fica com o score reduzido, que também é um
+    cosseno (os vetores reduzidos são renormalizados).
+    """
+    hits = list(hits)
+    scores = np.array([score for _, score, _ in hits], dtype=np.float32)
+    rows = [row for row, (_, _, vector) in enumerate(hits) if vector is not None]
+    if rows:
+        matrix = np.asarray([hits[row][2] for row in rows], dtype=np.float32)
+        scores[rows] = matrix @ np.asarray(query, dtype=np.float32).reshape(-1)
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [(hits[i][0], float(scores[i])) for i in order]
+
+
+def make_reducer(kind: str, dim: int):
+    if kind == "pca":
+        return PCAProjection(dim)
+    if kind == "truncate":
+        return Truncation(dim)
+    raise ValueError(f"Redução de dimensão desconhecida: {kind} (use pca ou truncate)")
+
+
+def load_reducer(path: str):
+    """Carrega uma redução salva com `save`."""
+    with np.load(path) as data:
+        kind, dim = str(data["kind"]), int(data["dim"])
+        if kind == "pca":
+            return PCAProjection(dim, data["mean"], data["components"])
+    return make_reducer(kind, dim)
@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from src.logger import get_logger
+from src.tracing import span
+
+logger = get_logger("embedding")
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "Snowflake/snowflake-arctic-embed-s")
+EMBEDDING_DIM = 384  # Dimensão dos embeddings do modelo Arctic-S
+DEFAULT_ONNX_DIR = os.path.join("models", "snowflake-arctic-embed-s-onnx")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model_quantized.onnx"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Runtime PyTorch (sentence-transformers); importa torch só quando instanciado."""
+
+    runtime = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+
+
+class OnnxEmbedder:
+    """
+    Runtime ONNX Runtime + tokenizers (sem torch). Usa o pooling CLS do
+    arctic-embed e normaliza os vetores, igual ao sentence-transformers.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = True,
+                 max_length: int = 512, intra_op_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.runtime = "onnx-int8" if quantized else "onnx"
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            }
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            last_hidden_state = self.session.run(None, feeds)[0]
+            outputs.append(last_hidden_state[:, 0])
+        if not outputs:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        return _normalize(np.concatenate(outputs).astype(np.float32))
+
+
+def onnx_available(model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = True) -> bool:
+    model_file = ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE
+    if not os.path.exists(os.path.join(model_dir, model_file)):
+        return False
+    try:
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def load_embedder(runtime: Optional[str] = None, model_dir: Optional[str] = None,
+                  threads: Optional[int] = None):
+    """
+    Carrega o runtime mais rápido disponível.
+
+    runtime: "auto" (padrão, via EMBEDDING_RUNTIME), "remote", "onnx-int8", "onnx" ou "torch".
+    No modo auto a ordem é remote (se EMBEDDING_SOCKET existir) -> onnx-int8 -> onnx -> torch.
+    threads limita as threads de inferência (onnx/torch), para vários processos por máquina.
+    """
+    runtime = runtime or os.getenv("EMBEDDING_RUNTIME", "auto")
+    model_dir = model_dir or os.getenv("EMBEDDING_ONNX_DIR", DEFAULT_ONNX_DIR)
+    socket_path = os.getenv("EMBEDDING_SOCKET")
+    if runtime == "auto":
+        if socket_path and os.path.exists(socket_path):
+            runtime = "remote"
+        elif onnx_available(model_dir, quantized=True):
+            runtime = "onnx-int8"
+        elif onnx_available(model_dir, quantized=False):
+            runtime = "onnx"
+        else:
+            runtime = "torch"
+    if runtime == "remote":
+        from src.embedding_server import DEFAULT_SOCKET, RemoteEmbedder
+
+        return RemoteEmbedder(socket_path or DEFAULT_SOCKET)
+    if runtime in ("onnx-int8", "onnx"):
+        return OnnxEmbedder(model_dir, quantized=runtime == "onnx-int8", intra_op_threads=threads)
+    if runtime == "torch":
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        return SentenceTransformerEmbedder()
+    raise ValueError(f"Runtime de embedding desconhecido: {runtime}")
+
+
+class LazyEmbedder:
+    """
+    Adia o carregamento do modelo até o primeiro uso (ou até `warm_up`) e
+    registra tempos de carga e de encode.
+    """
+
+    def __init__(self, runtime: Optional[str] = None, model_dir: Optional[str] = None):
+        self.runtime = runtime
+        self.model_dir = model_dir
+        self._embedder = None
+        self._lock = threading.Lock()
+        self.stats = {"runtime": None, "load_seconds": None, "first_encode_seconds": None,
+                      "encode_calls": 0, "encode_seconds_total": 0.0}
+
+    @property
+    def loaded(self) -> bool:
+        return self._embedder is not None
+
+    def load(self):
+        """Carrega o modelo sem rodar inferência (seguro antes de um fork, ver scripts/serve.py)."""
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    start = time.perf_counter()
+                    embedder = load_embedder(self.runtime, self.model_dir)
+                    self.stats["load_seconds"] = time.perf_counter() - start
+                    self.stats["runtime"] = embedder.runtime
+                    logger.info("Embedding model loaded (%s) in %.2f s",
+                                embedder.runtime, self.stats["load_seconds"])
+                    self._embedder = embedder
+        return self._embedder
+
+    def warm_up(self):
+        """Carrega o modelo e roda um encode descartável (compila kernels/arenas)."""
+        vectors = self.encode(["warm up"])
+        assert vectors.shape[1] == EMBEDDING_DIM
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        embedder = self.load()
+        with span("embedding.encode", **{"embedding.runtime": embedder.runtime, "embedding.texts": len(texts),
+                                         "embedding.chars": sum(len(text) for text in texts)}):
+            start = time.perf_counter()
+            vectors = embedder.encode(texts, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+        if self.stats["first_encode_seconds"] is None:
+            self.stats["first_encode_seconds"] = elapsed
+        self.stats["encode_calls"] += 1
+        self.stats["encode_seconds_total"] += elapsed
+        return vectors
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        calls = stats["encode_calls"]
+        stats["encode_ms_avg"] = stats["encode_seconds_total"] / calls * 1000 if calls else None
+        return stats
+
+
+def export_onnx(output_dir: str = DEFAULT_ONNX_DIR, model_name: str = EMBEDDING_MODEL_NAME,
+                quantize: bool = True) -> str:
+    """
+    Exporta o modelo para ONNX (opset 17, eixos dinâmicos) e, opcionalmente,
+    gera a versão quantizada int8 dinâmica. Requer torch e transformers apenas aqui.
+    """
+    import inspect
+
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    class _LastHiddenState(torch.nn.Module):
+        # Fixa a ordem dos argumentos e a saída; o forward do transformers muda entre versões
+        def __init__(self, encoder):
+            super().__init__()
+            self.encoder = encoder
+
+        def forward(self, *inputs):
+            kwargs = dict(zip(input_names, inputs))
+            return self.encoder(**kwargs).last_hidden_state
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    # torch >= 2.5 usa o exporter dynamo por padrão (requer onnxscript); fica no exporter TorchScript
+    export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHiddenState(model),
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            **export_kwargs,
+        )
+    logger.info("ONNX model exported to %s", model_path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        logger.info("Quantized int8 model written to %s", quantized_path)
+    return output_dir
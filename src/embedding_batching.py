@@ -0,0 +1,141 @@
+"""
+Embeddings em lote agrupados por tamanho.
+
+`model.encode` sobre os chunks na ordem do documento mistura textos curtos e
+longos no mesmo batch, e o batch inteiro é preenchido (padding) até o mais
+longo. O `BucketedEmbeddingRunner` mede o tamanho de cada texto em tokens,
+ordena, monta batches com um orçamento de tokens com padding (batches grandes
+de textos curtos, pequenos de textos longos), roda cada batch e devolve os
+vetores na ordem original. Com `processes > 0` os batches são distribuídos
+entre processos (`src/embedding_pool.py`), cada um com o seu modelo.
+"""
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.embedding import EMBEDDING_DIM, load_embedder
+from src.embedding_pool import SharedEmbeddingPool
+from src.logger import get_logger
+from src.rate_limiter import estimate_tokens
+
+logger = get_logger("embedding")
+
+
+def token_lengths(texts: Sequence[str], tokenizer=None, max_length: int = 512) -> np.ndarray:
+    """Tokens por texto (com [CLS]/[SEP], limitado ao truncamento do modelo); ~4 caracteres/token sem tokenizer."""
+    if tokenizer is None:
+        lengths = [estimate_tokens(text) + 2 for text in texts]
+    else:
+        lengths = [len(encoding.ids) for encoding in tokenizer.encode_batch(list(texts))]
+    return np.minimum(np.asarray(lengths, dtype=np.int64), max_length)
+
+
+def plan_batches(lengths: Sequence[int], max_tokens_per_batch: int = 2048,
+                 max_batch_size: int = 128) -> List[np.ndarray]:
+    """
+    Índices de cada batch, em ordem crescente de tamanho; um batch fecha quando
+    (textos x maior tamanho) passaria de `max_tokens_per_batch`.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(lengths, kind="stable")
+    batches, start = [], 0
+    for position, index in enumerate(order):
+        size = position - start + 1
+        if position > start and (size > max_batch_size or size * lengths[index] > max_tokens_per_batch):
+            batches.append(order[start:position])
+            start = position
+    if start < len(order):
+        batches.append(order[start:])
+    return batches
+
+
+class BucketedEmbeddingRunner:
+    def __init__(self, embedder=None, tokenizer=None, max_tokens_per_batch: int = 2048,
+                 max_batch_size: int = 128, processes: int = 0, runtime: Optional[str] = None,
+                 model_dir: Optional[str] = None, max_length: int = 512):
+        """
+        embedder: qualquer objeto com `encode(texts, batch_size)`; carregado sob demanda
+        se None (e nunca no processo principal quando `processes > 0`).
+        tokenizer: `tokenizers.Tokenizer` sem padding; por padrão o do modelo
+        (`src.token_chunker.default_tokenizer`), ou a estimativa por caracteres.
+        """
+        self._embedder = embedder
+        self._tokenizer = tokenizer
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_batch_size = max_batch_size
+        self.processes = processes
+        self.runtime = runtime
+        self.model_dir = model_dir
+        self.max_length = max_length
+        self._pool: Optional[SharedEmbeddingPool] = None
+        self.stats = {"texts": 0, "batches": 0, "tokens": 0, "padded_tokens": 0, "seconds": 0.0}
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            try:
+                from src.token_chunker import default_tokenizer
+
+                self._tokenizer = default_tokenizer()
+            except Exception as e:  # sem `tokenizers` ou sem acesso ao tokenizer do modelo
+                logger.warning("Tokenizer unavailable (%s); estimating lengths from characters", e)
+                self._tokenizer = False
+        return self._tokenizer or None
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = load_embedder(self.runtime, self.model_dir)
+        return self._embedder
+
+    def _get_pool(self) -> SharedEmbeddingPool:
+        if self._pool is None:
+            self._pool = SharedEmbeddingPool(self.processes, self.runtime, self.model_dir).start()
+        return self._pool
+
+    def start(self) -> "BucketedEmbeddingRunner":
+        """Sobe o pool de processos (se houver) antes do primeiro encode."""
+        if self.processes > 0:
+            self._get_pool()
+        return self
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        output = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        if not texts:
+            return output
+        pool = self._get_pool() if self.processes > 0 else None  # subir o pool fica fora do tempo medido
+        start = time.perf_counter()
+        lengths = token_lengths(texts, self.tokenizer, self.max_length)
+        batches = plan_batches(lengths, self.max_tokens_per_batch, self.max_batch_size)
+        if pool is not None:
+            output = pool.encode(texts, batches)
+        else:
+            for batch in batches:
+                chunk = [texts[i] for i in batch]
+                output[batch] = self.embedder.encode(chunk, batch_size=len(chunk))
+
+        self.stats["seconds"] += time.perf_counter() - start
+        self.stats["texts"] += len(texts)
+        self.stats["batches"] += len(batches)
+        self.stats["tokens"] += int(lengths.sum())
+        self.stats["padded_tokens"] += int(sum(len(batch) * lengths[batch].max() for batch in batches))
+        return output
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["tokens_per_second"] = stats["tokens"] / stats["seconds"] if stats["seconds"] else None
+        stats["padding_fraction"] = 1 - stats["tokens"] / stats["padded_tokens"] if stats["padded_tokens"] else 0.0
+        return stats
@@ -0,0 +1,157 @@
+"""
+Embeddings de ingestão em vários núcleos de CPU.
+
+O `SharedEmbeddingPool` sobe N processos, cada um com o seu modelo e
+`cpu_count // N` threads de inferência. Os batches (ver `plan_batches`) vão por
+uma fila; cada worker escreve os vetores direto numa matriz NumPy em memória
+compartilhada, nas linhas do batch, e devolve só um aviso de conclusão, sem
+serializar os vetores de volta pelo pipe. A fila distribui os batches conforme
+os workers ficam livres, então batches longos não travam um processo só.
+"""
+import os
+import queue
+import time
+import traceback
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from src.embedding import EMBEDDING_DIM, load_embedder
+from src.logger import get_logger
+
+logger = get_logger("embedding")
+
+
+def _worker_main(tasks, results, runtime: Optional[str], model_dir: Optional[str], threads: int,
+                 loader: Callable = load_embedder):
+    try:
+        embedder = loader(runtime, model_dir, threads=threads)
+        results.put(("ready", os.getpid(), embedder.runtime))
+    except Exception:
+        results.put(("error", os.getpid(), traceback.format_exc()))
+        return
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        shm_name, shape, indices, texts = task
+        try:
+            shm = SharedMemory(name=shm_name)
+            try:
+                output = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+                output[indices] = embedder.encode(texts, batch_size=len(texts))
+                del output  # libera o buffer antes de fechar
+            finally:
+                shm.close()
+            results.put(("done", os.getpid(), len(indices)))
+        except Exception:
+            results.put(("error", os.getpid(), traceback.format_exc()))
+
+
+class SharedEmbeddingPool:
+    def __init__(self, processes: int, runtime: Optional[str] = None, model_dir: Optional[str] = None,
+                 threads_per_process: Optional[int] = None, start_timeout: float = 300,
+                 loader: Callable = load_embedder):
+        """loader: função de nível de módulo (vai por pickle para os filhos) com a assinatura de `load_embedder`."""
+        self.processes = processes
+        self.runtime = runtime
+        self.model_dir = model_dir
+        self.threads = threads_per_process or max(1, (os.cpu_count() or 1) // processes)
+        self.start_timeout = start_timeout
+        self.loader = loader
+        # spawn: os filhos não herdam o pool de threads do torch/onnxruntime do processo pai
+        self._context = get_context("spawn")
+        self._workers: List = []
+        self._tasks = None
+        self._results = None
+        self.worker_runtime: Optional[str] = None
+
+    def start(self) -> "SharedEmbeddingPool":
+        """Sobe os processos e espera todos carregarem o modelo."""
+        if self._workers:
+            return self
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        for _ in range(self.processes):
+            process = self._context.Process(
+                target=_worker_main, daemon=True,
+                args=(self._tasks, self._results, self.runtime, self.model_dir, self.threads, self.loader),
+            )
+            process.start()
+            self._workers.append(process)
+        for _ in range(self.processes):
+            kind, pid, detail = self._wait_result(self.start_timeout)
+            if kind == "error":
+                self.close()
+                raise RuntimeError(f"Embedding worker {pid} failed to load the model:\n{detail}")
+            self.worker_runtime = detail
+        logger.info("Embedding pool started: %d processes x %d threads (%s)",
+                    self.processes, self.threads, self.worker_runtime)
+        return self
+
+    def _wait_result(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.pid for p in self._workers if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Embedding worker(s) exited unexpectedly: {dead}")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError("Embedding pool did not respond in time")
+
+    def encode(self, texts: Sequence[str], batches: Optional[Sequence[Sequence[int]]] = None,
+               batch_size: int = 32) -> np.ndarray:
+        """
+        Vetores (n, EMBEDDING_DIM) na ordem de `texts`. `batches` são listas de
+        índices (ex.: de `plan_batches`); por padrão, fatias de `batch_size`.
+        """
+        texts = list(texts)
+        if batches is None:
+            batches = [range(start, min(start + batch_size, len(texts)))
+                       for start in range(0, len(texts), batch_size)]
+        shape = (len(texts), EMBEDDING_DIM)
+        if not texts:
+            return np.zeros(shape, dtype=np.float32)
+        self.start()
+        shm = SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        try:
+            for batch in batches:
+                indices = np.asarray(batch, dtype=np.int64)
+                self._tasks.put((shm.name, shape, indices, [texts[i] for i in indices]))
+            pending = len(texts)
+            while pending:
+                kind, pid, detail = self._wait_result()
+                if kind == "error":
+                    self.close()  # descarta batches ainda na fila; o próximo encode sobe o pool de novo
+                    raise RuntimeError(f"Embedding worker {pid} failed:\n{detail}")
+                pending -= detail
+            output = np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+        return output
+
+    def close(self):
+        # Descarta batches ainda não começados para os workers verem logo o sinal de saída
+        while self._workers:
+            try:
+                self._tasks.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,183 @@
+"""
+Sidecar de embeddings: um único processo carrega o modelo e atende os workers
+do uvicorn por um Unix socket, agrupando requisições concorrentes num só encode.
+
+    python -m src.embedding_server --socket /tmp/rag-embedding.sock
+
+Protocolo (frames com prefixo de 4 bytes big-endian):
+    requisição: JSON com a lista de textos
+    resposta:   b"\\x00" + (linhas, dim) "!II" + float32 em ordem C
+                b"\\x01" + mensagem de erro UTF-8
+"""
+import argparse
+import os
+import queue
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from typing import List
+
+import numpy as np
+
+from src import fast_json
+from src.logger import get_logger
+
+logger = get_logger("embedding_server")
+
+DEFAULT_SOCKET = "/tmp/rag-embedding.sock"
+_HEADER = struct.Struct("!I")
+_SHAPE = struct.Struct("!II")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("socket fechado pelo outro lado")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+class _Batcher:
+    """Thread única que junta requisições pendentes (até `max_batch` textos) num encode."""
+
+    def __init__(self, embedder, max_batch: int = 64):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.pending = queue.Queue()
+        threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+
+    def submit(self, texts: List[str]) -> np.ndarray:
+        done = threading.Event()
+        item = {"texts": texts, "done": done, "result": None, "error": None}
+        self.pending.put(item)
+        done.wait()
+        if item["error"] is not None:
+            raise item["error"]
+        return item["result"]
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            size = len(batch[0]["texts"])
+            while size < self.max_batch:
+                try:
+                    item = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item["texts"])
+            texts = [text for item in batch for text in item["texts"]]
+            try:
+                vectors = self.embedder.encode(texts)
+                offset = 0
+                for item in batch:
+                    item["result"] = vectors[offset:offset + len(item["texts"])]
+                    offset += len(item["texts"])
+            except Exception as e:
+                for item in batch:
+                    item["error"] = e
+            for item in batch:
+                item["done"].set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                texts = fast_json.loads(recv_frame(self.request))
+            except ConnectionError:
+                return
+            try:
+                vectors = np.ascontiguousarray(self.server.batcher.submit(texts), dtype=np.float32)
+                send_frame(self.request, b"\x00" + _SHAPE.pack(*vectors.shape) + vectors.tobytes())
+            except Exception as e:
+                logger.exception("encode failed")
+                send_frame(self.request, b"\x01" + str(e).encode("utf-8"))
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embedder, max_batch: int = 64):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+        self.batcher = _Batcher(embedder, max_batch=max_batch)
+
+
+class RemoteEmbedder:
+    """Cliente do sidecar com a mesma interface `encode` dos embedders locais."""
+
+    runtime = "remote"
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        sock = self._connection()
+        try:
+            send_frame(sock, fast_json.dumps(list(texts)))
+            response = recv_frame(sock)
+        except (OSError, ConnectionError):
+            sock.close()
+            self._local.sock = None
+            raise
+        if response[:1] != b"\x00":
+            raise RuntimeError(f"Sidecar de embeddings falhou: {response[1:].decode('utf-8')}")
+        rows, dim = _SHAPE.unpack_from(response, 1)
+        return np.frombuffer(response, dtype=np.float32, offset=1 + _SHAPE.size).reshape(rows, dim)
+
+
+def main():
+    from src.embedding import load_embedder
+
+    parser = argparse.ArgumentParser(description="Sidecar de embeddings compartilhado pelos workers")
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SOCKET", DEFAULT_SOCKET))
+    parser.add_argument("--runtime", default=None, help="onnx-int8 | onnx | torch (padrão: auto)")
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    # O sidecar é quem carrega o modelo: nunca resolve para o runtime "remote"
+    os.environ.pop("EMBEDDING_SOCKET", None)
+    runtime = args.runtime or os.getenv("EMBEDDING_RUNTIME", "auto")
+    embedder = load_embedder("auto" if runtime == "remote" else runtime)
+    embedder.encode(["warm up"])
+    server = EmbeddingServer(args.socket, embedder, max_batch=args.max_batch)
+    # SIGTERM (scripts/serve.py, orquestradores) também remove o socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info("Embedding sidecar (%s) listening on %s", embedder.runtime, args.socket)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
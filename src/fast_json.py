@@ -0,0 +1,42 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; cai para o json da stdlib
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Serializa para bytes UTF-8 (orjson quando disponível, aceita arrays NumPy)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def loads(data):
+    """Desserializa bytes/str JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def loads_response(response):
+    """
+    Corpo JSON de uma resposta do `requests`, como `response.json()`: um corpo
+    inválido (página HTML de proxy, corpo truncado) levanta
+    `requests.exceptions.InvalidJSONError`, uma `RequestException`, e cai nos
+    mesmos tratamentos de erro de rede (fallback, retry, circuit breaker).
+    """
+    try:
+        return loads(response.content)
+    except ValueError as e:
+        from requests.exceptions import InvalidJSONError
+
+        raise InvalidJSONError(f"Invalid JSON in response body: {e}", response=response) from e
+
+
+def _default(obj):
+    # Mesmo comportamento do OPT_SERIALIZE_NUMPY para o caminho sem orjson
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -3,17 +3,83 @@ import os
 GROQ_API_KEY = os.getenv("groq_key")
 # src/groq_proxy.py
 import os
+import time
 import requests
-import json
+
+from src import fast_json
+from src.logger import get_logger
+from src.rate_limiter import RateLimiter, estimate_tokens, parse_retry_after
+from src.tracing import SPAN_KIND_CLIENT, inject_headers, span
+
+logger = get_logger("groq")
+
+FALLBACK_RESPONSE = "Não consegui gerar uma resposta usando o LLM (API REST)."
 
 class GroqProxyRestAPI:
-    def __init__(self, api_key=None, model_name="llama3-8b-8192"):
+    def __init__(self, api_key=None, model_name="llama3-8b-8192", rate_limiter: RateLimiter = None,
+                 base_url: str = None):
         self.api_key = api_key or GROQ_API_KEY
         if not self.api_key:
             raise ValueError("GROQ_API_KEY não encontrado nas variáveis de ambiente.")
-        self.base_url = "https://api.groq.com/openai/v1"
+        # GROQ_BASE_URL aponta para outro endpoint compatível (ex.: o stub local em src/stubs)
+        self.base_url = base_url or os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
         self.model_name = model_name
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+
+    def _chat_completion(self, url: str, headers: dict, data: dict) -> str:
+        """
+        Envia a requisição respeitando os limites RPM/TPM da Groq.
+        Respostas 429 reduzem a concorrência e são re-tentadas após `retry-after`.
+        """
+        prompt = "".join(message["content"] for message in data["messages"])
+        tokens = estimate_tokens(prompt) + data.get("max_completion_tokens", 0)
+        limiter = self.rate_limiter
+        response = None
+        with span("groq chat.completions", SPAN_KIND_CLIENT, **{"gen_ai.request.model": data["model"],
+                                                                 "gen_ai.usage.input_tokens_estimate": tokens}) as trace:
+            body = fast_json.dumps(data)
+            trace.set_attribute("http.request.bytes", len(body))
+            for attempt in range(limiter.max_retries + 1):
+                trace.add("groq.attempts")
+                limiter.acquire(tokens)
+                try:
+                    response = requests.post(url, headers=inject_headers(headers), data=body)
+                except requests.exceptions.RequestException as e:
+                    limiter.release()
+                    trace.record_exception(e)
+                    logger.error("Erro ao chamar a API REST da Groq: %s", e)
+                    return FALLBACK_RESPONSE
+                trace.set_attribute("http.status_code", response.status_code)
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers)
+                    limiter.release(throttled=True, retry_after=retry_after)
+                    trace.add("groq.throttled")
+                    time.sleep(retry_after if retry_after is not None else min(2 ** attempt, 30))
+                    continue
+                limiter.release()
+                try:
+                    response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
+                    response_json = fast_json.loads_response(response)
+                    trace.set_attribute("http.response.bytes", len(response.content))
+                    usage = response_json.get("usage") or {}
+                    for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                        if key in usage:
+                            trace.set_attribute(f"gen_ai.usage.{key}", usage[key])
+                    return response_json['choices'][0]['message']['content'].strip()
+                except requests.exceptions.RequestException as e:
+                    trace.record_exception(e)
+                    logger.error("Erro ao chamar a API REST da Groq: %s (status %s): %s",
+                                 e, response.status_code, response.text)
+                    return FALLBACK_RESPONSE
+            logger.warning("Limite de requisições da Groq excedido após %d tentativas.", limiter.max_retries)
+            return FALLBACK_RESPONSE
         
+    def ping(self, timeout: float = 2.0):
+        """Verifica se a API da Groq responde (lista de modelos, não consome tokens)."""
+        response = requests.get(f"{self.base_url}/models",
+                                headers={"Authorization": f"Bearer {self.api_key}"}, timeout=timeout)
+        response.raise_for_status()
+
     def eval(self, context):
         url = f"{self.base_url}/chat/completions"
         headers = {
@@ -29,21 +95,31 @@ class GroqProxyRestAPI:
             "stream": False,
             "stop": None
         }
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
-            response_json = response.json()
-            return response_json['choices'][0]['message']['content'].strip()
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao chamar a API REST da Groq: {e}")
-            if response is not None:
-                print(f"Status Code: {response.status_code}")
-                print(f"Response Body: {response.text}")
-            return "Não consegui gerar uma resposta usando o LLM (API REST)."
+        return self._chat_completion(url, headers, data)
+
+    def judge(self, system_prompt: str, prompt: str, model: str = None, max_tokens: int = 1024) -> str:
+        """Chamada do juiz (src/judge.py): temperatura 0 e modo JSON da API."""
+        url = f"{self.base_url}/chat/completions"
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        data = {
+            "model": model or self.model_name,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0,
+            "max_completion_tokens": max_tokens,
+            "response_format": {"type": "json_object"},
+            "stream": False
+        }
+        return self._chat_completion(url, headers, data)
 
     def generate_response(self, question: str, context: str, max_tokens: int = 2000, temperature: float = 0.3):
         """Gera uma resposta usando a API REST da Groq."""
-        print(f"Context related: {context}")
+        logger.debug("Context related: %s", context)
         url = f"{self.base_url}/chat/completions"
         headers = {
             "Content-Type": "application/json",
@@ -62,14 +138,4 @@ class GroqProxyRestAPI:
             "stream": False,
             "stop": None
         }
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
-            response_json = response.json()
-            return response_json['choices'][0]['message']['content'].strip()
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao chamar a API REST da Groq: {e}")
-            if response is not None:
-                print(f"Status Code: {response.status_code}")
-                print(f"Response Body: {response.text}")
-            return "Não consegui gerar uma resposta usando o LLM (API REST)."
\ No newline at end of file
+        return self._chat_completion(url, headers, data)
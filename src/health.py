@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional
+
+from src.logger import get_logger
+
+logger = get_logger("health")
+
+
+class HealthMonitor:
+    """
+    Roda os probes de dependências em background, em paralelo e num intervalo
+    fixo, e guarda o último resultado. Os endpoints só leem esse cache, então
+    nunca adicionam latência ao caminho das requisições.
+    """
+
+    def __init__(self, interval: float = 10.0, timeout: float = 2.0, stale_after: Optional[float] = None):
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after or interval * 3
+        self.probes: Dict[str, Callable[[], None]] = {}
+        self.critical = set()
+        self.results: Dict[str, Dict] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def register(self, name: str, probe: Callable[[], None], critical: bool = True):
+        """Probe deve levantar exceção em caso de falha; o retorno é ignorado."""
+        self.probes[name] = probe
+        if critical:
+            self.critical.add(name)
+        self.results[name] = {"status": "unknown", "latency_ms": None, "last_error": None,
+                              "last_checked": None, "consecutive_failures": 0}
+
+    def _run_probe(self, probe: Callable[[], None]):
+        start = time.perf_counter()
+        probe()
+        return (time.perf_counter() - start) * 1000
+
+    def check_all(self):
+        """Executa todos os probes concorrentemente e atualiza o cache."""
+        if self._executor is None:
+            # Um thread por probe: um probe travado não atrasa os outros
+            self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.probes) * 2),
+                                                thread_name_prefix="health-probe")
+        futures = {name: self._executor.submit(self._run_probe, probe)
+                   for name, probe in self.probes.items()}
+        deadline = time.monotonic() + self.timeout
+        for name, future in futures.items():
+            error = None
+            latency_ms = None
+            try:
+                latency_ms = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                error = f"timeout after {self.timeout:.1f}s"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            with self._lock:
+                previous = self.results[name]
+                if error is None:
+                    self.results[name] = {"status": "up", "latency_ms": round(latency_ms, 1),
+                                          "last_error": previous["last_error"],
+                                          "last_checked": time.time(), "consecutive_failures": 0}
+                else:
+                    if previous["status"] != "down":
+                        logger.warning("Dependency %s is down: %s", name, error)
+                    self.results[name] = {"status": "down", "latency_ms": latency_ms,
+                                          "last_error": error, "last_checked": time.time(),
+                                          "consecutive_failures": previous["consecutive_failures"] + 1}
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.check_all()
+            except Exception:
+                logger.exception("health check loop failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def liveness(self) -> Dict:
+        alive = self._thread is not None and self._thread.is_alive()
+        return {"status": "alive" if alive else "monitor-stopped",
+                "uptime_seconds": round(time.time() - self.started_at, 1)}
+
+    def readiness(self) -> Dict:
+        """`ready` só é True se todo probe crítico está up e foi checado há menos de `stale_after`."""
+        now = time.time()
+        with self._lock:
+            dependencies = {name: dict(result) for name, result in self.results.items()}
+        ready = True
+        for name, result in dependencies.items():
+            stale = result["last_checked"] is None or now - result["last_checked"] > self.stale_after
+            result["stale"] = stale
+            if name in self.critical and (result["status"] != "up" or stale):
+                ready = False
+        return {"status": "ready" if ready else "not-ready", "ready": ready, "dependencies": dependencies}
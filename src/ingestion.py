@@ -0,0 +1,276 @@
+"""
+Ingestão online (`POST /ingest`).
+
+O endpoint só enfileira o documento (PDF ou texto) e responde 202 com o id do
+job. Um worker em background extrai o texto, faz o chunking
+(`CHUNKING_STRATEGY`), embeda em batches pequenos, para não disputar o modelo
+com as queries por muito tempo, e grava os chunks num `DeltaSegment`: um
+índice em memória que a busca consulta junto com o índice principal (como
+shard delta do `ShardedRetriever`). O documento fica pesquisável assim que o
+job termina.
+
+De tempos em tempos (`compact_interval`) o compactador copia as linhas novas
+do delta para o índice principal (coleção Zilliz ou shards). As linhas
+continuam no delta por mais `grace` segundos, até o insert ficar visível na
+busca do Zilliz, que é eventualmente consistente; enquanto isso o retriever
+descarta o hit duplicado do delta.
+"""
+import io
+import itertools
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.chunking_registry import get_strategy
+from src.dim_reduction import FULL_VECTOR_FIELD, rescore
+from src.local_index import LocalIndex
+from src.logger import get_logger
+
+logger = get_logger("ingestion")
+
+
+def extract_text(data: bytes, content_type: Optional[str] = None) -> str:
+    """Texto de um PDF (pelo content-type ou pela assinatura `%PDF`) ou de texto UTF-8."""
+    if (content_type or "").startswith("application/pdf") or data[:5] == b"%PDF-":
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        return "".join((page.extract_text() or "") + "\n" for page in reader.pages)
+    return data.decode("utf-8")
+
+
+class DeltaSegment:
+    """
+    Chunks recém-ingeridos, com a interface de shard (`search`, `get`). As
+    escritas trocam o `LocalIndex` por um novo só na poda; a busca segura o
+    lock apenas durante o produto interno sobre poucas linhas.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._index = LocalIndex(dim)
+        self._sources: Dict = {}
+        self._full: Dict = {}  # id -> vetor na dimensão cheia, quando o índice é reduzido
+        self._compacted_at: Dict = {}  # id -> instante em que foi copiado para o índice principal
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def add(self, ids: Sequence, vectors, texts: Sequence[str], source: str = "", full_vectors=None):
+        """full_vectors: os vetores antes da projeção (`EMBEDDING_PROJECTION`), para o rescoring."""
+        with self._lock:
+            self._index.add(list(ids), vectors, list(texts))
+            for row, id_ in enumerate(ids):
+                self._sources[id_] = source
+                if full_vectors is not None:
+                    self._full[id_] = full_vectors[row]
+
+    def search(self, vector, k: int, full=None) -> List[tuple]:
+        with self._lock:
+            if not len(self._index):
+                return []
+            hits = self._index.search(vector, k)[0]
+            if full is None:
+                return hits
+            return rescore(full, [(id_, score, self._full.get(id_)) for id_, score in hits])
+
+    def get(self, ids: Sequence) -> List[Dict]:
+        with self._lock:
+            return [{"id": entity["primary_key"], "text": entity["text"]}
+                    for entity in self._index.get([int(id_) for id_ in ids])]
+
+    def pending(self, primary_field: str = "id") -> List[Dict]:
+        """Entidades ainda não compactadas, no formato de insert do Zilliz."""
+        with self._lock:
+            vectors = self._index.vectors
+            entities = []
+            for row, id_ in enumerate(self._index.ids):
+                if id_ in self._compacted_at:
+                    continue
+                entity = {primary_field: id_, "vector": vectors[row].tolist(), "text": self._index.texts[row],
+                          "source": self._sources[id_]}
+                if id_ in self._full:
+                    entity[FULL_VECTOR_FIELD] = self._full[id_].tolist()
+                entities.append(entity)
+            return entities
+
+    def mark_compacted(self, ids: Sequence, when: Optional[float] = None):
+        when = time.monotonic() if when is None else when
+        with self._lock:
+            for id_ in ids:
+                self._compacted_at[id_] = when
+
+    def prune(self, grace: float, now: Optional[float] = None) -> int:
+        """Remove as linhas compactadas há mais de `grace` segundos; devolve quantas saíram."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = {id_ for id_, when in self._compacted_at.items() if now - when >= grace}
+            if not expired:
+                return 0
+            index = LocalIndex(self.dim)
+            keep = [row for row, id_ in enumerate(self._index.ids) if id_ not in expired]
+            if keep:
+                index.add([self._index.ids[row] for row in keep], self._index.vectors[keep],
+                          [self._index.texts[row] for row in keep])
+            self._index = index
+            for id_ in expired:
+                self._compacted_at.pop(id_)
+                self._sources.pop(id_, None)
+                self._full.pop(id_, None)
+            return len(expired)
+
+
+class IngestionService:
+    def __init__(self, embedder, delta: DeltaSegment, compactor: Optional[Callable[[List[Dict]], None]] = None,
+                 strategy: Optional[str] = None, reducer=None, primary_field: str = "id", batch_size: int = 8,
+                 max_queue: int = 100, max_jobs: int = 1000, compact_interval: float = 30.0, grace: float = 5.0,
+                 on_change: Optional[Callable[[], None]] = None, max_bytes: int = 20 * 1024 * 1024):
+        """
+        embedder: objeto com `encode(texts, batch_size)` (o `LazyEmbedder` do app).
+        compactor: recebe as entidades novas e as grava no índice principal; sem ele
+        o delta só cresce (útil em testes e com índice apenas local).
+        reducer: mesma projeção aplicada às queries (`EMBEDDING_PROJECTION`).
+        on_change: chamado a cada batch gravado no delta (ex.: `RetrievalCache.bump`).
+        max_bytes: maior documento aceito pelo `POST /ingest` (o resto é recusado com 413).
+        """
+        self.embedder = embedder
+        self.delta = delta
+        self.compactor = compactor
+        self.strategy = strategy or os.getenv("CHUNKING_STRATEGY", "day-paragraph")
+        self.reducer = reducer
+        self.primary_field = primary_field
+        self.batch_size = batch_size
+        self.compact_interval = compact_interval
+        self.grace = grace
+        self.max_jobs = max_jobs
+        self.on_change = on_change
+        self.max_bytes = max_bytes
+        self._queue: "queue.Queue" = queue.Queue(max_queue)
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        # ids únicos entre reinícios: base em nanossegundos + contador (cabe em INT64)
+        self._ids = itertools.count(time.time_ns())
+        self._stop = threading.Event()
+        self._compact_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self.stats = {"jobs": 0, "failed_jobs": 0, "chunks": 0, "compactions": 0, "compacted_chunks": 0,
+                      "compaction_errors": 0, "embed_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls, embedder, delta: DeltaSegment, compactor=None, reducer=None,
+                 primary_field: str = "id", on_change=None) -> "IngestionService":
+        return cls(embedder, delta, compactor, reducer=reducer, primary_field=primary_field, on_change=on_change,
+                   batch_size=int(os.getenv("INGEST_BATCH_SIZE", "8")),
+                   max_queue=int(os.getenv("INGEST_MAX_QUEUE", "100")),
+                   compact_interval=float(os.getenv("INGEST_COMPACT_INTERVAL", "30")),
+                   grace=float(os.getenv("INGEST_COMPACT_GRACE", "5")),
+                   max_bytes=int(float(os.getenv("INGEST_MAX_MB", "20")) * 1024 * 1024))
+
+    def start(self) -> "IngestionService":
+        if not self._threads:
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._work, name="ingest-worker", daemon=True)]
+            if self.compactor is not None:
+                self._threads.append(threading.Thread(target=self._compact_loop, name="ingest-compactor",
+                                                      daemon=True))
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, data: bytes, content_type: Optional[str] = None, source: str = "") -> Dict:
+        """Enfileira um documento; `queue.Full` se a fila estiver cheia (o endpoint responde 503)."""
+        job = {"id": uuid.uuid4().hex, "status": "queued", "source": source, "bytes": len(data), "chunks": 0,
+               "error": None, "submitted": time.time(), "finished": None}
+        self._queue.put_nowait((job, data, content_type))
+        with self._jobs_lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > self.max_jobs:  # só o histórico recente fica consultável
+                self._jobs.popitem(last=False)
+        return dict(job)
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self):
+        while not self._stop.is_set():
+            item = self._queue.get()
+            if item is None:
+                return
+            job, data, content_type = item
+            job["status"] = "processing"
+            try:
+                job["chunks"] = self.ingest(data, content_type, job["source"])
+                job["status"] = "done"
+                self.stats["jobs"] += 1
+            except Exception as e:
+                job["status"], job["error"] = "failed", f"{type(e).__name__}: {e}"
+                self.stats["failed_jobs"] += 1
+                logger.error("Ingestion job %s failed:\n%s", job["id"], traceback.format_exc())
+            job["finished"] = time.time()
+
+    def ingest(self, data: bytes, content_type: Optional[str] = None, source: str = "") -> int:
+        """Extrai, faz o chunking e embeda um documento para o delta (síncrono); devolve o número de chunks."""
+        chunks = [chunk for chunk in get_strategy(self.strategy)(extract_text(data, content_type)) if chunk.strip()]
+        if not chunks:
+            raise ValueError("documento sem texto")
+        for start in range(0, len(chunks), self.batch_size):
+            batch = chunks[start:start + self.batch_size]
+            began = time.perf_counter()
+            vectors = np.asarray(self.embedder.encode(batch, batch_size=len(batch)), dtype=np.float32)
+            full = None
+            if self.reducer is not None:
+                full, vectors = vectors, self.reducer.transform(vectors)
+            self.stats["embed_seconds"] += time.perf_counter() - began
+            # Cada batch já fica pesquisável; o documento inteiro não precisa terminar
+            self.delta.add([next(self._ids) for _ in batch], vectors, batch, source, full_vectors=full)
+            self.stats["chunks"] += len(batch)
+            if self.on_change is not None:
+                self.on_change()
+        logger.info("Ingested %s: %d chunks", source or "document", len(chunks))
+        return len(chunks)
+
+    def compact(self) -> int:
+        """Copia as linhas novas do delta para o índice principal e poda as antigas; devolve quantas copiou."""
+        with self._compact_lock:
+            entities = self.delta.pending(self.primary_field)
+            if entities:
+                self.compactor(entities)
+                self.delta.mark_compacted([entity[self.primary_field] for entity in entities])
+                self.stats["compactions"] += 1
+                self.stats["compacted_chunks"] += len(entities)
+                logger.info("Compacted %d delta chunks into the main index", len(entities))
+            self.delta.prune(self.grace)
+            return len(entities)
+
+    def _compact_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception as e:  # tenta de novo no próximo ciclo; as linhas seguem no delta
+                self.stats["compaction_errors"] += 1
+                logger.warning("Delta compaction failed: %s", e)
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, delta_rows=len(self.delta), queue_depth=self.queue_depth)
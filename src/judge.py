@@ -0,0 +1,223 @@
+"""
+LLM como juiz das respostas do RAG (`scripts/eval.py`).
+
+Vários pares (pergunta, resposta esperada, resposta do sistema) vão num
+único prompt, cada um num bloco `<item id="N">`, e o modelo responde um JSON
+com uma nota de 0 a 1 e um motivo por item (modo JSON da Groq). O parser
+aceita o JSON cru, dentro de bloco de código ou, em último caso, linhas
+`N: 0.8`; itens que não vieram na resposta são julgados de novo sozinhos.
+
+Os batches rodam em paralelo numa thread pool; as chamadas passam pelo
+`RateLimiter` do `GroqProxyRestAPI`, que segura RPM/TPM e reage a 429.
+
+Cada julgamento fica num cache em disco (JSONL, `JUDGE_CACHE`) com chave
+sha256 de (modelo, versão do prompt, pergunta, esperada, resposta). Rodar o
+eval de novo depois de mexer só no retrieval julga apenas as respostas que
+mudaram.
+
+    JUDGE_BATCH_SIZE=8   JUDGE_WORKERS=4   JUDGE_CACHE=data/judge_cache.jsonl
+    JUDGE_MODEL=llama3-8b-8192
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from src import fast_json
+from src.groq_proxy import FALLBACK_RESPONSE
+from src.logger import get_logger
+
+logger = get_logger("judge")
+
+PROMPT_VERSION = "1"  # mude ao alterar o prompt: invalida o cache
+
+SYSTEM_PROMPT = (
+    "You grade the answers of a question-answering system. For each item, compare the system answer with "
+    "the expected answer and give a score from 0 to 1, where 1 means the system answer states the same facts "
+    "as the expected answer and 0 means it is wrong or gives no answer. Partial answers get partial credit. "
+    'Reply with only a JSON object: {"judgements": [{"id": <item id>, "score": <number from 0 to 1>, '
+    '"reason": "<one sentence>"}]}, with one entry per item.'
+)
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_LINE_SCORE = re.compile(r"(?:item\s*)?#?(\d+)\s*[:\-=)]\s*(?:score\s*[:=]?\s*)?([01](?:\.\d+)?|\.\d+)", re.IGNORECASE)
+
+
+def judgement_key(question: str, expected: str, predicted: str, model: str = "") -> str:
+    payload = json.dumps([model, PROMPT_VERSION, question, expected, predicted], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_prompt(items: List[Dict]) -> str:
+    """Mensagem do usuário com um bloco por item; `items` têm `question`, `expected_answer`, `predicted_answer`."""
+    blocks = []
+    for number, item in enumerate(items, start=1):
+        blocks.append(f'<item id="{number}">\nQuestion: {item["question"]}\n'
+                      f'Expected answer: {item["expected_answer"]}\n'
+                      f'System answer: {item["predicted_answer"]}\n</item>')
+    return "\n\n".join(blocks)
+
+
+def _clamp(score) -> Optional[float]:
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        return None
+    if score != score:  # NaN
+        return None
+    return min(1.0, max(0.0, score))
+
+
+def parse_judgements(text: str, count: int) -> Dict[int, Dict]:
+    """
+    Notas por número do item (1..count) extraídas da resposta do juiz; itens
+    ausentes ou inválidos ficam de fora.
+    """
+    candidates = [match.group(1) for match in _FENCE.finditer(text)]
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        try:
+            data = fast_json.loads(candidate)
+        except ValueError:
+            continue
+        entries = data.get("judgements", data.get("items")) if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            continue
+        found = {}
+        for position, entry in enumerate(entries, start=1):
+            if not isinstance(entry, dict):
+                continue
+            try:
+                number = int(entry.get("id", position))
+            except (TypeError, ValueError):
+                continue
+            score = _clamp(entry.get("score"))
+            if 1 <= number <= count and score is not None:
+                found[number] = {"score": score, "reason": str(entry.get("reason", "")).strip()}
+        if found:
+            return found
+    # Sem JSON utilizável: linhas "1: 0.8" / "Item 2 - 0.5"
+    found = {}
+    for number, score in _LINE_SCORE.findall(text):
+        number = int(number)
+        if 1 <= number <= count and number not in found:
+            found[number] = {"score": _clamp(score), "reason": ""}
+    if not found and count == 1 and "{" not in text:
+        # Item único em texto livre: vale uma nota solta ("Grade: 0.65")
+        match = re.search(r"\b([01](?:\.\d+)?)\b", text)
+        if match:
+            found[1] = {"score": _clamp(match.group(1)), "reason": text.strip()[:500]}
+    return found
+
+
+class JudgementCache:
+    """Julgamentos por chave num JSONL só de acréscimo (a última linha de uma chave vale)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = fast_json.loads(line)
+                        self._entries[entry["key"]] = {"score": entry["score"], "reason": entry.get("reason", "")}
+                    except (ValueError, KeyError):
+                        continue  # linha truncada por uma execução interrompida
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, judgement: Dict):
+        with self._lock:
+            self._entries[key] = judgement
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(dict(judgement, key=key), ensure_ascii=False) + "\n")
+
+
+class LLMJudge:
+    def __init__(self, client, cache: Optional[JudgementCache] = None, batch_size: int = 8, max_workers: int = 4,
+                 model: Optional[str] = None):
+        """client: `GroqProxyRestAPI` (usa `client.judge`); model: modelo do juiz (padrão: o do client)."""
+        self.client = client
+        self.cache = cache if cache is not None else JudgementCache()
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max_workers
+        self.model = model or client.model_name
+        self.stats = {"items": 0, "cached": 0, "judged": 0, "batches": 0, "retried": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, client) -> "LLMJudge":
+        return cls(client, JudgementCache(os.getenv("JUDGE_CACHE", os.path.join("data", "judge_cache.jsonl"))),
+                   batch_size=int(os.getenv("JUDGE_BATCH_SIZE", "8")),
+                   max_workers=int(os.getenv("JUDGE_WORKERS", "4")),
+                   model=os.getenv("JUDGE_MODEL"))
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _judge_batch(self, batch: List[Dict]) -> Dict[int, Dict]:
+        self._count("batches")
+        reply = self.client.judge(SYSTEM_PROMPT, build_prompt(batch), model=self.model,
+                                  max_tokens=96 * len(batch) + 64)
+        found = parse_judgements(reply, len(batch))
+        if len(batch) > 1 and reply != FALLBACK_RESPONSE:
+            # O modelo pulou ou embaralhou itens: esses vão de novo, um por prompt
+            for number in range(1, len(batch) + 1):
+                if number not in found:
+                    self._count("retried")
+                    single = parse_judgements(self.client.judge(SYSTEM_PROMPT, build_prompt([batch[number - 1]]),
+                                                                model=self.model, max_tokens=160), 1)
+                    if 1 in single:
+                        found[number] = single[1]
+        return found
+
+    def judge(self, items: List[Dict]) -> List[Dict]:
+        """
+        Um julgamento por item (`score` em [0, 1] ou None se o juiz falhou, `reason`,
+        `cached`), na ordem de `items`. Itens repetidos são julgados uma vez.
+        """
+        keys = [judgement_key(item["question"], item["expected_answer"], item["predicted_answer"], self.model)
+                for item in items]
+        results: Dict[str, Dict] = {}
+        todo: Dict[str, Dict] = {}
+        for key, item in zip(keys, items):
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = dict(cached, cached=True)
+            else:
+                todo.setdefault(key, item)
+        self._count("items", len(items))
+        self._count("cached", sum(key in results for key in keys))
+
+        pending = list(todo.items())
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                replies = executor.map(lambda batch: self._judge_batch([item for _, item in batch]), batches)
+                for batch, found in zip(batches, replies):
+                    for number, (key, _) in enumerate(batch, start=1):
+                        if number in found:
+                            self.cache.put(key, found[number])
+                            results[key] = dict(found[number], cached=False)
+                            self._count("judged")
+                        else:
+                            results[key] = {"score": None, "reason": "judge reply could not be parsed",
+                                            "cached": False}
+                            self._count("failed")
+                            logger.warning("No judgement for question %r", todo[key]["question"][:80])
+        return [dict(results[key]) for key in keys]
@@ -0,0 +1,314 @@
+"""
+Gerador de carga para a API (`scripts/load_test.py`).
+
+- Open loop: chegadas a taxa constante (ou Poisson), independentes das
+  respostas, como usuários reais. A latência é medida a partir do instante em
+  que a requisição *deveria* ter saído, não de quando saiu: se o servidor (ou
+  o próprio gerador) atrasa, a fila entra na conta. Sem isso o gerador espera
+  junto com o servidor e os percentis saem otimistas (coordinated omission).
+- Closed loop: N usuários em sequência (envia, espera, pensa). O histograma
+  corrigido acrescenta as amostras que um usuário deixou de enviar enquanto
+  esperava uma resposta lenta (`record_corrected`, como no HdrHistogram).
+
+Os histogramas guardam microssegundos em buckets log-lineares (128 por
+potência de 2, erro relativo < 1%), então juntar e tirar percentis é barato.
+"""
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from src.logger import get_logger
+
+logger = get_logger("loadgen")
+
+_SUB_BUCKET_BITS = 7
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max_us = 0
+
+    @staticmethod
+    def _bucket(value_us: int) -> int:
+        if value_us < 2 ** _SUB_BUCKET_BITS:
+            return value_us
+        shift = value_us.bit_length() - 1 - _SUB_BUCKET_BITS
+        return ((shift + 1) << _SUB_BUCKET_BITS) + (value_us >> shift) - (1 << _SUB_BUCKET_BITS)
+
+    @staticmethod
+    def _bucket_value(bucket: int) -> int:
+        """Limite superior do bucket (percentis nunca saem menores que o valor real)."""
+        if bucket < 2 ** _SUB_BUCKET_BITS:
+            return bucket
+        shift = (bucket >> _SUB_BUCKET_BITS) - 1
+        mantissa = (bucket & (2 ** _SUB_BUCKET_BITS - 1)) + (1 << _SUB_BUCKET_BITS)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float, count: int = 1):
+        value_us = max(0, int(seconds * 1e6))
+        bucket = self._bucket(value_us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += count
+        self.max_us = max(self.max_us, value_us)
+
+    def record_corrected(self, seconds: float, expected_interval: float):
+        """
+        Registra `seconds` e, se passou de `expected_interval`, as amostras que
+        teriam sido medidas nesse meio tempo (seconds - intervalo, - 2 x intervalo, ...).
+        """
+        self.record(seconds)
+        if expected_interval <= 0:
+            return
+        missing = seconds - expected_interval
+        while missing >= expected_interval:
+            self.record(missing)
+            missing -= expected_interval
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += other.total
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil `q` (0-100) em segundos."""
+        if not self.total:
+            return None
+        rank = max(1, math.ceil(self.total * q / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._bucket_value(bucket), self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    def summary(self) -> Dict:
+        """Contagem e percentis em milissegundos."""
+        result = {"count": self.total}
+        for q in PERCENTILES:
+            value = self.percentile(q)
+            result[f"p{q:g}"] = None if value is None else round(value * 1000, 3)
+        result["max"] = round(self.max_us / 1000, 3) if self.total else None
+        return result
+
+
+def load_questions(path: Optional[str] = None) -> List[str]:
+    path = path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "questions.txt")
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class QuestionSampler:
+    """Perguntas sorteadas (com reposição) do arquivo: a mesma distribuição, semente fixa entre execuções."""
+
+    def __init__(self, questions: List[str], seed: int = 0):
+        if not questions:
+            raise ValueError("Nenhuma pergunta para a carga")
+        self.questions = questions
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self) -> str:
+        with self._lock:
+            return self._rng.choice(self.questions)
+
+
+class Outcome:
+    __slots__ = ("status", "ttfb")
+
+    def __init__(self, status, ttfb: Optional[float] = None):
+        self.status = status  # código HTTP ou nome da exceção
+        self.ttfb = ttfb
+
+    @property
+    def ok(self) -> bool:
+        return isinstance(self.status, int) and 200 <= self.status < 300
+
+
+class HttpTarget:
+    """
+    POST de `{field: pergunta}` num endpoint, com uma `requests.Session` por
+    thread. Com `stream=True` lê o corpo em pedaços e mede também o tempo até o
+    primeiro byte (endpoints SSE / streaming).
+    """
+
+    def __init__(self, base_url: str, endpoint: str = "/query", field: str = "question", stream: bool = False,
+                 timeout: float = 30.0, headers: Optional[Dict] = None):
+        self.url = base_url.rstrip("/") + endpoint
+        self.field = field
+        self.stream = stream
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._local = threading.local()
+
+    def _session(self):
+        import requests
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def __call__(self, question: str) -> Outcome:
+        import requests
+
+        start = time.perf_counter()
+        try:
+            with self._session().post(self.url, json={self.field: question}, headers=self.headers,
+                                      timeout=self.timeout, stream=self.stream) as response:
+                ttfb = None
+                if self.stream:
+                    for _ in response.iter_content(chunk_size=None):
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - start
+                else:
+                    response.content
+                return Outcome(response.status_code, ttfb)
+        except requests.exceptions.Timeout:
+            return Outcome("timeout")
+        except requests.exceptions.RequestException as e:
+            return Outcome(type(e).__name__)
+
+
+class LoadReport:
+    def __init__(self, mode: str, offered_rate: Optional[float] = None, concurrency: Optional[int] = None):
+        self.mode = mode
+        self.offered_rate = offered_rate
+        self.concurrency = concurrency
+        self.service = LatencyHistogram()    # do envio real até a resposta
+        self.corrected = LatencyHistogram()  # corrigido para coordinated omission
+        self.ttfb = LatencyHistogram()
+        self.statuses: Dict[str, int] = {}
+        self.elapsed = 0.0
+        self.late_sends = 0  # open loop: envios que saíram atrasados (gerador ou pool saturado)
+        self._lock = threading.Lock()
+
+    def add(self, outcome: Outcome, service: float, corrected: Optional[float] = None,
+            expected_interval: float = 0.0):
+        with self._lock:
+            key = str(outcome.status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            self.service.record(service)
+            if corrected is not None:
+                self.corrected.record(corrected)
+            else:
+                self.corrected.record_corrected(service, expected_interval)
+            if outcome.ttfb is not None:
+                self.ttfb.record(outcome.ttfb)
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if not (status.isdigit() and
+                                                                              200 <= int(status) < 300))
+
+    def summary(self) -> Dict:
+        requests = self.requests
+        result = {
+            "mode": self.mode,
+            "offered_rate": self.offered_rate,
+            "concurrency": self.concurrency,
+            "duration_s": round(self.elapsed, 3),
+            "requests": requests,
+            "throughput_rps": round(requests / self.elapsed, 3) if self.elapsed else None,
+            "ok_rps": round((requests - self.errors) / self.elapsed, 3) if self.elapsed else None,
+            "error_rate": round(self.errors / requests, 5) if requests else None,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency_ms": self.service.summary(),
+            "corrected_latency_ms": self.corrected.summary(),
+        }
+        if self.mode == "open":
+            result["late_sends"] = self.late_sends
+        if self.ttfb.total:
+            result["ttfb_ms"] = self.ttfb.summary()
+        return result
+
+
+def run_open_loop(send: Callable[[str], Outcome], next_question: Callable[[], str], rate: float,
+                  duration: float, max_in_flight: int = 256, arrivals: str = "constant", seed: int = 0,
+                  late_tolerance: float = 0.005) -> LoadReport:
+    """
+    `rate` requisições/s durante `duration` s. As chegadas seguem um relógio
+    fixo; com `max_in_flight` requisições em andamento as próximas esperam no
+    pool, e essa espera conta na latência corrigida.
+    """
+    if rate <= 0:
+        raise ValueError("rate precisa ser > 0")
+    report = LoadReport("open", offered_rate=rate)
+    rng = random.Random(seed)
+
+    def fire(question: str, intended: float):
+        sent = time.perf_counter()
+        if sent - intended > late_tolerance:
+            with report._lock:
+                report.late_sends += 1
+        outcome = send(question)
+        done = time.perf_counter()
+        report.add(outcome, done - sent, corrected=done - intended)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="loadgen") as executor:
+        intended = start
+        while intended < start + duration:
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(fire, next_question(), intended)
+            intended += rng.expovariate(rate) if arrivals == "poisson" else 1 / rate
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def run_closed_loop(send: Callable[[str], Outcome], next_question: Callable[[], str], concurrency: int,
+                    duration: float, think_time: float = 0.0,
+                    expected_interval: Optional[float] = None) -> LoadReport:
+    """
+    `concurrency` usuários enviando em sequência durante `duration` s.
+    `expected_interval` (intervalo normal entre requisições de um usuário)
+    corrige o histograma; por padrão, a mediana medida + `think_time`.
+    """
+    report = LoadReport("closed", concurrency=concurrency)
+    samples: List = []
+    samples_lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user():
+        local = []
+        while time.perf_counter() < deadline:
+            question = next_question()
+            sent = time.perf_counter()
+            outcome = send(question)
+            local.append((outcome, time.perf_counter() - sent))
+            if think_time:
+                time.sleep(think_time)
+        with samples_lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, name=f"loadgen-user-{i}", daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report.elapsed = time.perf_counter() - start
+
+    # A correção precisa do intervalo esperado, então é aplicada depois da execução
+    if expected_interval is None and samples:
+        raw = LatencyHistogram()
+        for _, service in samples:
+            raw.record(service)
+        expected_interval = raw.percentile(50) + think_time
+    for outcome, service in samples:
+        report.add(outcome, service, expected_interval=expected_interval or 0.0)
+    return report
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class LocalIndex:
+    """
+    Índice vetorial em memória, busca exata por produto interno. Com vetores
+    normalizados (como os do modelo de embeddings) equivale ao COSINE do Zilliz.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: List = []
+        self.texts: List[str] = []
+        self._id_to_row: Dict = {}
+        self._blocks: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = np.zeros((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Matriz (n, dim); os blocos inseridos são concatenados uma vez, sob demanda."""
+        if self._blocks:
+            self._matrix = np.concatenate([self._matrix] + self._blocks)
+            self._blocks = []
+        return self._matrix
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + sum(len(text.encode("utf-8")) for text in self.texts)
+
+    def add(self, ids: Sequence, vectors, texts: Sequence[str]):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not (len(ids) == len(vectors) == len(texts)):
+            raise ValueError("ids, vectors e texts precisam ter o mesmo tamanho")
+        for id_ in ids:
+            self._id_to_row[id_] = len(self.ids)
+            self.ids.append(id_)
+        self.texts.extend(texts)
+        self._blocks.append(vectors)
+
+    def search(self, queries, k: int = 5) -> List[List[Tuple[object, float]]]:
+        """Top-k (id, score) para cada query; aceita um vetor ou uma matriz de queries."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        matrix = self.vectors
+        if len(matrix) == 0:
+            return [[] for _ in range(len(queries))]
+        return self._top_k(queries @ matrix.T, k)
+
+    def _top_k(self, scores: np.ndarray, k: int) -> List[List[Tuple[object, float]]]:
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([(self.ids[i], float(scores[row, i])) for i in ordered])
+        return results
+
+    def get(self, ids: Sequence) -> List[Dict]:
+        """Entidades no formato do Zilliz (`primary_key`, `text`) para os ids existentes."""
+        rows = [self._id_to_row[id_] for id_ in ids if id_ in self._id_to_row]
+        return [{"primary_key": self.ids[row], "text": self.texts[row]} for row in rows]
+
+
+class TwoStageIndex(LocalIndex):
+    """
+    Busca em dois estágios: candidatos (`k * oversample`) pela matriz reduzida
+    (`src/dim_reduction.py`) e rescoring exato na dimensão cheia. Uma PCA ainda
+    não ajustada é ajustada nos vetores do índice na primeira busca.
+    """
+
+    def __init__(self, dim: int, reducer, oversample: int = 4):
+        super().__init__(dim)
+        self.reducer = reducer
+        self.oversample = oversample
+        self._reduced: Optional[np.ndarray] = None
+
+    def add(self, ids: Sequence, vectors, texts: Sequence[str]):
+        super().add(ids, vectors, texts)
+        self._reduced = None
+
+    @property
+    def reduced_vectors(self) -> np.ndarray:
+        if self._reduced is None:
+            if not self.reducer.fitted:
+                self.reducer.fit(self.vectors)
+            self._reduced = self.reducer.transform(self.vectors)
+        return self._reduced
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + self.reduced_vectors.nbytes
+
+    def search_reduced(self, queries, k: int = 5) -> List[List[Tuple[object, float]]]:
+        """Só o estágio grosso (sem rescoring), para comparação."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+        return self._top_k(self.reducer.transform(queries) @ self.reduced_vectors.T, k)
+
+    def search(self, queries, k: int = 5) -> List[List[Tuple[object, float]]]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        reduced, matrix = self.reduced_vectors, self.vectors
+        if len(matrix) == 0:
+            return [[] for _ in range(len(queries))]
+        k = min(k, len(matrix))
+        n_candidates = min(k * self.oversample, len(matrix))
+        coarse = self.reducer.transform(queries) @ reduced.T
+        candidates = np.argpartition(-coarse, n_candidates - 1, axis=1)[:, :n_candidates]
+        results = []
+        for row, rows in enumerate(candidates):
+            scores = matrix[rows] @ queries[row]
+            ordered = np.argsort(-scores)[:k]
+            results.append([(self.ids[rows[i]], float(scores[i])) for i in ordered])
+        return results
@@ -0,0 +1,69 @@
+import logging
+import os
+import random
+import sys
+
+from src.fast_json import dumps
+
+_configured = False
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every WARNING+ record but only a `rate` fraction of DEBUG/INFO ones."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields come from `extra={"fields": {...}}`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return dumps(entry).decode("utf-8")
+
+
+def configure_logging(level: str = None, sample_rate: float = None, json_format: bool = None):
+    """
+    Configures the `rag` logger tree once per process.
+    Defaults come from LOG_LEVEL, LOG_SAMPLE_RATE and LOG_FORMAT (json|text).
+    """
+    global _configured
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    sample_rate = sample_rate if sample_rate is not None else float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "json") == "json"
+
+    root = logging.getLogger("rag")
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(SamplingFilter(sample_rate))
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    root.propagate = False
+    _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns a child of the `rag` logger, configuring the tree on first use."""
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(f"rag.{name}")
+
@@ -0,0 +1,175 @@
+"""
+Retrieval especulativo enquanto o usuário digita (`POST /prefetch`).
+
+O cliente manda o prefixo da pergunta a cada pausa na digitação. O endpoint
+só registra o prefixo e responde na hora; um worker em background embeda o
+prefixo mais recente de cada sessão (prefixos que chegam antes do worker
+pegá-los substituem o anterior, então uma rajada de teclas custa um encode),
+busca `candidates` chunks e aquece o `RetrievalCache`: os textos dos
+candidatos e o top-k do próprio prefixo. Quando o `/query` final chega, o
+search ainda roda (a pergunta completa tem outro vetor), mas o get por ids
+sai do cache; se a pergunta for igual ao último prefixo, o retrieval inteiro
+sai do cache.
+
+Custo limitado por dois token buckets: um por sessão (`max_per_session`
+prefetches por `period` segundos) e um global (`max_total` no mesmo período),
+para que muitas sessões juntas não tomem o modelo das queries; acima de
+qualquer um deles o endpoint responde 429. Desligado por padrão. O `/query` com
+o mesmo `session_id` conta se algum dos chunks usados veio dos candidatos
+pré-buscados (`used_rate` no `/metrics`).
+
+    PREFETCH_ENABLED=false           # opt-in; requer o RetrievalCache (RETRIEVAL_CACHE_MB > 0)
+    PREFETCH_MIN_CHARS=12
+    PREFETCH_CANDIDATES=10
+    PREFETCH_SESSION_MAX=20          # prefetches por sessão a cada PREFETCH_SESSION_PERIOD s
+    PREFETCH_SESSION_PERIOD=60
+    PREFETCH_GLOBAL_MAX=120          # prefetches de todas as sessões a cada PREFETCH_SESSION_PERIOD s
+"""
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from src.logger import get_logger
+from src.rate_limiter import TokenBucket
+
+logger = get_logger("prefetch")
+
+
+class _Session:
+    def __init__(self, budget: TokenBucket, history: int):
+        self.budget = budget
+        self.candidates: Deque[List[str]] = deque(maxlen=history)  # candidatos dos últimos prefetches
+        self.last_prefix: Optional[str] = None
+
+
+class Prefetcher:
+    def __init__(self, fetch: Callable[[str], List[str]], min_chars: int = 12, max_per_session: float = 20,
+                 period: float = 60.0, max_sessions: int = 10000, history: int = 3, max_total: float = 120):
+        """fetch: faz o retrieval especulativo de um prefixo e devolve os ids candidatos (formato de `source_ids`)."""
+        self.fetch = fetch
+        self.min_chars = min_chars
+        self.max_per_session = max_per_session
+        self.period = period
+        self.max_sessions = max_sessions
+        self.history = history
+        self.max_total = max_total
+        self._global_budget = TokenBucket(max_total, period)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._pending: "OrderedDict[str, str]" = OrderedDict()  # sessão -> prefixo mais recente
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self.stats = {"requests": 0, "prefetches": 0, "coalesced": 0, "duplicates": 0, "too_short": 0,
+                      "over_budget": 0, "over_global_budget": 0, "errors": 0, "queries": 0, "used": 0}
+
+    @classmethod
+    def from_env(cls, fetch) -> Optional["Prefetcher"]:
+        if os.getenv("PREFETCH_ENABLED", "false").lower() != "true":
+            return None
+        return cls(fetch, min_chars=int(os.getenv("PREFETCH_MIN_CHARS", "12")),
+                   max_per_session=float(os.getenv("PREFETCH_SESSION_MAX", "20")),
+                   period=float(os.getenv("PREFETCH_SESSION_PERIOD", "60")),
+                   max_total=float(os.getenv("PREFETCH_GLOBAL_MAX", "120")))
+
+    def start(self) -> "Prefetcher":
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._work, name="prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _Session(TokenBucket(self.max_per_session, self.period), self.history)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def submit(self, session_id: str, prefix: str) -> str:
+        """
+        "queued", "coalesced" (substituiu um prefixo ainda não processado), "duplicate",
+        "too_short", "over_budget" ou "over_global_budget" (nos dois últimos o endpoint responde 429).
+        """
+        prefix = prefix.strip()
+        with self._cond:
+            self.stats["requests"] += 1
+            if len(prefix) < self.min_chars:
+                self.stats["too_short"] += 1
+                return "too_short"
+            session = self._session(session_id)
+            if prefix == session.last_prefix or self._pending.get(session_id) == prefix:
+                self.stats["duplicates"] += 1
+                return "duplicate"
+            if session_id in self._pending:
+                # Só o prefixo mais recente é buscado; o pendente não gastou orçamento ainda
+                self._pending[session_id] = prefix
+                self.stats["coalesced"] += 1
+                return "coalesced"
+            if not session.budget.try_acquire():
+                self.stats["over_budget"] += 1
+                return "over_budget"
+            if not self._global_budget.try_acquire():
+                self.stats["over_global_budget"] += 1
+                return "over_global_budget"
+            self._pending[session_id] = prefix
+            self._cond.notify()
+            return "queued"
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                session_id, prefix = self._pending.popitem(last=False)
+            self.run(session_id, prefix)
+
+    def run(self, session_id: str, prefix: str):
+        """Prefetch síncrono de um prefixo (o worker chama este método)."""
+        try:
+            candidates = self.fetch(prefix)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("Prefetch failed: %s", e)
+            return
+        with self._cond:
+            session = self._session(session_id)
+            session.last_prefix = prefix
+            session.candidates.append(list(candidates))
+            self.stats["prefetches"] += 1
+
+    def record_query(self, session_id: Optional[str], source_ids: List[str]) -> bool:
+        """Conta um /query da sessão; True se algum chunk usado estava entre os candidatos pré-buscados."""
+        if not session_id:
+            return False
+        with self._cond:
+            session = self._sessions.get(session_id)
+            if session is None or not session.candidates:
+                return False
+            prefetched = {id_ for candidates in session.candidates for id_ in candidates}
+            used = any(id_ in prefetched for id_ in source_ids)
+            self.stats["queries"] += 1
+            self.stats["used"] += used
+            session.candidates.clear()  # a próxima pergunta da sessão começa do zero
+            session.last_prefix = None
+            return used
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self.stats, sessions=len(self._sessions), pending=len(self._pending))
+        stats["used_rate"] = stats["used"] / stats["queries"] if stats["queries"] else None
+        return stats
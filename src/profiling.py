@@ -0,0 +1,201 @@
+"""
+Profiling sob demanda.
+
+- `QueryProfiler`: roda um `RAGSystem.process_query` sob cProfile quando a
+  requisição traz o header `X-Profile` com o `ADMIN_TOKEN` (sem token
+  configurado o header é ignorado) ou cai na amostra `PROFILE_SAMPLE_RATE`. Só um profile por vez.
+- `MemoryProfiler`: snapshots do tracemalloc em pontos da ingestão
+  (`scripts/prepare_data.py` com `PROFILE_MEMORY=1`), com o que cresceu entre
+  um ponto e outro.
+
+Os resultados vão para um `ProfileStore`: um diretório com no máximo
+`max_entries` perfis (os mais antigos são apagados), servido em `/admin/profiles`.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from src import fast_json
+from src.logger import get_logger
+
+logger = get_logger("profiling")
+
+_ID_PATTERN = re.compile(r'^\d+-[a-z]+$')
+
+
+class ProfileStore:
+    """Ring buffer em disco: `<id>.json` (metadados), `<id>.txt` (relatório) e opcionalmente `<id>.prof`."""
+
+    def __init__(self, directory: str = "profiles", max_entries: int = 50):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ProfileStore":
+        return cls(os.getenv("PROFILE_DIR", "profiles"), int(os.getenv("PROFILE_MAX_ENTRIES", "50")))
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def save(self, kind: str, report: str, meta: Optional[Dict] = None, raw_profile: Optional[cProfile.Profile] = None) -> str:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            profile_id = f"{time.time_ns()}-{kind}"
+            if raw_profile is not None:
+                raw_profile.dump_stats(self._path(profile_id, "prof"))
+            with open(self._path(profile_id, "txt"), "w", encoding="utf-8") as f:
+                f.write(report)
+            meta = dict(meta or {}, id=profile_id, kind=kind, created=time.time(), raw=raw_profile is not None)
+            # Metadados por último: uma entrada só aparece na listagem quando está completa
+            with open(self._path(profile_id, "json"), "wb") as f:
+                f.write(fast_json.dumps(meta))
+            self._prune()
+        return profile_id
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def _prune(self):
+        ids = self._ids()
+        for profile_id in ids[:max(0, len(ids) - self.max_entries)]:
+            for extension in ("json", "txt", "prof"):
+                try:
+                    os.remove(self._path(profile_id, extension))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict]:
+        """Metadados, do mais recente para o mais antigo."""
+        entries = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(self._path(profile_id, "json"), "rb") as f:
+                    entries.append(fast_json.loads(f.read()))
+            except FileNotFoundError:  # apagado pelo ring buffer entre listar e ler
+                continue
+        return entries
+
+    def path(self, profile_id: str, extension: str = "txt") -> Optional[str]:
+        """Caminho de um artefato, ou None se o id for inválido ou já tiver saído do buffer."""
+        if not _ID_PATTERN.match(profile_id) or extension not in ("txt", "prof", "json"):
+            return None
+        path = self._path(profile_id, extension)
+        return path if os.path.exists(path) else None
+
+
+class _ProfileHandle:
+    __slots__ = ("id",)
+
+    def __init__(self):
+        self.id: Optional[str] = None
+
+
+class QueryProfiler:
+    def __init__(self, store: ProfileStore, sample_rate: float = 0.0, token: Optional[str] = None,
+                 top: int = 40):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.token = token
+        self.top = top
+        self._busy = threading.Lock()
+
+    @classmethod
+    def from_env(cls, store: Optional[ProfileStore] = None) -> "QueryProfiler":
+        return cls(store or ProfileStore.from_env(), float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+                   os.getenv("ADMIN_TOKEN"))
+
+    def requested(self, header: Optional[str]) -> bool:
+        if header:
+            # Sem ADMIN_TOKEN o header não liga nada: profiling custa CPU e grava em disco
+            return bool(self.token) and header == self.token
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def maybe_profile(self, header: Optional[str], name: str, **meta) -> Iterator[_ProfileHandle]:
+        """Perfila o bloco se pedido/amostrado e se nenhum outro profile estiver em andamento."""
+        handle = _ProfileHandle()
+        if not self.requested(header) or not self._busy.acquire(blocking=False):
+            yield handle
+            return
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                yield handle
+            finally:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            report = io.StringIO()
+            pstats.Stats(profile, stream=report).sort_stats("cumulative").print_stats(self.top)
+            handle.id = self.store.save("cpu", report.getvalue(), dict(meta, name=name, seconds=elapsed,
+                                                                       trigger="header" if header else "sample"),
+                                        raw_profile=profile)
+            logger.info("Profiled %s in %.1f ms (%s)", name, elapsed * 1000, handle.id)
+        finally:
+            self._busy.release()
+
+
+class MemoryProfiler:
+    """
+    `checkpoint(label)` tira um snapshot do tracemalloc e guarda as linhas que
+    mais cresceram desde o anterior; `finish()` grava o relatório no store.
+    """
+
+    def __init__(self, store: ProfileStore, name: str, frames: int = 10, top: int = 15):
+        self.store = store
+        self.name = name
+        self.top = top
+        self.sections: List[str] = []
+        self.checkpoints: List[Dict] = []
+        self._previous = None
+        self._started_here = not tracemalloc.is_tracing()
+        if self._started_here:
+            tracemalloc.start(frames)
+
+    def checkpoint(self, label: str):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        self.checkpoints.append({"label": label, "current_mib": current / 2**20, "peak_mib": peak / 2**20})
+        lines = [f"== {label}: current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB"]
+        if self._previous is None:
+            stats = snapshot.statistics("lineno")[:self.top]
+        else:
+            stats = snapshot.compare_to(self._previous, "lineno")[:self.top]
+        lines.extend(str(stat) for stat in stats)
+        self.sections.append("\n".join(lines))
+        self._previous = snapshot
+
+    def finish(self) -> str:
+        if self._started_here:
+            tracemalloc.stop()
+        return self.store.save("memory", "\n\n".join(self.sections) + "\n",
+                               {"name": self.name, "checkpoints": self.checkpoints})
+
+
+@contextmanager
+def memory_profile(name: str, enabled: bool = True, store: Optional[ProfileStore] = None):
+    """`with memory_profile("prepare_data") as mem: ... mem.checkpoint("chunks")`; None se desligado."""
+    if not enabled:
+        yield None
+        return
+    profiler = MemoryProfiler(store or ProfileStore.from_env(), name)
+    try:
+        yield profiler
+    finally:
+        profile_id = profiler.finish()
+        logger.info("Memory profile of %s saved as %s", name, profile_id)
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from typing import Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for TPM accounting."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `capacity` units per `period` seconds."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Reserves `amount` units and returns how long the caller must wait before using them."""
+        amount = min(float(amount), self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Takes `amount` units only if they are available now (no debt, unlike `reserve`)."""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens < amount:
+                return False
+            self.tokens -= amount
+            return True
+
+    def drain(self, seconds: float):
+        """Empties the bucket so nothing is granted for the next `seconds` (used on 429)."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit tuned with AIMD: +1 after `increase_every` successes,
+    halved on a 429. Callers above the limit wait instead of failing.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32, increase_every: int = 10):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase_every = increase_every
+        self.in_flight = 0
+        self.successes = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= self.limit:
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def on_success(self):
+        with self.cond:
+            self.successes += 1
+            if self.successes >= self.increase_every:
+                self.successes = 0
+                if self.limit < self.maximum:
+                    self.limit += 1
+                    self.cond.notify_all()
+
+    def on_throttle(self):
+        with self.cond:
+            self.successes = 0
+            self.limit = max(self.minimum, self.limit // 2)
+
+
+class RateLimiter:
+    """
+    Client-side limiter for the Groq API: requests-per-minute and tokens-per-minute
+    buckets plus an AIMD concurrency window. Shared by every call of a client.
+    """
+
+    def __init__(self, requests_per_minute: int = 30, tokens_per_minute: int = 6000,
+                 initial_concurrency: int = 4, max_concurrency: int = 32, max_retries: int = 5):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(initial=initial_concurrency, maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.stats = {"requests": 0, "throttled": 0, "waited_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            requests_per_minute=int(os.getenv("GROQ_RPM", "30")),
+            tokens_per_minute=int(os.getenv("GROQ_TPM", "6000")),
+            initial_concurrency=int(os.getenv("GROQ_CONCURRENCY", "4")),
+            max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "32")),
+        )
+
+    def acquire(self, estimated_tokens: int):
+        """Blocks until one request with `estimated_tokens` may be sent."""
+        self.concurrency.acquire()
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            time.sleep(wait)
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["waited_seconds"] += wait
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None):
+        """Releases the concurrency slot and feeds the outcome back into AIMD."""
+        if throttled:
+            self.concurrency.on_throttle()
+            if retry_after:
+                self.requests.drain(retry_after)
+            with self._stats_lock:
+                self.stats["throttled"] += 1
+        else:
+            self.concurrency.on_success()
+        self.concurrency.release()
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Reads `retry-after` (seconds) from a response's headers, if present."""
+    value = headers.get("retry-after") if headers is not None else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
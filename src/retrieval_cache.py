@@ -0,0 +1,150 @@
+"""
+Cache da etapa de retrieval do `/query`: (vetor da pergunta, filtro, k) →
+textos e ids do top-k. Um hit pula as duas chamadas ao Zilliz (search e get
+por ids) ou o fan-out nos shards.
+
+A chave é um hash do vetor quantizado (`round(v * scale)` em int16): a mesma
+pergunta dá o mesmo vetor a menos de ruído de ponto flutuante (runtime,
+tamanho do batch), e o ruído some na quantização. O filtro e o k entram na
+chave.
+
+A memória é limitada em bytes (estimativa: textos + ids + um overhead fixo
+por entrada) com despejo LRU. O cache guarda a geração do índice: quando a
+ingestão muda o índice (`bump()`, chamado pelo /ingest), o cache é
+esvaziado e a geração avança. Quem consulta guarda a geração *antes* de ir
+ao Zilliz, então um resultado lido durante uma ingestão é recusado no `put`
+em vez de entrar velho. Reingestões fora do processo
+(`prepare_data.py`) são cobertas pelo TTL ou por `POST /admin/cache/invalidate`.
+
+O mesmo orçamento guarda textos de chunks por id (`put_chunks`), aquecidos
+pelo `/prefetch` (`src/prefetch.py`): uma query cujo top-k já está em cache
+faz só o search e pula o get por ids.
+
+    RETRIEVAL_CACHE_MB=32       # 0 desliga
+    RETRIEVAL_CACHE_TTL=600     # segundos; 0 = sem expiração
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+ENTRY_OVERHEAD = 256  # bytes por entrada além dos textos (chave, tuplas, listas)
+
+
+class CachedRetrieval(NamedTuple):
+    context: List[str]
+    source_ids: List[str]
+
+
+class _Entry(NamedTuple):
+    value: object  # CachedRetrieval ou o texto de um chunk
+    expires: float
+    size: int
+
+
+class RetrievalCache:
+    def __init__(self, max_bytes: int = 32 * 2**20, ttl: float = 600.0, scale: float = 4096.0):
+        """scale: passo de quantização 1/scale por coordenada (vetores normalizados, |v| <= 1)."""
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.scale = scale
+        self.generation = 0
+        self.bytes = 0
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "expired": 0, "evictions": 0, "invalidations": 0,
+                      "chunk_hits": 0, "chunk_misses": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["RetrievalCache"]:
+        """None com `RETRIEVAL_CACHE_MB=0`."""
+        max_mb = float(os.getenv("RETRIEVAL_CACHE_MB", "32"))
+        if max_mb <= 0:
+            return None
+        return cls(int(max_mb * 2**20), float(os.getenv("RETRIEVAL_CACHE_TTL", "600")))
+
+    def key(self, vector, k: int, filter_expr: str = "") -> bytes:
+        quantized = np.round(np.asarray(vector, dtype=np.float32) * self.scale).astype(np.int16)
+        digest = hashlib.blake2b(quantized.tobytes(), digest_size=16)
+        digest.update(f"|{k}|{filter_expr}".encode("utf-8"))
+        return digest.digest()
+
+    def _lookup(self, key, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires and entry.expires < now:
+            self.stats["expired"] += 1
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def get(self, key: bytes) -> Optional[CachedRetrieval]:
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+            self.stats["hits" if value is not None else "misses"] += 1
+            return value
+
+    def _store(self, key, value, size: int):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, time.monotonic() + self.ttl if self.ttl else 0.0, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+
+    def _current(self, generation: int) -> bool:
+        if generation != self.generation:  # o índice mudou durante a consulta
+            self.stats["stale"] += 1
+            return False
+        return True
+
+    def put(self, key: bytes, context: List[str], source_ids: List[str], generation: int):
+        """`generation`: o valor de `self.generation` lido antes da consulta ao índice."""
+        size = ENTRY_OVERHEAD + sum(len(text.encode("utf-8")) + 64 for text in context) + \
+            sum(len(id_) + 64 for id_ in source_ids)
+        with self._lock:
+            if self._current(generation) and size <= self.max_bytes:
+                self._store(key, CachedRetrieval(list(context), list(source_ids)), size)
+
+    def get_chunks(self, ids: List[str]) -> Dict[str, str]:
+        """Textos em cache dos ids pedidos (no formato de `source_ids`)."""
+        found = {}
+        with self._lock:
+            now = time.monotonic()
+            for id_ in ids:
+                text = self._lookup(("chunk", id_), now)
+                if text is not None:
+                    found[id_] = text
+            self.stats["chunk_hits"] += len(found)
+            self.stats["chunk_misses"] += len(ids) - len(found)
+        return found
+
+    def put_chunks(self, chunks: Dict[str, str], generation: int):
+        with self._lock:
+            if not self._current(generation):
+                return
+            for id_, text in chunks.items():
+                self._store(("chunk", id_), text, ENTRY_OVERHEAD + len(id_) + len(text.encode("utf-8")))
+
+    def _remove(self, key: bytes):
+        self.bytes -= self._entries.pop(key).size
+
+    def bump(self):
+        """Nova geração do índice: esvazia o cache e recusa `put`s de consultas feitas antes."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.bytes = 0
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self.bytes, max_bytes=self.max_bytes,
+                        generation=self.generation)
@@ -0,0 +1,87 @@
+"""
+Avaliação de recuperação sem LLM: um chunk é relevante para uma pergunta se
+contém os termos-chave da resposta esperada. Os termos-chave são as palavras
+maiúsculas da resposta (mesma extração de `palavras_maiusculas`) que não
+aparecem na pergunta, além de números (anos, quantidades). Respostas sem nenhum
+desses termos usam as palavras longas (>= 5 letras) ausentes da pergunta.
+A comparação com o chunk ignora maiúsculas/minúsculas.
+"""
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.chunking_engine import CAPITALIZED_PATTERN
+
+NUMBER_PATTERN = re.compile(r'\b\d+\b')
+WORD_PATTERN = re.compile(r'\b[a-z]{5,}\b')
+# Início de frase e palavras comuns que não identificam a resposta
+STOP_TERMS = {"The", "A", "An", "It", "In", "On", "Of", "Dr", "Her", "His", "She", "He", "They", "This"}
+
+
+def answer_key_terms(question: str, expected_answer: str) -> List[str]:
+    question_terms = set(CAPITALIZED_PATTERN.findall(question)) | set(NUMBER_PATTERN.findall(question))
+    terms = []
+    for term in CAPITALIZED_PATTERN.findall(expected_answer) + NUMBER_PATTERN.findall(expected_answer):
+        if term not in question_terms and term not in STOP_TERMS and term not in terms:
+            terms.append(term)
+    if not terms:
+        question_words = set(WORD_PATTERN.findall(question.lower()))
+        for word in WORD_PATTERN.findall(expected_answer):
+            if word not in question_words and word not in terms:
+                terms.append(word)
+    return terms
+
+
+def is_relevant(chunk_text: str, key_terms: Sequence[str], min_fraction: float = 1.0) -> bool:
+    """True se pelo menos `min_fraction` dos termos-chave aparecem no chunk."""
+    if not key_terms:
+        return False
+    chunk_text = chunk_text.lower()
+    found = sum(1 for term in key_terms if term.lower() in chunk_text)
+    return found >= min_fraction * len(key_terms)
+
+
+def recall_at_k(retrieved: Sequence[Sequence[str]], qa_pairs: Sequence[Dict[str, str]],
+                k: int, min_fraction: float = 1.0) -> float:
+    """
+    Fração das perguntas (com termos-chave) em que algum dos `k` primeiros chunks
+    recuperados é relevante. `retrieved[i]` são os textos para `qa_pairs[i]`.
+    """
+    hits = evaluated = 0
+    for texts, qa in zip(retrieved, qa_pairs):
+        terms = answer_key_terms(qa["question"], qa["expected_answer"])
+        if not terms:
+            continue
+        evaluated += 1
+        if any(is_relevant(text, terms, min_fraction) for text in texts[:k]):
+            hits += 1
+    return hits / evaluated if evaluated else 0.0
+
+
+def evaluate_retrieval(index, question_vectors, qa_pairs: Sequence[Dict[str, str]], k: int = 5,
+                       min_fraction: float = 1.0) -> Dict:
+    """
+    Recall@1, recall@k e MRR de um índice local (`LocalIndex`) para os vetores das
+    perguntas, com uma única busca em matriz. Por pergunta: termos-chave, rank do
+    primeiro chunk relevante (None se nenhum veio no top-k) e ids/scores recuperados.
+    """
+    hits_per_question = index.search(np.asarray(question_vectors, dtype=np.float32), k)
+    questions = []
+    for qa, hits in zip(qa_pairs, hits_per_question):
+        terms = answer_key_terms(qa["question"], qa["expected_answer"])
+        texts = [entity["text"] for entity in index.get([id_ for id_, _ in hits])]
+        rank = next((rank for rank, text in enumerate(texts, start=1)
+                     if is_relevant(text, terms, min_fraction)), None) if terms else None
+        questions.append({"question": qa["question"], "key_terms": terms, "rank": rank,
+                          "ids": [id_ for id_, _ in hits], "scores": [round(score, 6) for _, score in hits]})
+    evaluated = [question for question in questions if question["key_terms"]]
+    count = len(evaluated) or 1
+    summary = {
+        "questions": len(questions),
+        "evaluated": len(evaluated),
+        "recall@1": sum(question["rank"] == 1 for question in evaluated) / count,
+        f"recall@{k}": sum(question["rank"] is not None for question in evaluated) / count,
+        "mrr": sum(1 / question["rank"] for question in evaluated if question["rank"]) / count,
+    }
+    return {"summary": summary, "questions": questions}
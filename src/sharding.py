@@ -0,0 +1,302 @@
+"""
+Retrieval sobre N shards: cada shard é um índice local (`LocalIndex`, ex. uma
+exportação de `src/collection_io.py`) ou uma coleção remota no Zilliz/Milvus.
+
+A busca vai para todos os shards em paralelo. Cada shard devolve o seu top-k
+já ordenado, e o top-k global sai de um merge por heap (`heapq.merge`) das
+listas. Um shard que não responde em `timeout` segundos (ou que falha) fica
+de fora da resposta: a busca devolve o que os outros shards acharam e lista
+os shards degradados, em vez de falhar ou esperar o mais lento.
+
+Com vetores reduzidos (`EMBEDDING_PROJECTION`), `search(..., full=...)` pede
+`candidates` hits a cada shard e o shard os reordena pelo vetor cheio que
+tiver guardado (`src/dim_reduction.py`); o merge usa esses scores.
+
+Na ingestão, cada documento vai para um shard escolhido pelo hash estável do
+id (`HashRouter`) ou por um campo de metadados (`MetadataRouter`, ex. o
+arquivo de origem), então ingestão e busca crescem com o número de shards.
+
+Configuração por ambiente (`ShardedRetriever.from_env`):
+
+    SHARDS="voss=zilliz:dr_voss,archive=local:backups/archive"
+    SHARD_ROUTING=hash | field:source[:voss]     # campo e shard padrão
+    SHARD_TIMEOUT_MS=500
+    INGEST_PRIMARY_FIELD=primary_key             # chave das entidades na ingestão/roteamento
+
+Os shards remotos leem a chave dos hits do schema de cada coleção
+(`ZillizClient.get_primary_field`), então não há um nome de campo a configurar.
+"""
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from src.dim_reduction import FULL_VECTOR_FIELD, rescore
+from src.logger import get_logger
+from src.tracing import span
+
+logger = get_logger("sharding")
+
+
+class ShardHit(NamedTuple):
+    shard: str
+    id: object
+    score: float
+
+
+class LocalShard:
+    def __init__(self, index, text_field: str = "text"):
+        self.index = index
+        self.text_field = text_field
+
+    def search(self, vector, k: int, full=None) -> List[tuple]:
+        # A exportação local só tem os vetores do índice: sem rescoring, fica o score reduzido
+        return self.index.search(vector, k)[0]
+
+    def get(self, ids: Sequence) -> List[Dict]:
+        return [{"id": entity["primary_key"], "text": entity["text"]} for entity in self.index.get(ids)]
+
+    def insert(self, entities: List[Dict], primary_field: str = "id", vector_field: str = "vector"):
+        self.index.add([entity[primary_field] for entity in entities],
+                       np.asarray([entity[vector_field] for entity in entities], dtype=np.float32),
+                       [entity.get(self.text_field, "") for entity in entities])
+
+
+class RemoteShard:
+    """Uma coleção do Zilliz/Milvus acessada pelo `ZillizClient` (com retries, hedge e fallback dele)."""
+
+    def __init__(self, client, collection_name: str, primary_field: Optional[str] = None):
+        """primary_field: chave primária da coleção; None = lida do schema (`client.get_primary_field`)."""
+        self.client = client
+        self.collection_name = collection_name
+        self._primary_field = primary_field
+
+    @property
+    def primary_field(self) -> Optional[str]:
+        if self._primary_field is None:
+            try:
+                self._primary_field = self.client.get_primary_field(self.collection_name)
+            except Exception as e:  # describe falhou: tenta de novo na próxima chamada, lendo "id" até lá
+                logger.warning("Could not read the primary key of %s: %s", self.collection_name, e)
+        return self._primary_field
+
+    def search(self, vector, k: int, full=None) -> List[tuple]:
+        """Top-k da coleção; com `full`, reordenado pelo vetor cheio que volta em cada hit."""
+        vector = vector.tolist() if hasattr(vector, "tolist") else list(vector)
+        hits = self.client.search_vectors(self.collection_name, vector, limit=k,
+                                          output_fields=[FULL_VECTOR_FIELD] if full is not None else None)
+        hits = hits.get("data") or []
+        primary_field = self.primary_field
+        pairs = [(hit.get(primary_field, hit.get("id")), float(hit["distance"])) for hit in hits]
+        if full is None:
+            return pairs
+        return rescore(full, [(id_, score, hit.get(FULL_VECTOR_FIELD)) for (id_, score), hit in zip(pairs, hits)])
+
+    def get(self, ids: Sequence) -> List[Dict]:
+        entities = self.client.get_entities_by_ids(self.collection_name, [str(id_) for id_ in ids]).get("data") or []
+        return [{"id": entity.get(self.primary_field, entity.get("id")), "text": entity.get("text", "")}
+                for entity in entities]
+
+    def insert(self, entities: List[Dict], primary_field: str = "id", vector_field: str = "vector"):
+        self.client.insert_vectors(self.collection_name, entities)
+
+
+class HashRouter:
+    """Shard pelo CRC32 do id: estável entre processos e execuções (ao contrário de `hash()`)."""
+
+    def __init__(self, primary_field: str = "id"):
+        self.primary_field = primary_field
+
+    def route(self, entity: Dict, shard_names: List[str]) -> str:
+        key = str(entity[self.primary_field]).encode("utf-8")
+        return shard_names[zlib.crc32(key) % len(shard_names)]
+
+
+class MetadataRouter:
+    """Shard pelo valor de um campo (ex.: `source`); valores que não são shard vão para `default` (ou hash)."""
+
+    def __init__(self, field: str, default: Optional[str] = None, mapping: Optional[Dict[str, str]] = None,
+                 primary_field: str = "id"):
+        self.field = field
+        self.default = default
+        self.mapping = mapping or {}
+        self._fallback = HashRouter(primary_field)
+
+    def route(self, entity: Dict, shard_names: List[str]) -> str:
+        value = entity.get(self.field)
+        shard = self.mapping.get(value, value)
+        if shard in shard_names:
+            return shard
+        if self.default is not None:
+            return self.default
+        return self._fallback.route(entity, shard_names)
+
+
+class ShardedResult(NamedTuple):
+    hits: List[ShardHit]
+    degraded: List[str]  # shards que estouraram o timeout ou falharam
+
+
+class ShardedRetriever:
+    def __init__(self, shards: Dict[str, object], router=None, timeout: Optional[float] = 0.5,
+                 primary_field: str = "id", vector_field: str = "vector", delta_shards: Sequence[str] = ()):
+        """
+        timeout: prazo de cada shard, em segundos; None espera todos (só o timeout do cliente vale).
+        delta_shards: shards de escrita recente (ex.: o `DeltaSegment` do /ingest) que
+        entram na busca mas não no roteamento da ingestão; um hit deles cujo id também
+        veio de um shard principal (já compactado) é descartado.
+        """
+        if not shards:
+            raise ValueError("ShardedRetriever precisa de pelo menos um shard")
+        self.shards = dict(shards)
+        self.names = list(self.shards)
+        self.delta_shards = set(delta_shards)
+        self.routed_names = [name for name in self.names if name not in self.delta_shards]
+        if not self.routed_names:
+            raise ValueError("ShardedRetriever precisa de pelo menos um shard fora de delta_shards")
+        self.router = router or HashRouter(primary_field)
+        self.timeout = timeout
+        self.primary_field = primary_field
+        self.vector_field = vector_field
+        # Folga para chamadas que passaram do timeout e ainda ocupam uma thread
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(self.shards), thread_name_prefix="shard")
+        self._lock = threading.Lock()
+        self.stats = {name: {"searches": 0, "timeouts": 0, "errors": 0, "seconds": 0.0} for name in self.names}
+
+    @classmethod
+    def from_env(cls, client=None) -> Optional["ShardedRetriever"]:
+        """None se `SHARDS` não estiver definido (o app usa a coleção única de `collection_name`)."""
+        spec = os.getenv("SHARDS")
+        if not spec:
+            return None
+        primary_field = os.getenv("INGEST_PRIMARY_FIELD", "primary_key")  # o mesmo do prepare_data.py
+        shards = parse_shards(spec, client)
+        routing = os.getenv("SHARD_ROUTING", "hash")
+        if routing.startswith("field:"):
+            _, field, *default = routing.split(":")
+            router = MetadataRouter(field, default[0] if default else None, primary_field=primary_field)
+        elif routing == "hash":
+            router = HashRouter(primary_field)
+        else:
+            raise ValueError(f"SHARD_ROUTING inválido: {routing} (use hash ou field:<campo>[:<shard padrão>])")
+        return cls(shards, router, float(os.getenv("SHARD_TIMEOUT_MS", "500")) / 1000, primary_field)
+
+    def _count(self, name: str, key: str, amount=1):
+        with self._lock:
+            self.stats[name][key] += amount
+
+    def _submit(self, fn, *args):
+        # Copia o contexto para os spans do trace corrente continuarem nas threads do pool
+        return self._pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def _timed_search(self, name: str, vector, k: int, full=None) -> List[tuple]:
+        start = time.perf_counter()
+        with span("shard.search", **{"shard.name": name, "shard.k": k}):
+            try:
+                shard = self.shards[name]
+                return shard.search(vector, k) if full is None else shard.search(vector, k, full)
+            finally:
+                self._count(name, "seconds", time.perf_counter() - start)
+
+    def search(self, vector, k: int = 5, full=None, candidates: Optional[int] = None) -> ShardedResult:
+        """
+        Top-k global. full: vetor da query na dimensão cheia; cada shard busca
+        `candidates` (padrão `k`) pelo vetor reduzido e os reordena por ele.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        futures = {self._submit(self._timed_search, name, vector, candidates or k, full): name
+                   for name in self.names}
+        done, pending = wait(futures, timeout=self.timeout)
+        per_shard, delta, degraded = [], [], []
+        for future, name in futures.items():
+            self._count(name, "searches")
+            if future in pending:
+                self._count(name, "timeouts")
+                degraded.append(name)
+                continue
+            error = future.exception()
+            if error is not None:
+                self._count(name, "errors")
+                degraded.append(name)
+                logger.warning("Shard %s search failed: %s", name, error)
+                continue
+            hits = [ShardHit(name, id_, score) for id_, score in future.result()]
+            (delta if name in self.delta_shards else per_shard).append(hits)
+        if delta:
+            seen = {str(hit.id) for hits in per_shard for hit in hits}
+            per_shard.extend([hit for hit in hits if str(hit.id) not in seen] for hits in delta)
+        if degraded:
+            logger.warning("Search degraded: shards %s failed or exceeded the %s timeout", degraded,
+                           f"{self.timeout * 1000:.0f} ms" if self.timeout is not None else "client")
+        # Cada lista já vem em ordem decrescente de score: merge k-way por heap, para no k-ésimo
+        hits = list(itertools.islice(heapq.merge(*per_shard, key=lambda hit: -hit.score), k))
+        return ShardedResult(hits, degraded)
+
+    def fetch(self, hits: Sequence[ShardHit]) -> List[Dict]:
+        """Entidades (`id`, `text`, `shard`) dos hits, na ordem dos hits; um get por shard, em paralelo."""
+        by_shard: Dict[str, List] = {}
+        for hit in hits:
+            by_shard.setdefault(hit.shard, []).append(hit.id)
+        futures = {name: self._submit(self.shards[name].get, ids) for name, ids in by_shard.items()}
+        found = {}
+        for name, future in futures.items():
+            try:
+                for entity in future.result(timeout=self.timeout):
+                    found[(name, str(entity["id"]))] = dict(entity, shard=name)
+            except Exception as e:  # inclui o timeout: o texto desse shard fica de fora
+                self._count(name, "errors")
+                logger.warning("Shard %s get failed: %s", name, e)
+        return [found[(hit.shard, str(hit.id))] for hit in hits if (hit.shard, str(hit.id)) in found]
+
+    def route(self, entity: Dict) -> str:
+        return self.router.route(entity, self.routed_names)
+
+    def insert(self, entities: List[Dict]) -> Dict[str, int]:
+        """Distribui as entidades pelos shards e insere em paralelo; devolve quantas foram para cada um."""
+        by_shard: Dict[str, List[Dict]] = {}
+        for entity in entities:
+            by_shard.setdefault(self.route(entity), []).append(entity)
+        futures = [self._pool.submit(self.shards[name].insert, batch, self.primary_field, self.vector_field)
+                   for name, batch in by_shard.items()]
+        for future in futures:
+            future.result()
+        return {name: len(batch) for name, batch in by_shard.items()}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self.stats.items()}
+
+
+def parse_shards(spec: str, client=None) -> Dict[str, object]:
+    """
+    `nome=tipo:alvo` separados por vírgula; tipo `zilliz` (alvo = coleção, usa
+    `client`; a chave primária vem do schema) ou `local` (alvo = diretório de
+    exportação). Sem `nome=`, o alvo é o nome.
+    """
+    from src.collection_io import load_local_index
+
+    shards = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, definition = item.rpartition("=")
+        kind, _, target = definition.partition(":")
+        name = name or os.path.basename(target.rstrip("/"))
+        if not target:
+            raise ValueError(f"Shard inválido: {item!r} (alvo vazio)")
+        if name in shards:
+            raise ValueError(f"Shard duplicado: {name}")
+        if kind == "zilliz":
+            if client is None:
+                raise ValueError(f"Shard {name}: tipo zilliz precisa de um ZillizClient")
+            shards[name] = RemoteShard(client, target)
+        elif kind == "local":
+            shards[name] = LocalShard(load_local_index(target))
+        else:
+            raise ValueError(f"Shard inválido: {item!r} (use nome=zilliz:<coleção> ou nome=local:<diretório>)")
+    return shards
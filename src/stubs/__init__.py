@@ -0,0 +1,11 @@
+"""
+Servidores stub do Zilliz e da Groq para testes, benchmarks e carga sem
+credenciais nem rede. Sobem com `python scripts/stub_servers.py`; o app e o
+`scripts/eval.py` apontam para eles com `ZILLIZ_BASE_URL` e `GROQ_BASE_URL`.
+"""
+from src.stubs.faults import FaultInjector, LatencyDistribution
+from src.stubs.groq import GroqStub, create_groq_app
+from src.stubs.zilliz import ZillizStub, create_zilliz_app
+
+__all__ = ["FaultInjector", "LatencyDistribution", "GroqStub", "create_groq_app", "ZillizStub",
+           "create_zilliz_app"]
@@ -0,0 +1,148 @@
+"""
+Injeção de latência e falhas nos servidores stub.
+
+Uma distribuição de latência é uma string:
+
+    fixed:20              sempre 20 ms
+    uniform:5:50          uniforme entre 5 e 50 ms
+    lognormal:30:0.5      lognormal com mediana 30 ms e sigma 0.5 (cauda longa, como rede real)
+    0 / none              sem atraso
+
+`FaultInjector` junta a latência com as taxas de erro (5xx) e de throttling
+(429 + `retry-after`); os valores podem ser trocados com o servidor no ar via
+`POST /_stub/faults`.
+"""
+import asyncio
+import math
+import random
+import threading
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src import fast_json
+
+
+class LatencyDistribution:
+    def __init__(self, spec: str = "0"):
+        self.spec = spec or "0"
+        kind, _, params = self.spec.partition(":")
+        try:
+            values = [float(value) for value in params.split(":")] if params else []
+        except ValueError:
+            raise ValueError(f"Latência inválida: {spec!r}") from None
+        if kind in ("0", "none"):
+            self.kind, self.params = "none", []
+        elif kind == "fixed" and len(values) == 1:
+            self.kind, self.params = kind, values
+        elif kind == "uniform" and len(values) == 2 and values[0] <= values[1]:
+            self.kind, self.params = kind, values
+        elif kind == "lognormal" and len(values) == 2 and values[0] > 0:
+            self.kind, self.params = kind, values
+        else:
+            raise ValueError(f"Latência inválida: {spec!r} (use fixed:ms, uniform:lo:hi ou lognormal:mediana:sigma)")
+
+    def sample(self, rng: random.Random = random) -> float:
+        """Atraso em segundos."""
+        if self.kind == "fixed":
+            milliseconds = self.params[0]
+        elif self.kind == "uniform":
+            milliseconds = rng.uniform(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            milliseconds = rng.lognormvariate(math.log(median), sigma)
+        else:
+            return 0.0
+        return max(0.0, milliseconds) / 1000
+
+    def __repr__(self) -> str:
+        return self.spec
+
+
+class FaultInjector:
+    def __init__(self, latency: str = "0", error_rate: float = 0.0, error_status: int = 503,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, seed: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.latency = LatencyDistribution(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "delay_seconds": 0.0}
+
+    def configure(self, **settings) -> Dict:
+        """Atualiza só as chaves recebidas; chaves desconhecidas são um erro."""
+        unknown = set(settings) - {"latency", "error_rate", "error_status", "throttle_rate", "retry_after"}
+        if unknown:
+            raise ValueError(f"Parâmetros desconhecidos: {sorted(unknown)}")
+        with self._lock:
+            if "latency" in settings:
+                self.latency = LatencyDistribution(str(settings["latency"]))
+            for key in ("error_rate", "throttle_rate", "retry_after"):
+                if key in settings:
+                    setattr(self, key, float(settings[key]))
+            if "error_status" in settings:
+                self.error_status = int(settings["error_status"])
+        return self.settings()
+
+    def settings(self) -> Dict:
+        return {"latency": self.latency.spec, "error_rate": self.error_rate, "error_status": self.error_status,
+                "throttle_rate": self.throttle_rate, "retry_after": self.retry_after}
+
+    def sample_delay(self) -> float:
+        with self._lock:
+            seconds = self.latency.sample(self._rng)
+            self.stats["delay_seconds"] += seconds
+        return seconds
+
+    def decide(self) -> Optional[str]:
+        """"throttle", "error" ou None para uma requisição (sorteio único, as taxas somam)."""
+        with self._lock:
+            self.stats["requests"] += 1
+            draw = self._rng.random()
+            if draw < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return "throttle"
+            if draw < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return "error"
+        return None
+
+    async def delay(self):
+        seconds = self.sample_delay()
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def install(self, app: FastAPI, error_body=None):
+        """
+        Middleware com atraso + falhas em todas as rotas fora de `/_stub`, e as
+        rotas de controle `GET /_stub/stats` e `POST /_stub/faults`.
+        `error_body(status)` monta o corpo das respostas de erro no formato da API imitada.
+        """
+        error_body = error_body or (lambda status: {"error": f"injected {status}"})
+
+        @app.middleware("http")
+        async def inject_faults(request: Request, call_next):
+            if request.url.path.startswith("/_stub"):
+                return await call_next(request)
+            await self.delay()
+            outcome = self.decide()
+            if outcome == "throttle":
+                return JSONResponse(error_body(429), status_code=429,
+                                    headers={"retry-after": f"{self.retry_after:g}"})
+            if outcome == "error":
+                return JSONResponse(error_body(self.error_status), status_code=self.error_status)
+            return await call_next(request)
+
+        @app.get("/_stub/stats")
+        async def stub_stats():
+            return {"faults": self.settings(), "stats": self.stats}
+
+        @app.post("/_stub/faults")
+        async def stub_faults(request: Request):
+            try:
+                return self.configure(**fast_json.loads(await request.body() or b"{}"))
+            except (ValueError, TypeError) as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
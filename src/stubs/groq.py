@@ -0,0 +1,168 @@
+"""
+Stub da API de chat da Groq (formato OpenAI):
+
+    GET  /openai/v1/models
+    POST /openai/v1/chat/completions   (com `stream: true`, SSE em `data: {...}` + `data: [DONE]`)
+
+A resposta é determinística: por padrão, a primeira frase do contexto do
+prompt (ou um eco da pergunta); prompts do juiz (`src/judge.py`) recebem o
+JSON de notas, com a fração das palavras da resposta esperada presentes na
+resposta do sistema. O tempo de geração imita um LLM: `ttft`
+(latência até o primeiro token, ver `LatencyDistribution`) mais
+`1 / tokens_per_second` por token, tanto no modo normal quanto no streaming.
+Latência de rede, 5xx e 429 vêm do `FaultInjector`, como no stub do Zilliz.
+"""
+import asyncio
+import re
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src import fast_json
+from src.rate_limiter import estimate_tokens
+from src.stubs.faults import FaultInjector, LatencyDistribution
+
+_CONTEXT = re.compile(r"answer the question:\s*(.*)", re.DOTALL)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_JUDGE_ITEM = re.compile(r'<item id="(\d+)">.*?\nExpected answer:(.*?)\nSystem answer:(.*?)\n</item>', re.DOTALL)
+
+
+def judge_responder(prompt: str) -> Optional[str]:
+    """JSON de notas para um prompt do juiz; None se o prompt não tiver itens."""
+    judgements = []
+    for number, expected, predicted in _JUDGE_ITEM.findall(prompt):
+        expected_words = set(re.findall(r"\w+", expected.lower()))
+        overlap = len(expected_words & set(re.findall(r"\w+", predicted.lower())))
+        score = round(overlap / len(expected_words), 2) if expected_words else 0.0
+        judgements.append({"id": int(number), "score": score, "reason": "stub: word overlap with the expected answer"})
+    return fast_json.dumps({"judgements": judgements}).decode("utf-8") if judgements else None
+
+
+def default_responder(messages: List[Dict]) -> str:
+    """Primeira frase do contexto do system prompt; sem contexto, um eco da última mensagem."""
+    if messages and '"judgements"' in (messages[0].get("content") or ""):
+        verdict = judge_responder(messages[-1].get("content") or "")
+        if verdict is not None:
+            return verdict
+    for message in messages:
+        match = _CONTEXT.search(message.get("content") or "")
+        if message.get("role") == "system" and match and match.group(1).strip():
+            context = match.group(1).strip().strip("[]'\"")
+            return _SENTENCE.split(context, maxsplit=1)[0][:500]
+    last = messages[-1].get("content", "") if messages else ""
+    return f"Stub answer to: {last[:200]}"
+
+
+def _words(text: str) -> List[str]:
+    # Um "token" do stub é uma palavra com o espaço que a precede
+    return re.findall(r"\s*\S+", text) or [""]
+
+
+class GroqStub:
+    def __init__(self, responder: Optional[Callable[[List[Dict]], str]] = None, ttft: str = "0",
+                 tokens_per_second: float = 0.0, models: Optional[List[str]] = None):
+        """
+        responder: `messages -> texto` da resposta; `tokens_per_second=0` gera sem atraso por token.
+        """
+        self.responder = responder or default_responder
+        self.ttft = LatencyDistribution(ttft)
+        self.tokens_per_second = tokens_per_second
+        self.models = models or ["llama3-8b-8192", "llama-3.1-8b-instant", "llama-3.3-70b-versatile"]
+        self.stats = {"completions": 0, "streams": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def configure(self, ttft: Optional[str] = None, tokens_per_second: Optional[float] = None):
+        if ttft is not None:
+            self.ttft = LatencyDistribution(ttft)
+        if tokens_per_second is not None:
+            self.tokens_per_second = float(tokens_per_second)
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def complete(self, body: Dict):
+        """(id, tokens da resposta, finish_reason, usage) de uma requisição de chat."""
+        messages = body.get("messages") or []
+        text = self.responder(messages)
+        limit = body.get("max_completion_tokens") or body.get("max_tokens")
+        tokens = _words(text)
+        finish_reason = "stop"
+        if limit and len(tokens) > limit:
+            tokens, finish_reason = tokens[:limit], "length"
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in messages)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        self.stats["completions"] += 1
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += len(tokens)
+        return f"chatcmpl-{uuid.uuid4().hex[:24]}", tokens, finish_reason, usage
+
+
+def create_groq_app(stub: Optional[GroqStub] = None, faults: Optional[FaultInjector] = None) -> FastAPI:
+    stub = stub or GroqStub()
+    faults = faults or FaultInjector()
+    app = FastAPI(title="Groq stub")
+    app.state.stub = stub
+    app.state.faults = faults
+    faults.install(app, error_body=lambda status: {"error": {
+        "message": "Rate limit reached" if status == 429 else f"injected HTTP {status}",
+        "type": "rate_limit_exceeded" if status == 429 else "internal_server_error",
+    }})
+
+    @app.post("/_stub/llm")
+    async def stub_llm(request: Request):
+        try:
+            stub.configure(**fast_json.loads(await request.body() or b"{}"))
+        except (ValueError, TypeError) as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return {"ttft": stub.ttft.spec, "tokens_per_second": stub.tokens_per_second}
+
+    @app.get("/openai/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": model, "object": "model", "owned_by": "stub"}
+                                           for model in stub.models]}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = fast_json.loads(await request.body() or b"{}")
+        if not body.get("messages"):
+            return JSONResponse({"error": {"message": "'messages' is required",
+                                           "type": "invalid_request_error"}}, status_code=400)
+        completion_id, tokens, finish_reason, usage = stub.complete(body)
+        model, created = body.get("model", stub.models[0]), int(time.time())
+        ttft, token_delay = stub.ttft.sample(), stub._token_delay()
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + token_delay * max(0, len(tokens) - 1))
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+
+        stub.stats["streams"] += 1
+
+        def chunk(delta: Dict, finish: Optional[str] = None, extra: Optional[Dict] = None) -> bytes:
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                       "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            if extra:
+                payload.update(extra)
+            return b"data: " + fast_json.dumps(payload) + b"\n\n"
+
+        async def events():
+            await asyncio.sleep(ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            for position, token in enumerate(tokens):
+                if position and token_delay:
+                    await asyncio.sleep(token_delay)
+                yield chunk({"content": token})
+            # A Groq manda o uso no último chunk, em `x_groq.usage`
+            yield chunk({}, finish_reason, {"x_groq": {"id": completion_id, "usage": usage}})
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
@@ -0,0 +1,317 @@
+"""
+Stub da API REST v2 do Zilliz Cloud com as rotas usadas pelo `ZillizClient`:
+
+    POST /v2/vectordb/collections/list | create | describe
+    POST /v2/vectordb/entities/insert | query | get | search
+
+As coleções ficam em memória; a busca é exata (produto interno sobre vetores
+normalizados = COSINE). Erros lógicos seguem o formato do Zilliz: HTTP 200
+com `code` diferente de 0. O filtro do query aceita o subconjunto que o
+cliente gera: comparações `campo op valor` (`==`, `!=`, `>`, `>=`, `<`, `<=`,
+`in [...]`) unidas por `and`, com parênteses opcionais.
+"""
+import operator
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+
+from src import fast_json
+from src.embedding import _normalize
+from src.stubs.faults import FaultInjector
+
+CODE_COLLECTION_NOT_FOUND = 100
+CODE_INVALID_PARAMETER = 1100
+
+_OPERATORS = {"==": operator.eq, "!=": operator.ne, ">=": operator.ge, "<=": operator.le,
+              ">": operator.gt, "<": operator.lt}
+_TOKEN = re.compile(r'\s*(?:(?P<string>"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')|(?P<number>-?\d+(?:\.\d+)?)'
+                    r'|(?P<op>==|!=|>=|<=|>|<)|(?P<punct>[()\[\],])|(?P<word>[A-Za-z_][A-Za-z0-9_]*))')
+
+
+class StubError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def _tokenize(expression: str) -> List:
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise StubError(CODE_INVALID_PARAMETER, f"invalid filter expression: {expression!r}")
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            tokens.append(("value", text[1:-1]))
+        elif kind == "number":
+            tokens.append(("value", float(text) if "." in text else int(text)))
+        elif kind == "word" and text.lower() in ("and", "in"):
+            tokens.append((text.lower(), text))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+def compile_filter(expression: str):
+    """Predicado `entity -> bool` para um filtro do query; vazio aceita tudo."""
+    tokens = [token for token in _tokenize(expression or "") if token != ("punct", "(") and token != ("punct", ")")]
+    conditions, position = [], 0
+    while position < len(tokens):
+        if position and tokens[position][0] == "and":
+            position += 1
+        try:
+            (field_kind, field), (op_kind, op) = tokens[position], tokens[position + 1]
+        except IndexError:
+            raise StubError(CODE_INVALID_PARAMETER, f"invalid filter expression: {expression!r}") from None
+        if field_kind != "word" or op_kind not in ("op", "in"):
+            raise StubError(CODE_INVALID_PARAMETER, f"invalid filter expression: {expression!r}")
+        if op_kind == "in":
+            end = next((i for i in range(position + 2, len(tokens)) if tokens[i] == ("punct", "]")), None)
+            if end is None or tokens[position + 2] != ("punct", "["):
+                raise StubError(CODE_INVALID_PARAMETER, f"invalid filter expression: {expression!r}")
+            values = {value for kind, value in tokens[position + 3:end] if kind == "value"}
+            conditions.append(lambda entity, field=field, values=values: entity.get(field) in values)
+            position = end + 1
+        else:
+            kind, value = tokens[position + 2] if position + 2 < len(tokens) else (None, None)
+            if kind != "value":
+                raise StubError(CODE_INVALID_PARAMETER, f"invalid filter expression: {expression!r}")
+            compare = _OPERATORS[op]
+            conditions.append(lambda entity, field=field, compare=compare, value=value:
+                              entity.get(field) is not None and compare(entity[field], value))
+            position += 3
+    return lambda entity: all(condition(entity) for condition in conditions)
+
+
+class StubCollection:
+    def __init__(self, name: str, dimension: int, primary_field: str = "id", vector_field: str = "vector",
+                 auto_id: bool = False):
+        self.name = name
+        self.dimension = dimension
+        self.primary_field = primary_field
+        self.vector_field = vector_field
+        self.auto_id = auto_id
+        self._rows: Dict = {}  # id -> entidade sem o vetor; "_row" aponta a linha da matriz
+        self._next_row = 0
+        self._next_id = 1
+        self._blocks: List[np.ndarray] = []
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._live = None  # (entidades, linhas) vigentes para a busca, refeito após inserts
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        with self._lock:
+            if self._blocks:
+                self._matrix = np.concatenate([self._matrix] + self._blocks)
+                self._blocks = []
+            return self._matrix
+
+    def insert(self, rows: List[Dict]) -> List:
+        entities, vectors = [], np.zeros((len(rows), self.dimension), dtype=np.float32)
+        for i, row in enumerate(rows):
+            entity = dict(row)
+            vector = entity.pop(self.vector_field, None)
+            if vector is None or len(vector) != self.dimension:
+                raise StubError(CODE_INVALID_PARAMETER,
+                                f"field {self.vector_field} must be a vector of dimension {self.dimension}")
+            if not self.auto_id and self.primary_field not in entity:
+                raise StubError(CODE_INVALID_PARAMETER, f"missing primary field {self.primary_field}")
+            vectors[i] = vector
+            entities.append(entity)
+        with self._lock:
+            ids = []
+            for entity in entities:
+                if self.auto_id:
+                    entity[self.primary_field] = self._next_id
+                    self._next_id += 1
+                entity["_row"] = self._next_row
+                self._next_row += 1
+                # Reinserir um id sobrescreve a entidade (upsert), como o Milvus faz na leitura
+                self._rows[entity[self.primary_field]] = entity
+                ids.append(entity[self.primary_field])
+            self._blocks.append(_normalize(vectors))
+            self._live = None
+        return ids
+
+    def _live_rows(self):
+        with self._lock:
+            if self._live is None:
+                entities = sorted(self._rows.values(), key=lambda entity: entity["_row"])
+                self._live = (entities, np.array([entity["_row"] for entity in entities], dtype=np.int64))
+            return self._live
+
+    def _project(self, entity: Dict, output_fields: Optional[List[str]]) -> Dict:
+        row = entity["_row"]
+        if output_fields is None:
+            return {key: value for key, value in entity.items() if key != "_row"}
+        if "*" in output_fields:
+            result = {key: value for key, value in entity.items() if key != "_row"}
+            result[self.vector_field] = self.vectors[row].tolist()
+            return result
+        result = {self.primary_field: entity[self.primary_field]}
+        for field in output_fields:
+            if field == self.vector_field:
+                result[field] = self.vectors[row].tolist()
+            elif field in entity:
+                result[field] = entity[field]
+        return result
+
+    def _coerce_id(self, value):
+        # O app manda os ids como string; a chave guardada pode ser int
+        if value in self._rows or not isinstance(value, str):
+            return value
+        try:
+            return int(value)
+        except ValueError:
+            return value
+
+    def get(self, ids, output_fields: Optional[List[str]] = None) -> List[Dict]:
+        ids = ids if isinstance(ids, list) else [ids]
+        found = (self._rows.get(self._coerce_id(id_)) for id_ in ids)
+        return [self._project(entity, output_fields) for entity in found if entity is not None]
+
+    def query(self, expression: str, output_fields: Optional[List[str]], limit: int, offset: int = 0) -> List[Dict]:
+        predicate = compile_filter(expression)
+        matches = sorted((entity for entity in list(self._rows.values()) if predicate(entity)),
+                         key=lambda entity: entity[self.primary_field])
+        return [self._project(entity, output_fields or []) for entity in matches[offset:offset + limit]]
+
+    def search(self, queries, limit: int, output_fields: Optional[List[str]] = None) -> List[List[Dict]]:
+        queries = _normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dimension))
+        entities, rows = self._live_rows()
+        matrix = self.vectors
+        if len(rows) != len(matrix):  # houve upsert: só a última versão de cada id conta
+            matrix = matrix[rows]
+        if not len(matrix):
+            return [[] for _ in queries]
+        scores = queries @ matrix.T
+        k = min(limit, scores.shape[1])
+        results = []
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            hits = []
+            for index in top[np.argsort(-row_scores[top])]:
+                entity = entities[index]
+                hit = self._project(entity, output_fields or [])
+                hit["id"] = entity[self.primary_field]
+                hit["distance"] = float(row_scores[index])
+                hits.append(hit)
+            results.append(hits)
+        return results
+
+    def describe(self) -> Dict:
+        return {
+            "collectionName": self.name,
+            "autoId": self.auto_id,
+            "fields": [
+                {"name": self.primary_field, "type": "Int64", "primaryKey": True, "autoId": self.auto_id},
+                {"name": self.vector_field, "type": "FloatVector", "params": [{"key": "dim",
+                                                                                "value": str(self.dimension)}]},
+            ],
+            "indexes": [{"fieldName": self.vector_field, "indexName": self.vector_field, "metricType": "COSINE"}],
+            "load": "LoadStateLoaded",
+            "enableDynamicField": True,
+            "rowCount": len(self._rows),
+        }
+
+
+class ZillizStub:
+    def __init__(self):
+        self.collections: Dict[str, StubCollection] = {}
+        self._lock = threading.Lock()
+
+    def create_collection(self, name: str, dimension: int, primary_field: str = "id",
+                          vector_field: str = "vector", auto_id: bool = False) -> StubCollection:
+        with self._lock:
+            if name in self.collections:
+                raise StubError(CODE_INVALID_PARAMETER, f"collection {name} already exists")
+            collection = StubCollection(name, dimension, primary_field, vector_field, auto_id)
+            self.collections[name] = collection
+        return collection
+
+    def load_texts(self, name: str, texts: List[str], vectors, primary_field: str = "id") -> StubCollection:
+        """Cria (ou completa) uma coleção com ids 1..n, como o `prepare_data` grava."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        collection = self.collections.get(name) or self.create_collection(name, vectors.shape[1], primary_field)
+        start = len(collection) + 1
+        collection.insert([{primary_field: start + i, "vector": vector, "text": text}
+                           for i, (vector, text) in enumerate(zip(vectors, texts))])
+        return collection
+
+    def load_export(self, name: str, directory: str) -> StubCollection:
+        """Coleção a partir de uma exportação de `src/collection_io.py`."""
+        from src.collection_io import iter_parts, read_manifest
+
+        manifest = read_manifest(directory)
+        collection = self.collections.get(name) or self.create_collection(
+            name, manifest["dim"], manifest["primary_field"], manifest["vector_field"])
+        for vectors, rows in iter_parts(directory):
+            collection.insert([dict(row, **{collection.vector_field: vector}) for row, vector in zip(rows, vectors)])
+        return collection
+
+    def collection(self, name: Optional[str]) -> StubCollection:
+        try:
+            return self.collections[name]
+        except KeyError:
+            raise StubError(CODE_COLLECTION_NOT_FOUND, f"collection not found[collection={name}]") from None
+
+    def handle(self, endpoint: str, body: Dict):
+        if endpoint == "collections/list":
+            return list(self.collections)
+        if endpoint == "collections/create":
+            self.create_collection(body["collectionName"], int(body["dimension"]),
+                                   body.get("primaryFieldName") or body.get("primaryField") or "id",
+                                   body.get("vectorFieldName") or body.get("vectorField") or "vector",
+                                   bool(body.get("autoId", body.get("autoID", False))))
+            return {}
+        collection = self.collection(body.get("collectionName"))
+        if endpoint == "collections/describe":
+            return collection.describe()
+        if endpoint == "entities/insert":
+            rows = body.get("data") or []
+            rows = rows if isinstance(rows, list) else [rows]
+            ids = collection.insert(rows)
+            return {"insertCount": len(ids), "insertIds": ids}
+        if endpoint == "entities/get":
+            return collection.get(body.get("id", []), body.get("outputFields"))
+        if endpoint == "entities/query":
+            return collection.query(body.get("filter", ""), body.get("outputFields"),
+                                    int(body.get("limit") or 100), int(body.get("offset") or 0))
+        if endpoint == "entities/search":
+            results = collection.search(body.get("data") or [], int(body.get("limit") or 10),
+                                        body.get("outputFields"))
+            # Uma query só: lista plana de hits, como a API v2 devolve
+            return results[0] if len(results) == 1 else results
+        raise StubError(CODE_INVALID_PARAMETER, f"unsupported endpoint {endpoint}")
+
+
+def create_zilliz_app(stub: Optional[ZillizStub] = None, faults: Optional[FaultInjector] = None) -> FastAPI:
+    stub = stub or ZillizStub()
+    faults = faults or FaultInjector()
+    app = FastAPI(title="Zilliz stub")
+    app.state.stub = stub
+    app.state.faults = faults
+    faults.install(app, error_body=lambda status: {"code": status, "message": f"injected HTTP {status}"})
+
+    @app.post("/v2/vectordb/{group}/{action}")
+    async def vectordb(group: str, action: str, request: Request):
+        try:
+            body = fast_json.loads(await request.body() or b"{}")
+            data = stub.handle(f"{group}/{action}", body)
+        except StubError as e:
+            return {"code": e.code, "message": str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            return {"code": CODE_INVALID_PARAMETER, "message": f"invalid request: {e}"}
+        return {"code": 0, "data": data}
+
+    return app
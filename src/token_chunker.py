@@ -0,0 +1,162 @@
+"""
+Chunking por tokens do modelo de embeddings.
+
+`split_large_chunk` corta em 800 caracteres e as janelas de linhas a cada 3/4
+linhas; nenhum dos dois sabe quantos tokens o modelo vê. O `TokenWindowChunker`
+tokeniza os dias do diário de uma vez (`encode_batch`, tokenizer rápido com
+offsets) e corta janelas de até `max_tokens` (incluindo [CLS]/[SEP]), com
+sobreposição de `overlap_tokens` e cortes ajustados ao início de frase.
+
+As janelas de um dia são balanceadas: em vez de N janelas cheias e uma sobra
+pequena, o dia é dividido em N janelas de tamanho parecido. Nenhum chunk é
+truncado no encode e o padding dentro de um batch fica pequeno.
+"""
+import math
+import os
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from src.chunking_engine import PARAGRAPH_DATE_PATTERN, ChunkingEngine
+from src.embedding import DEFAULT_ONNX_DIR, EMBEDDING_MODEL_NAME
+
+EMBEDDING_MAX_TOKENS = 512  # max_seq_length do arctic-embed-s
+# Início de frase: depois de . ! ? (e aspas/parênteses de fechamento) ou de uma quebra de linha
+SENTENCE_BOUNDARY = re.compile(r'[.!?]["\')\]]*\s+|\n\s*')
+
+
+def load_tokenizer(model_name: str = EMBEDDING_MODEL_NAME, model_dir: Optional[str] = None):
+    """
+    Tokenizer rápido (`tokenizers`) do modelo de embeddings: o `tokenizer.json`
+    exportado com o ONNX, o de um diretório local ou o do Hugging Face Hub.
+    """
+    from tokenizers import Tokenizer
+
+    model_dir = model_dir or os.getenv("EMBEDDING_ONNX_DIR", DEFAULT_ONNX_DIR)
+    for directory in (model_dir, model_name):
+        path = os.path.join(directory, "tokenizer.json")
+        if os.path.exists(path):
+            tokenizer = Tokenizer.from_file(path)
+            break
+    else:
+        tokenizer = Tokenizer.from_pretrained(model_name)
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+class _DayTextPolicy:
+    """Política do `ChunkingEngine` que só separa o texto por dia (a linha de data abre o dia)."""
+
+    date_pattern = PARAGRAPH_DATE_PATTERN
+    strip_lines = False
+    wants_terms = False
+
+    def __init__(self):
+        self.days: List[str] = []
+        self.lines: List[str] = []
+
+    def _end_day(self):
+        text = '\n'.join(self.lines).strip()
+        if text:
+            self.days.append(text)
+        self.lines = []
+
+    def date(self, line: str, match, terms):
+        self._end_day()
+        self.lines.append(line)
+
+    def line(self, line: str, terms):
+        self.lines.append(line)
+
+    def blank(self):
+        self.lines.append("")
+
+    def finish(self) -> List[str]:
+        self._end_day()
+        return self.days
+
+
+class TokenWindowChunker:
+    def __init__(self, tokenizer, max_tokens: int = EMBEDDING_MAX_TOKENS, overlap_tokens: int = 64,
+                 snap_to_sentence: bool = True, batch_size: int = 64):
+        post_processor = tokenizer.post_processor
+        special_tokens = post_processor.num_special_tokens_to_add(False) if post_processor else 0
+        self.tokenizer = tokenizer
+        self.budget = max_tokens - special_tokens
+        if not 0 <= overlap_tokens < self.budget // 2:
+            raise ValueError("overlap_tokens precisa ser menor que metade da janela")
+        self.overlap = overlap_tokens
+        self.snap_to_sentence = snap_to_sentence
+        self.batch_size = batch_size
+
+    def _sentence_starts(self, text: str, starts: Sequence[int]) -> List[int]:
+        """Índices dos tokens que começam uma frase (pontos de corte preferidos)."""
+        if not self.snap_to_sentence:
+            return []
+        cuts = {bisect_left(starts, m.end()) for m in SENTENCE_BOUNDARY.finditer(text)}
+        return sorted(cut for cut in cuts if 0 < cut < len(starts))
+
+    def _windows(self, n_tokens: int, cuts: List[int]) -> List[Tuple[int, int]]:
+        if n_tokens <= self.budget:
+            return [(0, n_tokens)]
+        stride = self.budget - self.overlap
+        n_windows = math.ceil((n_tokens - self.overlap) / stride)
+        # Janelas do mesmo tamanho em vez de cheias + uma sobra pequena
+        size = min(self.budget, math.ceil((n_tokens + (n_windows - 1) * self.overlap) / n_windows))
+        windows = []
+        start = 0
+        while True:
+            end = min(start + size, n_tokens)
+            if end < n_tokens:
+                # Recua até um início de frase, sem encolher a janela abaixo de metade
+                i = bisect_right(cuts, end) - 1
+                if i >= 0 and cuts[i] > start + size // 2:
+                    end = cuts[i]
+            windows.append((start, end))
+            if end >= n_tokens:
+                return windows
+            next_start = max(end - self.overlap, start + 1)
+            # Começa a próxima janela numa frase dentro da sobreposição, se houver
+            i = bisect_left(cuts, next_start)
+            if i < len(cuts) and cuts[i] < end:
+                next_start = cuts[i]
+            if n_tokens - next_start <= self.budget:
+                # O resto cabe numa janela: evita uma última janela minúscula
+                windows.append((next_start, n_tokens))
+                return windows
+            start = next_start
+
+    def chunk_with_token_counts(self, text: str) -> Tuple[List[str], List[int]]:
+        """Chunks e o número de tokens de cada um (sem os tokens especiais)."""
+        days = ChunkingEngine().run(text, _DayTextPolicy())
+        chunks, counts = [], []
+        for batch_start in range(0, len(days), self.batch_size):
+            batch = days[batch_start:batch_start + self.batch_size]
+            encodings = self.tokenizer.encode_batch(batch, add_special_tokens=False)
+            for day, encoding in zip(batch, encodings):
+                offsets = encoding.offsets
+                starts = [offset[0] for offset in offsets]
+                for start, end in self._windows(len(offsets), self._sentence_starts(day, starts)):
+                    chunks.append(day[offsets[start][0]:offsets[end - 1][1]])
+                    counts.append(end - start)
+        return chunks, counts
+
+    def chunk(self, text: str) -> List[str]:
+        return self.chunk_with_token_counts(text)[0]
+
+
+def padding_fraction(token_counts: Sequence[int], batch_size: int = 32) -> float:
+    """Fração de posições de padding ao codificar os chunks em batches, na ordem dada."""
+    total = padded = 0
+    for start in range(0, len(token_counts), batch_size):
+        batch = token_counts[start:start + batch_size]
+        total += sum(batch)
+        padded += max(batch) * len(batch)
+    return 1 - total / padded if padded else 0.0
+
+
+@lru_cache(maxsize=None)
+def default_tokenizer():
+    return load_tokenizer()
@@ -0,0 +1,320 @@
+"""
+Tracing por requisição com spans no modelo do OpenTelemetry.
+
+Cada `/query` amostrado abre um trace (`start_trace`); `span()` cria filhos do
+span corrente (guardado num `ContextVar`) em embedding, Zilliz e Groq. Os spans
+finalizados vão para uma fila e uma thread os exporta em lote no formato
+OTLP/JSON: uma linha por lote num arquivo (`TRACE_FILE`) ou um POST em
+`TRACE_OTLP_ENDPOINT` (ex.: `http://localhost:4318/v1/traces`). O contexto é
+propagado no header W3C `traceparent`, nas duas direções. Sem `TRACE_EXPORTER`
+nada é exportado; o arquivo é rotacionado ao passar de `TRACE_FILE_MAX_MB`.
+
+A amostragem é decidida na raiz (`TRACE_SAMPLE_RATE`, ou o flag do
+`traceparent` recebido). Fora da amostra `span()` devolve um span nulo
+compartilhado: o custo é uma leitura de `ContextVar`.
+"""
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from src import fast_json
+from src.logger import get_logger
+
+logger = get_logger("tracing")
+
+SERVICE_NAME = "rag-system"
+STATUS_OK, STATUS_ERROR = 1, 2
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes",
+                 "status", "status_message", "tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 kind: int = SPAN_KIND_INTERNAL):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes: Dict = {}
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    @property
+    def recording(self) -> bool:
+        return True
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: int = 1):
+        """Soma em um atributo numérico (ex.: tentativas, tokens)."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def record_exception(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict:
+        attributes = []
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                attributes.append({"key": key, "value": {"boolValue": value}})
+            elif isinstance(value, int):
+                attributes.append({"key": key, "value": {"intValue": str(value)}})
+            elif isinstance(value, float):
+                attributes.append({"key": key, "value": {"doubleValue": value}})
+            else:
+                attributes.append({"key": key, "value": {"stringValue": str(value)}})
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NonRecordingSpan:
+    """Span fora da amostra: aceita as mesmas chamadas e não guarda nada."""
+
+    recording = False
+    traceparent = None
+    trace_id = None
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def add(self, key: str, amount: int = 1):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+_current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]):
+    """(trace_id, parent_span_id, sampled) de um header W3C `traceparent`, ou None se inválido."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class FileSpanExporter:
+    """Um `ExportTraceServiceRequest` OTLP/JSON por linha; passando de `max_bytes` vira `<path>.1`."""
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def export(self, payload: bytes):
+        if self.max_bytes and os.path.exists(self.path) and \
+                os.path.getsize(self.path) + len(payload) + 1 > self.max_bytes:
+            os.replace(self.path, self.path + ".1")  # guarda só a geração anterior
+        with open(self.path, "ab") as f:
+            f.write(payload + b"\n")
+
+
+class OtlpHttpSpanExporter:
+    """POST OTLP/JSON num coletor (ou stub) em `/v1/traces`."""
+
+    def __init__(self, endpoint: str, timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, payload: bytes):
+        import requests
+
+        requests.post(self.endpoint, data=payload, headers={"Content-Type": "application/json"},
+                      timeout=self.timeout).raise_for_status()
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.01, exporter=None, max_batch: int = 512,
+                 flush_interval: float = 1.0, max_queue: int = 10000):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"traces": 0, "spans": 0, "dropped": 0, "export_errors": 0}
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """
+        TRACE_SAMPLE_RATE (padrão 0.01), TRACE_EXPORTER=none|file|otlp (padrão none),
+        TRACE_FILE, TRACE_FILE_MAX_MB (padrão 100), TRACE_OTLP_ENDPOINT.
+        """
+        kind = os.getenv("TRACE_EXPORTER", "none")
+        if kind == "file":
+            max_mb = float(os.getenv("TRACE_FILE_MAX_MB", "100"))
+            exporter = FileSpanExporter(os.getenv("TRACE_FILE", "traces.jsonl"),
+                                        int(max_mb * 1024 * 1024) if max_mb > 0 else None)
+        elif kind == "otlp":
+            exporter = OtlpHttpSpanExporter(os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"))
+        else:
+            exporter = None
+        sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0.01")) if exporter else 0.0
+        return cls(sample_rate, exporter)
+
+    @contextmanager
+    def start_trace(self, name: str, traceparent: Optional[str] = None, **attributes) -> Iterator:
+        """Span raiz de uma requisição; continua o trace de um `traceparent` recebido."""
+        incoming = parse_traceparent(traceparent)
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = None, None
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled or self.exporter is None:
+            token = _current_span.set(NON_RECORDING_SPAN)
+            try:
+                yield NON_RECORDING_SPAN
+            finally:
+                _current_span.reset(token)
+            return
+        span = Span(self, name, trace_id or f"{random.getrandbits(128):032x}", parent_id, SPAN_KIND_SERVER)
+        span.attributes.update(attributes)
+        self.stats["traces"] += 1
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator:
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._enqueue(span)
+
+    def _enqueue(self, span: Span):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+            self.stats["spans"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._drain(timeout=self.flush_interval)
+            if batch:
+                self._export(batch)
+
+    def _drain(self, timeout: Optional[float]) -> List[Span]:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait())
+            while len(batch) < self.max_batch:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _export(self, batch: List[Span]):
+        payload = fast_json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "rag.tracing"}, "spans": [span.to_otlp() for span in batch]}],
+        }]})
+        try:
+            self.exporter.export(payload)
+        except Exception as e:
+            self.stats["export_errors"] += 1
+            logger.warning("Span export failed: %s", e)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """Exporta tudo o que está na fila e espera o lote em andamento (testes, shutdown)."""
+        while True:
+            batch = self._drain(timeout=None)
+            if not batch:
+                break
+            self._export(batch)
+        self._queue.join()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer.from_env()
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
+
+
+def current_span():
+    return _current_span.get() or NON_RECORDING_SPAN
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Iterator:
+    """
+    Span filho do corrente; nulo se não houver trace amostrado em andamento.
+    Chamadas a serviços externos (Zilliz, Groq) usam `kind=SPAN_KIND_CLIENT`.
+    """
+    parent = _current_span.get()
+    if parent is None or not parent.recording:
+        yield NON_RECORDING_SPAN
+        return
+    child = Span(parent.tracer, name, parent.trace_id, parent.span_id, kind)
+    child.attributes.update(attributes)
+    with parent.tracer._activate(child):
+        yield child
+
+
+def inject_headers(headers: Dict) -> Dict:
+    """Cópia dos headers com o `traceparent` do span corrente (se amostrado)."""
+    traceparent = current_span().traceparent
+    return dict(headers, traceparent=traceparent) if traceparent else headers
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+
+from src.admission import AdmissionController, Lane, Rejected
+
+
+def controller(concurrency=1, batch_active=None, queue=4):
+    return AdmissionController(concurrency, [Lane("interactive", queue), Lane("batch", queue, max_active=batch_active)])
+
+
+async def admitted(admission, lane, order, deadline=None):
+    await admission.acquire(lane, deadline)
+    order.append(lane)
+
+
+def test_interactive_lane_is_served_before_queued_batch():
+    async def scenario():
+        admission = controller()
+        order = []
+        await admission.acquire("batch")  # ocupa a única vaga
+        tasks = [asyncio.create_task(admitted(admission, "batch", order)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(admitted(admission, "interactive", order)))
+        await asyncio.sleep(0)
+        for lane in ("batch", "interactive", "batch", "batch"):  # libera a vaga de quem está rodando
+            admission.release(lane, 0.01)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order, admission
+
+    order, admission = asyncio.run(scenario())
+    assert order == ["interactive", "batch", "batch", "batch"]
+    assert admission.get_stats()["lanes"]["batch"]["admitted"] == 4
+
+
+def test_batch_never_takes_the_reserved_slots():
+    async def scenario():
+        admission = controller(concurrency=3, batch_active=2)
+        await admission.acquire("batch")
+        await admission.acquire("batch")
+        waiting = asyncio.create_task(admission.acquire("batch"))
+        await asyncio.sleep(0)
+        assert not waiting.done() and admission.active == 2
+        await asyncio.wait_for(admission.acquire("interactive"), 0.1)  # vaga reservada, sem espera
+        admission.release("interactive")
+        await asyncio.sleep(0)
+        assert not waiting.done()  # a vaga do interativo não vai para o batch
+        admission.release("batch")
+        await asyncio.wait_for(waiting, 0.1)
+        return admission.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 2 and stats["lanes"]["batch"]["active"] == 2
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        admission = controller(queue=2)
+        await admission.acquire("batch")
+        admission.release("batch", 3.0)  # tempo de serviço médio: 3 s
+        await admission.acquire("batch")
+        waiting = [asyncio.create_task(admission.acquire("batch")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as error:
+            await admission.acquire("batch")
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        return error.value, admission.get_stats()["lanes"]["batch"]
+
+    error, lane = asyncio.run(scenario())
+    assert error.reason == "queue_full" and error.retry_after == 9  # 2 na fila + ele, 3 s cada, 1 vaga
+    assert lane["rejected"] == 1 and lane["cancelled"] == 2 and lane["queued"] == 0
+
+
+def test_deadlines_shed_expired_hopeless_and_timed_out_requests():
+    async def scenario():
+        admission = controller()
+        now = time.monotonic()
+        with pytest.raises(Rejected):
+            await admission.acquire("interactive", now - 0.001)  # prazo já passou
+        await admission.acquire("interactive")
+        admission.release("interactive", 1.0)
+        await admission.acquire("interactive")  # ocupada; cada query leva ~1 s
+        with pytest.raises(Rejected):
+            await admission.acquire("interactive", time.monotonic() + 0.5)  # não caberia: descarta na hora
+        assert not admission.lanes["interactive"].waiters
+
+        admission.service_time = 0.01
+        order = []
+        expiring = asyncio.create_task(admitted(admission, "interactive", order, time.monotonic() + 0.05))
+        patient = asyncio.create_task(admitted(admission, "interactive", order))
+        with pytest.raises(Rejected) as error:
+            await expiring  # venceu na fila
+        admission.release("interactive")
+        await asyncio.wait_for(patient, 0.1)  # a vaga vai para o próximo, não para o que desistiu
+        return error.value, order, admission.get_stats()["lanes"]["interactive"]
+
+    error, order, lane = asyncio.run(scenario())
+    assert error.reason == "deadline" and order == ["interactive"]
+    assert lane["shed"] == 3 and lane["queued"] == 0 and lane["active"] == 1
+
+
+def test_deadline_from_header_or_lane_default():
+    admission = AdmissionController(2, [Lane("interactive", 4, timeout=15.0), Lane("batch", 4)])
+    assert admission.deadline("interactive", 250, now=100.0) == pytest.approx(100.25)
+    assert admission.deadline("interactive", now=100.0) == 115.0
+    assert admission.deadline("batch", now=100.0) is None
+
+
+def test_admission_is_opt_in(monkeypatch):
+    monkeypatch.delenv("ADMISSION_ENABLED", raising=False)
+    assert AdmissionController.from_env() is None
+    monkeypatch.setenv("ADMISSION_ENABLED", "true")
+    assert AdmissionController.from_env().max_concurrency == 8
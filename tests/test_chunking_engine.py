@@ -0,0 +1,36 @@
+from src.archive.chunking_strategy import chunk_diary_by_day_and_paragraph
+from src.archive.chunking_strategy_v3 import process_diary_chunks as process_diary_chunks_v3
+from src.chunking_engine import (ChunkingEngine, DayParagraphPolicy, chunk_by_day_and_paragraph,
+                                 chunk_by_line_window)
+
+DIARY = """Preface written before the first entry.
+
+1st Day of Frostfall 1855 - Arrival in the Capital of Veridia
+Today marks my arrival in the capital city of Veridia.
+Under Queen Isolde's famed patronage, the arts flourished here.
+
+My first stop was the regal Assembly House.
+The Assembly of Voices convenes there.
+It is Veridia's main legislative body.
+
+8th Day of Frostfall 1855 - Exploring the Takron Valley
+The Takron Valley is quiet. """ + "The mist rolls over the Takron hills. " * 30
+
+
+def test_day_paragraph_policy_matches_archive_chunker():
+    assert chunk_by_day_and_paragraph(DIARY) == chunk_diary_by_day_and_paragraph(DIARY)
+
+
+def test_split_every_day_caps_all_paragraphs():
+    long_first_day = DIARY.replace("Today marks", "Long text. " * 100 + "Today marks")
+    chunks = ChunkingEngine().run(long_first_day, DayParagraphPolicy(max_size=800, split_every_day=True))
+    assert max(len(chunk) for chunk in chunks) <= 800
+
+
+def test_line_window_matches_archive_v3():
+    legacy = process_diary_chunks_v3(DIARY)["chunks"]
+    table = chunk_by_line_window(DIARY, lines_per_chunk=4)
+
+    assert table.texts() == [chunk["chunk_text"] for chunk in legacy]
+    assert [table.terms(i) for i in range(len(table)) if not table.is_date_chunk[i]] == \
+        [chunk["day_metadata"]["palavras_maiusculas"] for chunk in legacy if not chunk.get("is_date_chunk")]
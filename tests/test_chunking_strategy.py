@@ -0,0 +1,51 @@
+from src.chunk_table import ChunkTable
+from src.chunking_strategy import build_chunk_table, process_diary_chunks
+
+DIARY = """1st Day of Frostfall 1855 - Arrival in the Capital of Veridia
+Today marks my arrival in the capital city of Veridia.
+Under Queen Isolde's famed patronage, the arts flourished here.
+My first stop was the regal Assembly House.
+
+The Assembly of Voices convenes there.
+8th Day of Frostfall 1855 - Exploring the Takron Valley
+The Takron Valley is quiet.
+"""
+
+
+def test_process_diary_chunks_keeps_legacy_format():
+    result = process_diary_chunks(DIARY)
+
+    assert result["metadata"]["total_days"] == 2
+    assert result["metadata"]["total_chunks"] == 5
+    assert result["metadata"]["avg_chunks_per_day"] == 2.5
+    first, second = result["chunks"][0], result["chunks"][1]
+    assert first["is_date_chunk"] is True
+    assert first["day_metadata"] == {"full_date": first["date"], "title": "Arrival in the Capital of Veridia"}
+    assert second["line_count"] == 3
+    assert second["chunk_text"].startswith("Today marks")
+    # O mesmo dict de metadados é compartilhado por todos os chunks do dia
+    assert first["day_metadata"] is second["day_metadata"]
+
+
+def test_chunk_table_columns_and_round_trip():
+    table = build_chunk_table(DIARY)
+
+    assert len(table) == 5
+    assert len(table.days) == 2
+    record = table[1]
+    assert record.date == "1st Day of Frostfall 1855 - Arrival in the Capital of Veridia"
+    assert record.palavras_maiusculas == ["Today", "Veridia", "Under", "Queen", "Isolde", "My", "Assembly", "House"]
+    assert table.vocabulary.count("Assembly") == 1
+
+    restored = ChunkTable.from_json(table.to_json())
+    assert restored.texts() == table.texts()
+    assert restored[4].palavras_maiusculas == ["The", "Takron", "Valley"]
+    assert restored.to_legacy_dict() == table.to_legacy_dict()
+
+
+def test_to_entities_streams_primary_keys_and_text():
+    table = build_chunk_table(DIARY)
+    entities = list(table.to_entities([[0.0]] * len(table), start_id=10))
+
+    assert [e["primary_key"] for e in entities] == [10, 11, 12, 13, 14]
+    assert entities[2]["text"] == table[2].chunk_text
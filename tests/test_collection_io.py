@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.collection_io import export_collection, import_collection, iter_entities, load_local_index
+
+
+class MemoryCollection:
+    def __init__(self):
+        self.inserted = []
+
+    def insert_vectors(self, collection_name, data):
+        self.inserted.extend(data)
+        return {"code": 0}
+
+
+def entity_batches(n=7, batch_size=3, dim=4):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    entities = [{"id": i, "vector": vector.tolist(), "text": f"chunk {i}"}
+                for i, vector in enumerate(vectors, start=1)]
+    return [entities[i:i + batch_size] for i in range(0, n, batch_size)], entities
+
+
+def test_export_import_round_trip(tmp_path):
+    batches, entities = entity_batches()
+    manifest = export_collection(iter(batches), str(tmp_path), "dr_voss")
+    assert manifest["rows"] == 7 and manifest["dim"] == 4 and len(manifest["parts"]) == 3
+    assert sorted(os.listdir(tmp_path))[0] == "manifest.json"
+
+    target = MemoryCollection()
+    assert import_collection(target, "copy", str(tmp_path), batch_size=2, workers=2) == 7
+    assert sorted(target.inserted, key=lambda e: e["id"]) == entities
+    assert [len(batch) for batch in iter_entities(str(tmp_path), batch_size=5)] == [5, 2]
+
+
+def test_incomplete_export_is_rejected(tmp_path):
+    batches, _ = entity_batches()
+    export_collection(iter(batches), str(tmp_path), "dr_voss")
+    os.remove(tmp_path / "manifest.json")
+    with pytest.raises(FileNotFoundError):
+        list(iter_entities(str(tmp_path)))
+
+
+def test_load_local_index_from_export(tmp_path):
+    batches, entities = entity_batches()
+    export_collection(iter(batches), str(tmp_path), "dr_voss")
+    index = load_local_index(str(tmp_path))
+    hits = index.search(entities[4]["vector"], k=1)[0]
+    assert hits[0][0] == 5
+    assert index.get([5]) == [{"primary_key": 5, "text": "chunk 5"}]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from src.dim_reduction import PCAProjection, Truncation, load_reducer, make_reducer, rescore
+from src.embedding import _normalize
+from src.local_index import LocalIndex, TwoStageIndex
+
+
+def low_rank_vectors(n=200, dim=32, rank=4, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(rank, dim))
+    return _normalize((rng.normal(size=(n, rank)) @ basis + rng.normal(0, 0.01, (n, dim))).astype(np.float32))
+
+
+def test_pca_keeps_variance_and_round_trips_through_npz(tmp_path):
+    vectors = low_rank_vectors()
+    pca = PCAProjection(4).fit(vectors)
+    assert pca.explained_variance_ratio > 0.99
+    reduced = pca.transform(vectors)
+    assert reduced.shape == (200, 4)
+    assert np.allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+
+    path = str(tmp_path / "projection.npz")
+    pca.save(path)
+    loaded = load_reducer(path)
+    assert isinstance(loaded, PCAProjection) and np.allclose(loaded.transform(vectors[:3]), reduced[:3])
+
+
+def test_truncation_and_unknown_kind(tmp_path):
+    truncated = Truncation(2).transform([3.0, 4.0, 12.0])
+    assert np.allclose(truncated, [[0.6, 0.8]])
+    path = str(tmp_path / "truncate.npz")
+    make_reducer("truncate", 2).save(path)
+    assert load_reducer(path).dim == 2
+    with pytest.raises(ValueError):
+        make_reducer("random", 2)
+    with pytest.raises(ValueError):
+        PCAProjection(8).fit(np.ones((4, 16)))
+
+
+def test_two_stage_index_matches_exact_search():
+    vectors = low_rank_vectors()
+    ids, texts = list(range(200)), [f"chunk {i}" for i in range(200)]
+    exact = LocalIndex(32)
+    exact.add(ids, vectors, texts)
+    two_stage = TwoStageIndex(32, PCAProjection(4), oversample=4)
+    two_stage.add(ids, vectors, texts)
+
+    queries = vectors[:10]
+    expected = exact.search(queries, k=5)
+    results = two_stage.search(queries, k=5)
+    assert two_stage.reducer.fitted  # ajustada na primeira busca
+    assert [[i for i, _ in hits] for hits in results] == [[i for i, _ in hits] for hits in expected]
+    assert results[0][0][1] == pytest.approx(1.0, abs=1e-5)  # scores vêm da dimensão cheia
+    assert len(two_stage.search_reduced(queries, k=5)[0]) == 5
+    assert two_stage.nbytes > exact.nbytes
+
+
+def test_rescore_with_stored_full_vectors_restores_full_dimension_order():
+    vectors = low_rank_vectors()
+    pca = PCAProjection(2).fit(vectors)  # 2 de 4 dimensões reais: a ordem reduzida erra
+    query = vectors[7]
+    reduced_scores = pca.transform(vectors) @ pca.transform(query)[0]
+    reduced_order = np.argsort(-reduced_scores)
+    exact_order = np.argsort(-(vectors @ query))
+    assert list(reduced_order[:3]) != list(exact_order[:3])
+
+    candidates = reduced_order[:40]
+    hits = [(int(i), float(reduced_scores[i]), vectors[i]) for i in candidates]
+    top = rescore(query, hits, k=3)
+    assert [id_ for id_, _ in top] == [int(i) for i in exact_order[:3] if i in candidates]
+    assert top[0][1] == pytest.approx(float(vectors[top[0][0]] @ query))
+
+    # Linha sem vetor cheio (gravada antes do campo) fica com o score reduzido
+    assert rescore(query, [(1, 0.5, None), (2, 0.1, np.zeros(32))]) == [(1, 0.5), (2, 0.0)]
@@ -0,0 +1,39 @@
+import numpy as np
+
+import src.embedding as embedding
+
+
+class FakeEmbedder:
+    runtime = "fake"
+
+    def encode(self, texts, batch_size=32):
+        return np.ones((len(texts), embedding.EMBEDDING_DIM), dtype=np.float32)
+
+
+def test_lazy_embedder_loads_on_first_use(monkeypatch):
+    loads = []
+    monkeypatch.setattr(embedding, "load_embedder", lambda runtime, model_dir: loads.append(1) or FakeEmbedder())
+    lazy = embedding.LazyEmbedder()
+
+    assert not lazy.loaded and loads == []
+    lazy.warm_up()
+    lazy.encode(["What is the currency of Veridia called?"])
+
+    stats = lazy.get_stats()
+    assert loads == [1]
+    assert stats["runtime"] == "fake"
+    assert stats["encode_calls"] == 2
+    assert stats["load_seconds"] is not None
+
+
+def test_auto_runtime_prefers_quantized_onnx(monkeypatch):
+    monkeypatch.setattr(embedding, "onnx_available", lambda model_dir, quantized: quantized)
+    monkeypatch.setattr(embedding, "OnnxEmbedder", lambda model_dir, quantized, intra_op_threads=None: ("onnx", quantized))
+
+    assert embedding.load_embedder("auto", "models/x") == ("onnx", True)
+
+
+def test_normalize_handles_zero_vectors():
+    vectors = embedding._normalize(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    assert np.allclose(vectors[0], [0.6, 0.8])
+    assert np.allclose(vectors[1], [0.0, 0.0])
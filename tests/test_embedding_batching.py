@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.embedding import EMBEDDING_DIM
+from src.embedding_batching import BucketedEmbeddingRunner, plan_batches, token_lengths
+
+
+class LengthEmbedder:
+    """Vetor = [tamanho do texto, 0, ...]; registra os batches recebidos."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32):
+        self.batches.append(list(texts))
+        vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        vectors[:, 0] = [len(text) for text in texts]
+        return vectors
+
+
+def test_plan_batches_sorts_and_respects_token_budget():
+    lengths = [100, 10, 50, 10, 100, 12]
+    batches = plan_batches(lengths, max_tokens_per_batch=200, max_batch_size=3)
+    assert [list(batch) for batch in batches] == [[1, 3, 5], [2, 0], [4]]
+    assert sorted(np.concatenate(batches)) == list(range(len(lengths)))
+
+
+def test_runner_restores_original_order_and_reports_padding():
+    texts = ["x" * n for n in (400, 8, 200, 12, 396, 40)]
+    embedder = LengthEmbedder()
+    runner = BucketedEmbeddingRunner(embedder, tokenizer=False, max_tokens_per_batch=256)
+    vectors = runner.encode(texts)
+    assert vectors[:, 0].tolist() == [len(text) for text in texts]
+    assert [len(batch) for batch in embedder.batches] == [4, 2]
+    stats = runner.get_stats()
+    assert stats["texts"] == 6 and stats["batches"] == 2
+    assert stats["tokens"] == int(token_lengths(texts).sum())
+    assert stats["padded_tokens"] == 4 * 52 + 2 * 102  # contra 6 * 102 num único batch
+
+
+def test_token_lengths_are_capped_at_model_max_length():
+    assert token_lengths(["word " * 1000, "hi"], max_length=512).tolist() == [512, 3]
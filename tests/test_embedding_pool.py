@@ -0,0 +1,71 @@
+import os
+import zlib
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+import src.embedding_pool as embedding_pool
+from src.embedding import EMBEDDING_DIM
+from src.embedding_pool import SharedEmbeddingPool
+
+
+class FakeEmbedder:
+    """Vetor determinístico por texto (crc32, igual em qualquer processo) e o pid de quem embedou."""
+
+    runtime = "fake"
+
+    def encode(self, texts, batch_size=32):
+        vectors = np.stack([np.random.default_rng(zlib.crc32(text.encode())).normal(size=EMBEDDING_DIM)
+                            for text in texts]).astype(np.float32)
+        vectors[:, 0] = os.getpid()
+        return vectors
+
+
+def load_fake_embedder(runtime, model_dir, threads=None):
+    return FakeEmbedder()
+
+
+def test_empty_input_does_not_start_workers():
+    pool = SharedEmbeddingPool(2, runtime="torch")
+    assert pool.encode([]).shape == (0, EMBEDDING_DIM)
+    assert pool._workers == []
+
+
+def test_worker_load_failure_is_raised_and_pool_is_cleaned_up():
+    pool = SharedEmbeddingPool(1, runtime="unknown-runtime")
+    with pytest.raises(RuntimeError, match="failed to load the model"):
+        pool.encode(["text"])
+    assert pool._workers == []
+
+
+def test_threads_are_split_between_processes():
+    assert SharedEmbeddingPool(2, threads_per_process=3).threads == 3
+    assert SharedEmbeddingPool(10 ** 6).threads == 1
+
+
+def test_workers_write_vectors_in_order_and_shared_memory_is_unlinked(monkeypatch):
+    segments = []
+
+    class TrackedSharedMemory(SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            segments.append(self.name)
+
+    monkeypatch.setattr(embedding_pool, "SharedMemory", TrackedSharedMemory)
+    texts = [f"chunk {i} " + "x" * (i % 7) for i in range(23)]
+    with SharedEmbeddingPool(2, loader=load_fake_embedder, threads_per_process=1) as pool:
+        assert pool.worker_runtime == "fake"
+        vectors = pool.encode(texts, batch_size=3)
+        again = pool.encode(texts[:5], batches=[[4, 0], [2, 3, 1]])
+        worker_pids = {process.pid for process in pool._workers}
+
+    expected = FakeEmbedder().encode(texts)
+    assert vectors.shape == (23, EMBEDDING_DIM)
+    np.testing.assert_array_equal(vectors[:, 1:], expected[:, 1:])
+    np.testing.assert_array_equal(again[:, 1:], expected[:5, 1:])
+    assert set(vectors[:, 0].astype(int)) <= worker_pids  # embedado nos workers, não no pai
+    assert len(segments) == 2
+    for name in segments:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
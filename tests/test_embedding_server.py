@@ -0,0 +1,44 @@
+import os
+import threading
+
+import numpy as np
+
+from src.embedding_server import EmbeddingServer, RemoteEmbedder
+
+
+class FakeEmbedder:
+    runtime = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(len(texts))
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_remote_embedder_round_trip(tmp_path):
+    socket_path = os.path.join(tmp_path, "embedding.sock")
+    embedder = FakeEmbedder()
+    server = EmbeddingServer(socket_path, embedder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = RemoteEmbedder(socket_path)
+        vectors = client.encode(["Veridia", "Aralith Mountains"])
+        assert vectors.shape == (2, 2)
+        assert vectors[:, 0].tolist() == [7.0, 17.0]
+
+        results = {}
+
+        def query(i):
+            results[i] = client.encode(["x" * i])[0, 0]
+
+        threads = [threading.Thread(target=query, args=(i,)) for i in range(1, 9)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == {i: float(i) for i in range(1, 9)}
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,52 @@
+import time
+
+from src.health import HealthMonitor
+
+
+def test_readiness_reports_latency_and_errors():
+    def failing():
+        raise ConnectionError("zilliz unreachable")
+
+    monitor = HealthMonitor(interval=60, timeout=1.0)
+    monitor.register("llm", lambda: None)
+    monitor.register("milvus", failing)
+
+    assert monitor.readiness()["ready"] is False  # nada checado ainda
+    monitor.check_all()
+    report = monitor.readiness()
+
+    assert report["ready"] is False
+    assert report["dependencies"]["llm"]["status"] == "up"
+    assert report["dependencies"]["llm"]["latency_ms"] is not None
+    assert report["dependencies"]["milvus"]["status"] == "down"
+    assert "zilliz unreachable" in report["dependencies"]["milvus"]["last_error"]
+
+
+def test_probes_run_concurrently_and_time_out():
+    monitor = HealthMonitor(interval=60, timeout=0.3)
+    for name in ("milvus", "llm", "embedding"):
+        monitor.register(name, lambda: time.sleep(0.2))
+    monitor.register("slow", lambda: time.sleep(1.0), critical=False)
+
+    start = time.monotonic()
+    monitor.check_all()
+    elapsed = time.monotonic() - start
+
+    report = monitor.readiness()
+    assert elapsed < 0.5
+    assert report["ready"] is True  # "slow" não é crítico
+    assert report["dependencies"]["slow"]["last_error"].startswith("timeout")
+
+
+def test_background_loop_populates_cache():
+    monitor = HealthMonitor(interval=0.05, timeout=0.5)
+    monitor.register("milvus", lambda: None)
+    monitor.start()
+    try:
+        deadline = time.monotonic() + 2
+        while not monitor.readiness()["ready"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert monitor.readiness()["ready"] is True
+        assert monitor.liveness()["status"] == "alive"
+    finally:
+        monitor.stop()
@@ -0,0 +1,105 @@
+import queue
+import time
+
+import numpy as np
+import pytest
+
+from src.dim_reduction import FULL_VECTOR_FIELD, Truncation
+from src.ingestion import DeltaSegment, IngestionService, extract_text
+from src.local_index import LocalIndex
+from src.sharding import LocalShard, ShardedRetriever
+
+DIM = 16
+
+
+class HashEmbedder:
+    """Vetor determinístico por texto: o mesmo texto na query acha o chunk com score 1."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def encode(self, texts, batch_size=32):
+        time.sleep(self.delay)
+        vectors = np.stack([np.random.default_rng(abs(hash(text)) % 2**32).normal(size=DIM) for text in texts])
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def wait_for(service, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = service.job(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_ingested_document_is_searchable_through_the_delta_shard():
+    delta = DeltaSegment(DIM)
+    main = LocalShard(LocalIndex(DIM))
+    retriever = ShardedRetriever({"main": main, "delta": delta}, delta_shards=["delta"])
+    service = IngestionService(HashEmbedder(), delta, strategy="day-paragraph", batch_size=2).start()
+    try:
+        text = "The tea of Veridia is bitter.\n\nThe currency is the lumen.\n\nRivers freeze in winter."
+        job = service.submit(text.encode("utf-8"), "text/plain", source="notes")
+        assert job["status"] == "queued"
+        job = wait_for(service, job["id"])
+        assert job["status"] == "done" and job["chunks"] == 3
+
+        query = HashEmbedder().encode(["The currency is the lumen."])[0]
+        result = retriever.search(query, k=1)
+        assert result.hits[0].shard == "delta" and result.hits[0].score == pytest.approx(1.0, abs=1e-5)
+        assert retriever.fetch(result.hits)[0]["text"] == "The currency is the lumen."
+        assert retriever.route({"id": 1}) == "main"  # o delta não entra no roteamento
+
+        failed = wait_for(service, service.submit(b"\n\n", "text/plain")["id"])
+        assert failed["status"] == "failed" and "sem texto" in failed["error"]
+        assert service.get_stats()["chunks"] == 3 and service.get_stats()["failed_jobs"] == 1
+    finally:
+        service.stop()
+
+
+def test_compaction_moves_rows_to_main_index_and_prunes_after_grace():
+    delta = DeltaSegment(DIM)
+    main = LocalShard(LocalIndex(DIM))
+    retriever = ShardedRetriever({"main": main, "delta": delta}, delta_shards=["delta"])
+    service = IngestionService(HashEmbedder(), delta, compactor=main.insert, grace=60.0)
+    assert service.ingest(b"alpha\n\nbeta", "text/plain", "doc") == 2
+
+    assert service.compact() == 2 and len(main.index) == 2
+    assert service.compact() == 0  # nada pendente
+    assert len(delta) == 2  # ainda no delta durante a carência
+
+    # O mesmo id nos dois lados: o hit do delta é descartado
+    query = HashEmbedder().encode(["alpha"])[0]
+    hits = retriever.search(query, k=2).hits
+    assert [hit.shard for hit in hits] == ["main", "main"]
+
+    assert delta.prune(grace=60.0, now=time.monotonic() + 61) == 2
+    assert len(delta) == 0 and delta.search(query, 1) == []
+    assert retriever.search(query, k=1).hits[0].shard == "main"
+
+
+def test_reduced_delta_keeps_full_vectors_for_rescoring_and_compaction():
+    delta = DeltaSegment(4)
+    service = IngestionService(HashEmbedder(), delta, reducer=Truncation(4))
+    assert service.ingest(b"alpha\n\nbeta\n\ngamma", "text/plain", "doc") == 3
+
+    query = HashEmbedder().encode(["beta"])[0]
+    reduced = Truncation(4).transform(query)[0]
+    top_id, score = delta.search(reduced, 3, full=query)[0]
+    assert delta.get([top_id])[0]["text"] == "beta" and score == pytest.approx(1.0, abs=1e-5)
+    entities = delta.pending("primary_key")
+    assert len(entities[0]["vector"]) == 4 and len(entities[0][FULL_VECTOR_FIELD]) == DIM
+
+
+def test_queue_full_and_pdf_detection():
+    service = IngestionService(HashEmbedder(), DeltaSegment(DIM), max_queue=1)  # sem start: nada consome
+    service.submit(b"one")
+    with pytest.raises(queue.Full):
+        service.submit(b"two")
+    assert service.queue_depth == 1
+
+    assert extract_text("olá".encode("utf-8")) == "olá"
+    with pytest.raises(Exception):
+        extract_text(b"%PDF-1.4 truncated")  # vai para o PyPDF2 pela assinatura, mesmo sem content-type
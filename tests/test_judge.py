@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from src.groq_proxy import FALLBACK_RESPONSE
+from src.judge import JudgementCache, LLMJudge, build_prompt, judgement_key, parse_judgements
+from src.stubs.groq import default_responder
+
+
+class StubJudgeClient:
+    """Responde como o stub da Groq; `skip` força o modelo a pular itens de batches grandes."""
+
+    model_name = "stub-model"
+
+    def __init__(self, skip=()):
+        self.skip = set(skip)
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def judge(self, system_prompt, prompt, model=None, max_tokens=1024):
+        with self.lock:
+            self.prompts.append(prompt)
+        if prompt.count("<item") > 1:
+            for number in self.skip:
+                start = prompt.find(f'<item id="{number}">')
+                if start != -1:
+                    prompt = prompt[:start] + prompt[prompt.find("</item>", start) + len("</item>"):]
+        return default_responder([{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}])
+
+
+def qa(i, predicted=None):
+    return {"question": f"Question {i}?", "expected_answer": f"The answer is token{i}.",
+            "predicted_answer": predicted if predicted is not None else f"The answer is token{i}."}
+
+
+def test_parse_judgements_formats():
+    assert parse_judgements('{"judgements": [{"id": 2, "score": 0.5, "reason": "partial"}, {"id": 1, "score": 1}]}',
+                            2) == {1: {"score": 1.0, "reason": ""}, 2: {"score": 0.5, "reason": "partial"}}
+    fenced = 'Here you go:\n```json\n{"judgements": [{"id": 1, "score": 1.7}]}\n```'
+    assert parse_judgements(fenced, 1)[1]["score"] == 1.0  # limitado a [0, 1]
+    assert parse_judgements("1: 0.8\nItem 2 - 0.25\n3: 0.9", 2) == {1: {"score": 0.8, "reason": ""},
+                                                                    2: {"score": 0.25, "reason": ""}}
+    assert parse_judgements("Grade: 0.65\n\nMostly right.", 1)[1]["score"] == 0.65
+    assert parse_judgements('{"judgements": [{"id": 1, "score": "n/a"}]}', 1) == {}
+    assert parse_judgements(FALLBACK_RESPONSE, 3) == {}
+
+
+def test_batches_are_packed_and_parsed_per_item(tmp_path):
+    client = StubJudgeClient()
+    judge = LLMJudge(client, JudgementCache(str(tmp_path / "cache.jsonl")), batch_size=4, max_workers=3)
+    items = [qa(i) for i in range(9)] + [qa(9, predicted="The answer is unknown.")]
+    judgements = judge.judge(items)
+    assert len(client.prompts) == 3  # 10 itens em batches de 4
+    assert [j["score"] for j in judgements[:9]] == [1.0] * 9 and judgements[9]["score"] == pytest.approx(0.75)
+    assert not any(j["cached"] for j in judgements)
+    assert judge.stats == {"items": 10, "cached": 0, "judged": 10, "batches": 3, "retried": 0, "failed": 0}
+
+
+def test_cache_rejudges_only_changed_answers(tmp_path):
+    path = str(tmp_path / "cache.jsonl")
+    items = [qa(i) for i in range(6)]
+    LLMJudge(StubJudgeClient(), JudgementCache(path), batch_size=4).judge(items)
+
+    # Nova execução (cache relido do disco) com só uma resposta alterada
+    items[2] = qa(2, predicted="Something else entirely.")
+    client = StubJudgeClient()
+    judge = LLMJudge(client, JudgementCache(path), batch_size=4)
+    judgements = judge.judge(items + [items[0]])
+    assert len(client.prompts) == 1 and client.prompts[0].count("<item") == 1
+    assert "Something else entirely." in client.prompts[0]
+    assert [j["cached"] for j in judgements] == [True, True, False, True, True, True, True]
+    assert judgements[2]["score"] < 1.0
+    assert judgement_key("q", "e", "p", "model-a") != judgement_key("q", "e", "p", "model-b")
+
+
+def test_skipped_items_are_retried_alone_and_failures_are_not_cached(tmp_path):
+    client = StubJudgeClient(skip={2})
+    judge = LLMJudge(client, JudgementCache(str(tmp_path / "cache.jsonl")), batch_size=3)
+    judgements = judge.judge([qa(i) for i in range(3)])
+    assert [j["score"] for j in judgements] == [1.0, 1.0, 1.0]
+    assert judge.stats["retried"] == 1 and client.prompts[-1] == build_prompt([qa(1)])
+
+    class DownClient(StubJudgeClient):
+        def judge(self, *args, **kwargs):
+            self.prompts.append(args[1])
+            return FALLBACK_RESPONSE
+
+    down = DownClient()
+    cache = JudgementCache(str(tmp_path / "other.jsonl"))
+    judgements = LLMJudge(down, cache, batch_size=3).judge([qa(i) for i in range(3)])
+    assert [j["score"] for j in judgements] == [None] * 3
+    assert len(down.prompts) == 1 and len(cache) == 0  # sem retry item a item com a API fora
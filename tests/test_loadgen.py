@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from src.loadgen import LatencyHistogram, Outcome, QuestionSampler, load_questions, run_closed_loop, run_open_loop
+
+
+def test_histogram_percentiles_within_one_percent():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    assert histogram.total == 1000
+    for q, expected in ((50, 0.5), (99, 0.99), (100, 1.0)):
+        assert histogram.percentile(q) == pytest.approx(expected, rel=0.01)
+    assert histogram.summary()["max"] == pytest.approx(1000.0)
+
+    merged = LatencyHistogram().merge(histogram).merge(histogram)
+    assert merged.total == 2000 and merged.percentile(50) == histogram.percentile(50)
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_coordinated_omission_correction_backfills_stalls():
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.record_corrected(0.010, expected_interval=0.010)
+    histogram.record_corrected(1.0, expected_interval=0.010)  # pausa de 1 s
+    # Sem correção o p90 seria 10 ms; a pausa esconde ~99 requisições que teriam esperado
+    assert 99 + 95 < histogram.total <= 99 + 100
+    assert histogram.percentile(90) > 0.5
+
+
+def slow_server(service_time, capacity=1):
+    """Servidor com `capacity` requisições simultâneas, cada uma levando `service_time`."""
+    slots = threading.Semaphore(capacity)
+
+    def send(question):
+        with slots:
+            time.sleep(service_time)
+        return Outcome(200 if question else 500)
+    return send
+
+
+def test_open_loop_counts_queueing_delay():
+    # 100 req/s com uma conexão só contra um servidor de 20 ms: metade da taxa, a fila cresce
+    report = run_open_loop(slow_server(0.02), lambda: "q", rate=100, duration=0.5, max_in_flight=1)
+    summary = report.summary()
+    assert summary["requests"] == 50 and summary["error_rate"] == 0
+    assert summary["latency_ms"]["p99"] < 100
+    assert summary["corrected_latency_ms"]["max"] > 300
+    assert summary["late_sends"] > 40
+
+
+def test_closed_loop_with_errors_and_sampler(tmp_path):
+    path = tmp_path / "questions.txt"
+    path.write_text("a?\n\nb?\n", encoding="utf-8")
+    questions = load_questions(str(path))
+    assert questions == ["a?", "b?"]
+    sampler = QuestionSampler(questions + [""], seed=1)
+
+    report = run_closed_loop(slow_server(0.005, capacity=2), sampler, concurrency=2, duration=0.3)
+    summary = report.summary()
+    assert summary["requests"] > 20
+    assert set(summary["statuses"]) == {"200", "500"}
+    assert 0 < summary["error_rate"] < 1
+    assert summary["corrected_latency_ms"]["count"] >= summary["latency_ms"]["count"]
+    with pytest.raises(ValueError):
+        QuestionSampler([])
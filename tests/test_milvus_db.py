@@ -0,0 +1,224 @@
+import json
+import time
+
+import pytest
+import requests
+
+from scripts.milvus_db import CircuitBreaker, ZillizAPIError, ZillizClient
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload if payload is not None else {"code": 0, "data": []}
+
+    @property
+    def content(self):
+        return json.dumps(self._payload).encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error", response=self)
+
+
+def make_client(**kwargs):
+    kwargs.setdefault("backoff_base", 0.0)
+    return ZillizClient(api_key="test", cluster_id=None, base_url="http://zilliz.test/v2", **kwargs)
+
+
+def test_search_is_retried_on_server_error(monkeypatch):
+    responses = [FakeResponse(503), FakeResponse(200, {"data": [{"id": 1}]})]
+    monkeypatch.setattr(requests, "request", lambda **kwargs: responses.pop(0))
+    client = make_client(hedge=False)
+
+    result = client.search_vectors("dr_voss", [0.1] * 4)
+
+    assert result["data"] == [{"id": 1}]
+    assert client.metrics["retries"] == 1
+
+
+def test_insert_is_not_retried(monkeypatch):
+    calls = []
+
+    def fake_request(**kwargs):
+        calls.append(kwargs)
+        return FakeResponse(503)
+
+    monkeypatch.setattr(requests, "request", fake_request)
+    client = make_client()
+
+    try:
+        client.insert_vectors("dr_voss", [{"primary_key": 1}])
+    except requests.exceptions.HTTPError:
+        pass
+    assert len(calls) == 1
+
+
+def test_open_circuit_uses_fallback(monkeypatch):
+    def fake_request(url, **kwargs):
+        if url.startswith("http://zilliz.test"):
+            raise requests.exceptions.ConnectionError("down")
+        return FakeResponse(200, {"data": ["local"]})
+
+    monkeypatch.setattr(requests, "request", lambda **kwargs: fake_request(**kwargs))
+    fallback = ZillizClient(api_key="t", cluster_id=None, base_url="http://localhost:19530/v2", hedge=False)
+    client = make_client(max_retries=0, hedge=False, fallback_client=fallback,
+                         circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+    assert client.list_collections() == {"data": ["local"]}
+    assert client.circuit_breaker.state == "open"
+    assert client.list_collections() == {"data": ["local"]}
+    assert client.metrics["fallback_requests"] == 2
+
+
+def test_non_json_body_fails_over_like_a_request_error(monkeypatch):
+    class HtmlResponse(FakeResponse):
+        content = b"<html>upstream proxy error</html>"
+
+    def fake_request(url, **kwargs):
+        if url.startswith("http://zilliz.test"):
+            return HtmlResponse(200)
+        return FakeResponse(200, {"data": ["local"]})
+
+    monkeypatch.setattr(requests, "request", lambda **kwargs: fake_request(**kwargs))
+    fallback = ZillizClient(api_key="t", cluster_id=None, base_url="http://localhost:19530/v2", hedge=False)
+    client = make_client(max_retries=1, hedge=False, fallback_client=fallback)
+
+    assert client.search_vectors("dr_voss", [0.1] * 4) == {"data": ["local"]}
+    assert client.metrics["retries"] == 1 and client.metrics["failures"] == 1
+    assert client.circuit_breaker.failures == 2
+    with pytest.raises(requests.exceptions.InvalidJSONError):
+        make_client(hedge=False).search_vectors("dr_voss", [0.1] * 4)
+
+
+def test_error_code_in_a_200_body_is_retried_or_raised(monkeypatch):
+    responses = [FakeResponse(200, {"code": 65535, "message": "unexpected error"}),
+                 FakeResponse(200, {"code": 0, "data": [{"id": 1}]})]
+    monkeypatch.setattr(requests, "request", lambda **kwargs: responses.pop(0))
+    client = make_client(hedge=False)
+    assert client.search_vectors("dr_voss", [0.1] * 4)["data"] == [{"id": 1}]
+    assert client.metrics["retries"] == 1
+
+    # Parâmetro inválido: erro do pedido, sem retry e sem contar contra o circuito
+    calls = []
+
+    def invalid(**kwargs):
+        calls.append(kwargs)
+        return FakeResponse(200, {"code": 1100, "message": "invalid parameter"})
+
+    monkeypatch.setattr(requests, "request", invalid)
+    client = make_client(hedge=False, circuit_breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(ZillizAPIError) as error:
+        client.search_vectors("dr_voss", [0.1] * 4)
+    assert error.value.code == 1100 and len(calls) == 1
+    assert client.circuit_breaker.failures == 0 and client.circuit_breaker.state == "closed"
+
+
+def test_client_errors_do_not_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(requests, "request", lambda **kwargs: FakeResponse(400))
+    client = make_client(hedge=False, circuit_breaker=CircuitBreaker(failure_threshold=1))
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.search_vectors("dr_voss", [0.1] * 4)
+    assert client.circuit_breaker.state == "closed" and client.metrics["retries"] == 0
+
+
+def test_slow_search_is_hedged(monkeypatch):
+    calls = []
+
+    def fake_request(**kwargs):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return FakeResponse(200, {"data": ["slow"]})
+        return FakeResponse(200, {"data": ["fast"]})
+
+    client = make_client(hedge_min_samples=1, hedge_min_delay=0.01)
+    client.latency.record(0.02)
+    monkeypatch.setattr(requests, "request", fake_request)
+
+    start = time.monotonic()
+    result = client.search_vectors("dr_voss", [0.1] * 4)
+
+    assert result["data"] == ["fast"]
+    assert time.monotonic() - start < 0.4
+    assert client.get_metrics()["hedge_wins"] == 1
+
+
+def test_full_hedge_pool_runs_search_inline_without_hedge(monkeypatch):
+    calls = []
+
+    def fake_request(**kwargs):
+        calls.append(kwargs)
+        time.sleep(0.05)
+        return FakeResponse(200, {"data": ["inline"]})
+
+    client = make_client(hedge_min_samples=1, hedge_min_delay=0.01, hedge_workers=1)
+    client.latency.record(0.01)
+    monkeypatch.setattr(requests, "request", fake_request)
+    assert client._hedge_slots.acquire(blocking=False)  # o único worker está ocupado
+
+    assert client.search_vectors("dr_voss", [0.1] * 4)["data"] == ["inline"]
+    assert len(calls) == 1
+    assert client.get_metrics()["hedge_skipped"] == 1 and client.get_metrics()["hedged_requests"] == 0
+
+
+def test_half_open_circuit_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # teste em andamento: o resto continua barrado
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow_request() and breaker.allow_request()
+
+
+def test_iter_entities_pages_by_primary_key_cursor(monkeypatch):
+    rows = [{"id": i, "text": f"chunk {i}"} for i in range(1, 6)]
+    filters = []
+
+    def fake_request(url, data=None, **kwargs):
+        payload = json.loads(data)
+        if url.endswith("collections/describe"):
+            return FakeResponse(200, {"code": 0, "data": {"fields": [{"name": "vector"},
+                                                                     {"name": "id", "primaryKey": True}]}})
+        filters.append(payload["filter"])
+        last = int(payload["filter"].split(">")[1]) if ">" in payload["filter"] else 0
+        page = [row for row in rows if row["id"] > last][:payload["limit"]]
+        return FakeResponse(200, {"code": 0, "data": page})
+
+    monkeypatch.setattr(requests, "request", fake_request)
+    client = make_client(hedge=False)
+
+    batches = list(client.iter_entities("dr_voss", batch_size=2))
+
+    assert [[row["id"] for row in batch] for batch in batches] == [[1, 2], [3, 4], [5]]
+    assert filters == ["", "id > 2", "id > 4"]
+    assert client.get_all_entities("dr_voss", batch_size=2) == rows
+
+
+def test_iter_entities_reads_primary_field_from_describe(monkeypatch):
+    rows = [{"primary_key": i, "text": f"chunk {i}"} for i in range(1, 4)]
+    calls = []
+
+    def fake_request(url, data=None, **kwargs):
+        calls.append(url.rsplit("/", 2)[-2:])
+        payload = json.loads(data)
+        if url.endswith("collections/describe"):
+            return FakeResponse(200, {"code": 0, "data": {"fields": [{"name": "primary_key", "primaryKey": True}]}})
+        last = int(payload["filter"].split(">")[1]) if ">" in payload["filter"] else 0
+        assert payload["outputFields"] == ["*"]
+        return FakeResponse(200, {"code": 0, "data": [row for row in rows if row["primary_key"] > last][:2]})
+
+    monkeypatch.setattr(requests, "request", fake_request)
+    client = make_client(hedge=False)
+
+    assert client.get_all_entities("dr_voss", batch_size=2) == rows
+    assert client.get_all_entities("dr_voss", batch_size=2) == rows
+    assert calls.count(["collections", "describe"]) == 1  # nome da chave fica em cache
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from src.prefetch import Prefetcher
+
+
+class BlockingFetch:
+    """Fetch que só termina quando liberado, para simular o worker ocupado."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, prefix):
+        self.calls.append(prefix)
+        self.release.wait(5)
+        return [f"id-{len(prefix)}", "shared"]
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.01)
+
+
+def test_only_latest_prefix_per_session_is_fetched():
+    fetch = BlockingFetch()
+    prefetcher = Prefetcher(fetch, min_chars=5).start()
+    try:
+        assert prefetcher.submit("s1", "What is") == "queued"
+        wait_until(lambda: fetch.calls == ["What is"])  # worker ocupado com o primeiro prefixo
+        assert prefetcher.submit("s1", "What is the") == "queued"
+        assert prefetcher.submit("s1", "What is the curr") == "coalesced"
+        assert prefetcher.submit("s1", "What is the currency") == "coalesced"
+        assert prefetcher.submit("s1", "What is the currency") == "duplicate"
+        assert prefetcher.submit("s1", "Wha") == "too_short"
+        fetch.release.set()
+        wait_until(lambda: prefetcher.get_stats()["prefetches"] == 2)
+        assert fetch.calls == ["What is", "What is the currency"]
+        assert prefetcher.get_stats()["pending"] == 0
+    finally:
+        fetch.release.set()
+        prefetcher.stop()
+
+
+def test_session_budget_caps_prefetches():
+    prefetcher = Prefetcher(lambda prefix: [], min_chars=1, max_per_session=3, period=60)
+    results = []
+    for i in range(5):
+        results.append(prefetcher.submit("s1", f"q{i}"))
+        prefetcher._pending.clear()  # sem worker: esvazia a fila para não coalescer
+    assert results == ["queued"] * 3 + ["over_budget"] * 2
+    assert prefetcher.submit("s2", "q0") == "queued"  # orçamento é por sessão
+    assert prefetcher.get_stats()["over_budget"] == 2
+
+
+def test_global_budget_caps_prefetches_across_sessions():
+    prefetcher = Prefetcher(lambda prefix: [], min_chars=1, max_per_session=3, period=60, max_total=4)
+    results = [prefetcher.submit(f"s{i}", "question") for i in range(6)]
+    assert results == ["queued"] * 4 + ["over_global_budget"] * 2
+    assert prefetcher.get_stats()["over_global_budget"] == 2
+
+
+def test_prefetch_is_opt_in(monkeypatch):
+    monkeypatch.delenv("PREFETCH_ENABLED", raising=False)
+    assert Prefetcher.from_env(lambda prefix: []) is None
+    monkeypatch.setenv("PREFETCH_ENABLED", "true")
+    assert Prefetcher.from_env(lambda prefix: []).max_total == 120
+
+
+def test_used_rate_counts_queries_served_from_prefetched_candidates():
+    prefetcher = Prefetcher(lambda prefix: ["7", "8", "9"], min_chars=1)
+    prefetcher.run("s1", "currency of")
+    assert prefetcher.record_query("s1", ["8"]) is True
+    assert prefetcher.record_query("s1", ["8"]) is False  # candidatos consumidos pela pergunta anterior
+    prefetcher.run("s1", "tea")
+    assert prefetcher.record_query("s1", ["42"]) is False
+    assert prefetcher.record_query(None, ["7"]) is False
+    assert prefetcher.record_query("unknown", ["7"]) is False
+    stats = prefetcher.get_stats()
+    assert stats["queries"] == 2 and stats["used"] == 1 and stats["used_rate"] == 0.5
@@ -0,0 +1,61 @@
+from src.profiling import MemoryProfiler, ProfileStore, QueryProfiler, memory_profile
+
+
+def busy_work():
+    return sorted(str(i) for i in range(2000))
+
+
+def test_store_is_a_bounded_ring_buffer(tmp_path):
+    store = ProfileStore(str(tmp_path), max_entries=3)
+    ids = [store.save("cpu", f"report {i}") for i in range(5)]
+    assert [entry["id"] for entry in store.list()] == ids[:1:-1]
+    assert store.path(ids[0]) is None
+    with open(store.path(ids[-1])) as f:
+        assert f.read() == "report 4"
+    assert store.path("../../etc/passwd") is None
+
+
+def test_header_triggers_cprofile_and_token_is_enforced(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    profiler = QueryProfiler(store, sample_rate=0.0, token="secret")
+
+    with profiler.maybe_profile("wrong", "process_query") as handle:
+        busy_work()
+    assert handle.id is None
+
+    with profiler.maybe_profile("secret", "process_query", trace_id="abc") as handle:
+        busy_work()
+    entry = store.list()[0]
+    assert entry["id"] == handle.id and entry["trigger"] == "header" and entry["trace_id"] == "abc"
+    with open(store.path(handle.id)) as f:
+        assert "busy_work" in f.read()
+    assert store.path(handle.id, "prof") is not None
+
+
+def test_header_is_ignored_without_admin_token(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    with QueryProfiler(store, sample_rate=0.0, token=None).maybe_profile("1", "process_query") as handle:
+        busy_work()
+    assert handle.id is None and store.list() == []
+
+
+def test_sampling_without_header(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    with QueryProfiler(store, sample_rate=1.0).maybe_profile(None, "process_query") as handle:
+        busy_work()
+    assert store.list()[0]["trigger"] == "sample" and handle.id
+
+
+def test_memory_profile_records_checkpoints(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    with memory_profile("prepare_data", enabled=False) as memory:
+        assert memory is None
+    with memory_profile("prepare_data", store=store) as memory:
+        assert isinstance(memory, MemoryProfiler)
+        memory.checkpoint("start")
+        data = [bytearray(1024) for _ in range(1000)]
+        memory.checkpoint("allocated")
+    entry = store.list()[0]
+    assert entry["kind"] == "memory" and [c["label"] for c in entry["checkpoints"]] == ["start", "allocated"]
+    assert entry["checkpoints"][1]["current_mib"] > entry["checkpoints"][0]["current_mib"]
+    assert len(data) == 1000
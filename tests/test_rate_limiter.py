@@ -0,0 +1,73 @@
+import json
+import time
+
+import requests
+
+from src.rate_limiter import AdaptiveConcurrency, RateLimiter, TokenBucket, parse_retry_after
+import src.groq_proxy as groq
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.headers = headers or {}
+        self.text = ""
+
+    @property
+    def content(self):
+        return json.dumps(self._payload).encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+
+def test_token_bucket_waits_when_empty():
+    bucket = TokenBucket(capacity=60, period=60.0)  # 1 unidade por segundo
+    assert bucket.reserve(60) == 0.0
+    wait = bucket.reserve(2)
+    assert 1.5 < wait <= 2.0
+
+
+def test_aimd_increases_and_halves():
+    window = AdaptiveConcurrency(initial=4, maximum=8, increase_every=2)
+    for _ in range(4):
+        window.on_success()
+    assert window.limit == 6
+    window.on_throttle()
+    assert window.limit == 3
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after": "1.5"}) == 1.5
+    assert parse_retry_after({"retry-after": "soon"}) is None
+    assert parse_retry_after({}) is None
+
+
+def test_generate_response_retries_after_429(monkeypatch):
+    responses = [
+        FakeResponse(429, headers={"retry-after": "0"}),
+        FakeResponse(200, {"choices": [{"message": {"content": " Veridian Crown "}}]}),
+    ]
+    monkeypatch.setattr(groq.requests, "post", lambda *args, **kwargs: responses.pop(0))
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=10_000_000)
+    client = groq.GroqProxyRestAPI(api_key="test", rate_limiter=limiter)
+
+    start = time.monotonic()
+    answer = client.generate_response("What is the currency?", ["context"])
+
+    assert answer == "Veridian Crown"
+    assert limiter.stats["throttled"] == 1
+    assert limiter.concurrency.limit == 2
+    assert time.monotonic() - start < 1.0
+
+
+def test_non_json_body_returns_fallback_response(monkeypatch):
+    class HtmlResponse(FakeResponse):
+        content = b"<html>502 Bad Gateway</html>"
+
+    monkeypatch.setattr(groq.requests, "post", lambda *args, **kwargs: HtmlResponse(200))
+    client = groq.GroqProxyRestAPI(api_key="test", rate_limiter=RateLimiter(requests_per_minute=6000))
+
+    assert client.generate_response("What is the currency?", ["context"]) == groq.FALLBACK_RESPONSE
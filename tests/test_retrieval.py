@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from src.chunking_registry import get_strategy, list_strategies, register_strategy
+from src.local_index import LocalIndex
+from src.retrieval_eval import answer_key_terms, evaluate_retrieval, is_relevant, recall_at_k
+
+
+def test_local_index_returns_top_k_in_score_order():
+    index = LocalIndex(3)
+    index.add([1, 2], np.eye(3)[:2], ["alpha", "beta"])
+    index.add([3], [[0.6, 0.8, 0.0]], ["gamma"])
+    hits = index.search([0.0, 1.0, 0.0], k=2)[0]
+    assert [id_ for id_, _ in hits] == [2, 3]
+    assert hits[0][1] == pytest.approx(1.0)
+    assert index.get([3, 99]) == [{"primary_key": 3, "text": "gamma"}]
+    assert len(index) == 3 and index.vectors.shape == (3, 3)
+
+
+def test_local_index_empty_and_mismatched_add():
+    index = LocalIndex(2)
+    assert index.search([[1.0, 0.0], [0.0, 1.0]]) == [[], []]
+    with pytest.raises(ValueError):
+        index.add([1, 2], [[1.0, 0.0]], ["a", "b"])
+
+
+def test_registry_has_builtin_strategies_and_rejects_duplicates():
+    assert {"day-paragraph", "line-window-3"} <= set(list_strategies())
+    text = "1st Day of Frostfall 1855 - Arrival\nline one\nline two\nline three"
+    assert get_strategy("line-window-3")(text) == ["1st Day of Frostfall 1855 - Arrival",
+                                                   "line one\nline two\nline three"]
+    with pytest.raises(ValueError):
+        register_strategy("day-paragraph")(lambda text: [text])
+    with pytest.raises(ValueError):
+        get_strategy("missing")
+
+
+def test_answer_key_terms_skip_question_terms():
+    terms = answer_key_terms("What is the currency of Veridia called?",
+                             "The currency of Veridia is the Veridian Crown.")
+    assert terms == ["Veridian", "Crown"]
+    assert answer_key_terms("When did she leave?", "she left in the early morning") == ["early", "morning"]
+
+
+def test_recall_at_k():
+    qa_pairs = [
+        {"question": "What is the currency of Veridia?", "expected_answer": "The Veridian Crown."},
+        {"question": "Who rules Veridia?", "expected_answer": "Queen Isolde."},
+    ]
+    retrieved = [["Prices are in veridian crowns.", "other"], ["nothing", "Queen Isolde reigns."]]
+    assert is_relevant("the VERIDIAN crown", ["Veridian", "Crown"])
+    assert recall_at_k(retrieved, qa_pairs, k=1) == 0.5
+    assert recall_at_k(retrieved, qa_pairs, k=2) == 1.0
+
+
+def test_evaluate_retrieval_ranks_and_summary():
+    index = LocalIndex(3)
+    index.add([1, 2, 3], np.eye(3), ["The Veridian Crown is the currency.", "Queen Isolde reigns.", "Rain."])
+    qa_pairs = [
+        {"question": "What is the currency of Veridia?", "expected_answer": "The Veridian Crown."},
+        {"question": "Who rules Veridia?", "expected_answer": "Queen Isolde."},
+        {"question": "What about the weather?", "expected_answer": "It rained on Tuesday."},
+        {"question": "Is it far?", "expected_answer": "yes"},  # sem termos-chave: fora das métricas
+    ]
+    vectors = [[1.0, 0.1, 0.0], [0.9, 0.5, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, 1.0]]
+    result = evaluate_retrieval(index, vectors, qa_pairs, k=2)
+    assert [question["rank"] for question in result["questions"]] == [1, 2, None, None]
+    assert result["questions"][0]["ids"][0] == 1 and len(result["questions"][0]["scores"]) == 2
+    assert result["summary"] == {"questions": 4, "evaluated": 3, "recall@1": pytest.approx(1 / 3),
+                                 "recall@2": pytest.approx(2 / 3), "mrr": pytest.approx(0.5)}
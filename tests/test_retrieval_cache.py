@@ -0,0 +1,84 @@
+import numpy as np
+
+from src.retrieval_cache import ENTRY_OVERHEAD, RetrievalCache
+
+
+def unit_vector(seed, dim=16):
+    vector = np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_key_absorbs_float_noise_but_not_k_or_filter():
+    cache = RetrievalCache()
+    vector = unit_vector(0)
+    key = cache.key(vector, 3)
+    assert cache.key(vector + 1e-6, 3) == key
+    assert cache.key(vector.tolist(), 3) == key
+    assert cache.key(vector, 4) != key
+    assert cache.key(vector, 3, "source == 'diary'") != key
+    assert cache.key(unit_vector(1), 3) != key
+
+    cache.put(key, ["chunk"], ["7"], cache.generation)
+    assert cache.get(cache.key(vector + 1e-6, 3)).source_ids == ["7"]
+    assert cache.get(cache.key(vector, 4)) is None
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+
+def test_lru_eviction_by_bytes():
+    entry_size = ENTRY_OVERHEAD + (100 + 64) + (1 + 64)
+    cache = RetrievalCache(max_bytes=3 * entry_size)
+    keys = [cache.key(unit_vector(i), 1) for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        cache.put(key, ["x" * 100], [str(i)], 0)
+    assert cache.bytes == 3 * entry_size
+    cache.get(keys[0])  # o 0 passa a ser o mais recente; o 1 é o LRU
+    cache.put(keys[3], ["x" * 100], ["3"], 0)
+    assert cache.get(keys[1]) is None
+    assert [cache.get(key).source_ids for key in (keys[0], keys[2], keys[3])] == [["0"], ["2"], ["3"]]
+    assert cache.get_stats()["evictions"] == 1 and cache.bytes == 3 * entry_size
+
+    cache.put(cache.key(unit_vector(9), 1), ["x" * (4 * entry_size)], ["big"], 0)  # maior que o cache
+    assert cache.get_stats()["entries"] == 3
+
+
+def test_generation_bump_invalidates_and_rejects_in_flight_results():
+    cache = RetrievalCache()
+    key = cache.key(unit_vector(0), 1)
+    cache.put(key, ["old"], ["1"], cache.generation)
+
+    generation = cache.generation  # consulta começa...
+    cache.bump()                   # ...a ingestão muda o índice...
+    assert cache.get(key) is None and cache.bytes == 0
+    cache.put(key, ["read during ingestion"], ["1"], generation)  # ...e o resultado lido antes é recusado
+    assert cache.get(key) is None and cache.get_stats()["stale"] == 1
+
+    cache.put(key, ["new"], ["2"], cache.generation)
+    assert cache.get(key).context == ["new"]
+
+
+def test_ttl_expiry(monkeypatch):
+    import src.retrieval_cache as module
+
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    cache = RetrievalCache(ttl=10)
+    key = cache.key(unit_vector(0), 1)
+    cache.put(key, ["a"], ["1"], 0)
+    now[0] += 9
+    assert cache.get(key) is not None
+    now[0] += 2
+    assert cache.get(key) is None and cache.get_stats()["expired"] == 1 and cache.bytes == 0
+
+
+def test_chunk_texts_share_budget_and_generation():
+    cache = RetrievalCache()
+    generation = cache.generation
+    cache.put_chunks({"1": "alpha", "2": "beta"}, generation)
+    assert cache.get_chunks(["1", "2", "3"]) == {"1": "alpha", "2": "beta"}
+    assert cache.get_stats()["chunk_hits"] == 2 and cache.get_stats()["chunk_misses"] == 1
+    assert cache.get(cache.key(unit_vector(0), 1)) is None  # namespaces separados
+
+    cache.bump()
+    assert cache.get_chunks(["1"]) == {}
+    cache.put_chunks({"1": "stale"}, generation)
+    assert cache.get_chunks(["1"]) == {} and cache.bytes == 0
@@ -0,0 +1,183 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.local_index import LocalIndex
+from src.sharding import (HashRouter, LocalShard, MetadataRouter, RemoteShard, ShardedRetriever, ShardHit,
+                          parse_shards)
+
+
+def unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def sharded(vectors, n_shards, **kwargs):
+    retriever = ShardedRetriever({f"s{i}": LocalShard(LocalIndex(vectors.shape[1])) for i in range(n_shards)},
+                                 **kwargs)
+    entities = [{"id": i, "vector": vector, "text": f"chunk {i}"} for i, vector in enumerate(vectors)]
+    return retriever, retriever.insert(entities)
+
+
+class SlowShard:
+    def __init__(self, delay, hits=(), fail=False):
+        self.delay, self.hits, self.fail = delay, list(hits), fail
+
+    def search(self, vector, k):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("shard down")
+        return self.hits[:k]
+
+    def get(self, ids):
+        return [{"id": id_, "text": f"slow {id_}"} for id_ in ids]
+
+
+class FakeZilliz:
+    def __init__(self, vectors):
+        self.index = LocalIndex(vectors.shape[1])
+        self.index.add(list(range(len(vectors))), vectors, [f"remote {i}" for i in range(len(vectors))])
+
+    def get_primary_field(self, collection_name):
+        return "id"
+
+    def search_vectors(self, collection_name, vector, limit=1, output_fields=None):
+        hits = self.index.search(np.asarray(vector), limit)[0]
+        return {"code": 0, "data": [{"id": id_, "distance": score} for id_, score in hits]}
+
+    def get_entities_by_ids(self, collection_name, ids):
+        return {"code": 0, "data": [{"id": e["primary_key"], "text": e["text"]}
+                                    for e in self.index.get([int(i) for i in ids])]}
+
+
+def test_fan_out_merge_matches_single_index():
+    vectors = unit_vectors(300)
+    retriever, counts = sharded(vectors, 4)
+    assert sum(counts.values()) == 300 and len(counts) == 4
+    single = LocalIndex(16)
+    single.add(list(range(300)), vectors, [""] * 300)
+
+    for query in unit_vectors(10, seed=1):
+        result = retriever.search(query, k=7)
+        assert result.degraded == []
+        assert [hit.id for hit in result.hits] == [id_ for id_, _ in single.search(query, 7)[0]]
+        scores = [hit.score for hit in result.hits]
+        assert scores == sorted(scores, reverse=True)
+
+    entities = retriever.fetch(result.hits)
+    assert [entity["id"] for entity in entities] == [hit.id for hit in result.hits]
+    assert entities[0]["text"] == f"chunk {entities[0]['id']}" and entities[0]["shard"] == result.hits[0].shard
+
+
+def test_slow_or_failing_shard_degrades_instead_of_failing():
+    vectors = unit_vectors(50)
+    fast = LocalShard(LocalIndex(16))
+    fast.insert([{"id": i, "vector": v, "text": str(i)} for i, v in enumerate(vectors)])
+    retriever = ShardedRetriever({"fast": fast, "slow": SlowShard(1.0, [(999, 2.0)]),
+                                  "down": SlowShard(0.0, fail=True)}, timeout=0.1)
+    start = time.perf_counter()
+    result = retriever.search(vectors[3], k=3)
+    assert time.perf_counter() - start < 0.5
+    assert sorted(result.degraded) == ["down", "slow"]
+    assert result.hits[0] == ShardHit("fast", 3, pytest.approx(1.0, abs=1e-5))
+    stats = retriever.get_stats()
+    assert stats["slow"]["timeouts"] == 1 and stats["down"]["errors"] == 1
+
+    # Quando o shard lento responde a tempo, o melhor hit dele entra no merge
+    retriever.timeout = 2.0
+    assert retriever.search(vectors[3], k=3).hits[0] == ShardHit("slow", 999, 2.0)
+
+
+def test_no_timeout_waits_for_every_shard():
+    retriever = ShardedRetriever({"main": SlowShard(0.3, [(7, 0.9)]), "down": SlowShard(0.0, fail=True)},
+                                 timeout=None)
+    result = retriever.search(np.zeros(16, dtype=np.float32), k=1)
+    assert result.hits == [ShardHit("main", 7, 0.9)] and result.degraded == ["down"]
+    assert retriever.fetch(result.hits)[0]["text"] == "slow 7"
+
+
+def test_routers():
+    names = ["a", "b", "c"]
+    router = HashRouter()
+    assert router.route({"id": 42}, names) == router.route({"id": "42"}, names)  # estável e por valor
+    assert len({router.route({"id": i}, names) for i in range(100)}) == 3
+
+    router = MetadataRouter("source", default="c", mapping={"diary-2": "b"})
+    assert router.route({"id": 1, "source": "a"}, names) == "a"
+    assert router.route({"id": 1, "source": "diary-2"}, names) == "b"
+    assert router.route({"id": 1, "source": "other"}, names) == "c"
+    assert MetadataRouter("source").route({"id": 1}, names) == HashRouter().route({"id": 1}, names)
+
+
+class PrimaryKeyZilliz(FakeZilliz):
+    """Como uma coleção do prepare_data.py: a chave vem só em `primary_key`, nunca em `id`."""
+
+    def __init__(self, vectors):
+        super().__init__(vectors)
+        self.describes = 0
+
+    def get_primary_field(self, collection_name):
+        self.describes += 1
+        return "primary_key"
+
+    def search_vectors(self, collection_name, vector, limit=1, output_fields=None):
+        hits = self.index.search(np.asarray(vector), limit)[0]
+        return {"code": 0, "data": [{"primary_key": id_, "distance": score} for id_, score in hits]}
+
+    def get_entities_by_ids(self, collection_name, ids):
+        return {"code": 0, "data": [{"primary_key": e["primary_key"], "text": e["text"]}
+                                    for e in self.index.get([int(i) for i in ids])]}
+
+
+def test_remote_shard_reads_the_primary_key_from_the_schema():
+    vectors = unit_vectors(20)
+    client = PrimaryKeyZilliz(vectors)
+    retriever = ShardedRetriever({"main": RemoteShard(client, "dr_voss")}, timeout=None)
+    result = retriever.search(vectors[5], k=2)
+    assert result.hits[0] == ShardHit("main", 5, pytest.approx(1.0, abs=1e-5))
+    assert retriever.fetch(result.hits)[0] == {"id": 5, "text": "remote 5", "shard": "main"}
+    assert client.describes == 1  # lido uma vez e guardado
+
+
+def test_remote_shard_rescores_with_the_full_vector_returned_by_search():
+    from src.dim_reduction import FULL_VECTOR_FIELD, PCAProjection
+
+    vectors = unit_vectors(200, dim=32)
+    pca = PCAProjection(2).fit(vectors)
+    reduced = pca.transform(vectors)
+    client = PrimaryKeyZilliz(reduced)
+    requested = []
+
+    def search_vectors(collection_name, vector, limit=1, output_fields=None):
+        requested.append(output_fields)
+        hits = client.index.search(np.asarray(vector), limit)[0]
+        return {"code": 0, "data": [{"primary_key": id_, "distance": score, FULL_VECTOR_FIELD: vectors[id_].tolist()}
+                                    for id_, score in hits]}
+
+    client.search_vectors = search_vectors
+    query = vectors[7]
+    retriever = ShardedRetriever({"main": RemoteShard(client, "dr_voss")}, timeout=None)
+    result = retriever.search(pca.transform(query)[0], k=3, full=query, candidates=200)
+    assert [hit.id for hit in result.hits] == list(np.argsort(-(vectors @ query))[:3])
+    assert requested == [[FULL_VECTOR_FIELD]]
+    retriever.search(pca.transform(query)[0], k=3)
+    assert requested[-1] is None  # sem rescoring o vetor cheio não trafega
+
+
+def test_remote_shard_and_spec(tmp_path):
+    vectors = unit_vectors(20)
+    remote = RemoteShard(FakeZilliz(vectors), "dr_voss")
+    retriever = ShardedRetriever({"remote": remote})
+    result = retriever.search(vectors[5], k=2)
+    assert result.hits[0].id == 5
+    assert retriever.fetch(result.hits)[0]["text"] == "remote 5"
+
+    shards = parse_shards("voss=zilliz:dr_voss, zilliz:archive", client=PrimaryKeyZilliz(vectors))
+    assert list(shards) == ["voss", "archive"] and shards["archive"].collection_name == "archive"
+    assert shards["voss"].primary_field == "primary_key"  # do schema, sem configuração
+    for spec in ("voss=zilliz:", "x=s3:bucket", "a=zilliz:x,a=zilliz:y"):
+        with pytest.raises(ValueError):
+            parse_shards(spec, client=FakeZilliz(vectors))
+    with pytest.raises(ValueError):
+        parse_shards("zilliz:dr_voss")  # sem client
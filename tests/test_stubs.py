@@ -0,0 +1,160 @@
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+import requests
+import uvicorn
+from fastapi.testclient import TestClient
+
+from scripts.milvus_db import ZillizClient
+from src.groq_proxy import FALLBACK_RESPONSE, GroqProxyRestAPI
+from src.rate_limiter import RateLimiter
+from src.stubs import FaultInjector, GroqStub, LatencyDistribution, ZillizStub, create_groq_app, create_zilliz_app
+from src.stubs.zilliz import StubError, compile_filter
+
+
+def unit_vectors(n, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def zilliz_stub():
+    stub = ZillizStub()
+    stub.load_texts("diary", [f"chunk {i}" for i in range(1, 21)], unit_vectors(20))
+    return stub
+
+
+def serve_in_thread(app):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "stub server did not start"
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def live_stubs(zilliz_stub):
+    zilliz_faults, groq_faults = FaultInjector(seed=1), FaultInjector(seed=1)
+    zilliz = serve_in_thread(create_zilliz_app(zilliz_stub, zilliz_faults))
+    groq = serve_in_thread(create_groq_app(GroqStub(), groq_faults))
+    yield {"zilliz_url": zilliz[2] + "/v2", "groq_url": groq[2] + "/openai/v1",
+           "zilliz_faults": zilliz_faults, "groq_faults": groq_faults}
+    for server, thread, _ in (zilliz, groq):
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def test_latency_specs():
+    assert LatencyDistribution("fixed:20").sample() == pytest.approx(0.02)
+    assert 0.005 <= LatencyDistribution("uniform:5:10").sample() <= 0.010
+    assert LatencyDistribution("lognormal:30:0.5").sample() > 0
+    assert LatencyDistribution("none").sample() == 0.0
+    for spec in ("fixed", "uniform:10:5", "lognormal:0:1", "gamma:1:2"):
+        with pytest.raises(ValueError):
+            LatencyDistribution(spec)
+
+
+def test_filter_subset_generated_by_the_client():
+    entity = {"id": 7, "day": "Day 3", "score": 0.5}
+    assert compile_filter("")(entity)
+    assert compile_filter('(day == "Day 3") and id > 5')(entity)
+    assert not compile_filter("id > 7")(entity)
+    assert compile_filter("id in [1, 7, 9] and score <= 0.5")(entity)
+    with pytest.raises(StubError):
+        compile_filter("id >")
+
+
+def test_zilliz_endpoints(zilliz_stub):
+    client = TestClient(create_zilliz_app(zilliz_stub))
+    vectors = unit_vectors(20)
+
+    def call(endpoint, **body):
+        response = client.post(f"/v2/vectordb/{endpoint}", json=body)
+        assert response.status_code == 200
+        return response.json()
+
+    assert call("collections/list")["data"] == ["diary"]
+    assert call("collections/describe", collectionName="diary")["data"]["rowCount"] == 20
+    assert call("collections/describe", collectionName="missing")["code"] != 0
+
+    hits = call("entities/search", collectionName="diary", data=[vectors[4].tolist()], limit=3)["data"]
+    assert len(hits) == 3 and hits[0]["id"] == 5 and hits[0]["distance"] == pytest.approx(1.0, abs=1e-5)
+    assert [e["text"] for e in call("entities/get", collectionName="diary", id=["5", "6"])["data"]] == \
+        ["chunk 5", "chunk 6"]
+    page = call("entities/query", collectionName="diary", filter="id > 15", outputFields=["text"], limit=3)["data"]
+    assert page == [{"id": 16, "text": "chunk 16"}, {"id": 17, "text": "chunk 17"}, {"id": 18, "text": "chunk 18"}]
+
+    assert call("entities/insert", collectionName="diary",
+                data=[{"id": 5, "vector": vectors[0].tolist(), "text": "updated"}])["data"]["insertCount"] == 1
+    hits = call("entities/search", collectionName="diary", data=[vectors[0].tolist()], limit=2,
+                outputFields=["text"])["data"]
+    assert {hit["id"] for hit in hits} == {1, 5} and len(zilliz_stub.collections["diary"]) == 20
+    assert call("entities/insert", collectionName="diary", data=[{"id": 99, "vector": [0.0]}])["code"] != 0
+
+
+def test_groq_streaming_and_usage():
+    client = TestClient(create_groq_app(GroqStub(tokens_per_second=1000)))
+    messages = [{"role": "system", "content": "You are a research assistant. Use the following context to "
+                                              "answer the question: ['Day 4. The storm came early. Then rain.']"},
+                {"role": "user", "content": "User query: when did the storm come?"}]
+    body = client.post("/openai/v1/chat/completions", json={"model": "m", "messages": messages}).json()
+    assert body["choices"][0]["message"]["content"] == "Day 4."
+    assert body["usage"]["completion_tokens"] == 2
+
+    with client.stream("POST", "/openai/v1/chat/completions",
+                       json={"model": "m", "messages": messages, "stream": True}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [line[len("data: "):] for line in response.iter_lines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks) == "Day 4."
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop" and chunks[-1]["x_groq"]["usage"]["total_tokens"] > 2
+
+
+def test_fault_injection_can_change_at_runtime():
+    faults = FaultInjector(seed=0)
+    client = TestClient(create_groq_app(faults=faults))
+    assert client.get("/openai/v1/models").status_code == 200
+    assert client.post("/_stub/faults", json={"throttle_rate": 1.0, "retry_after": 0.5}).status_code == 200
+    response = client.get("/openai/v1/models")
+    assert response.status_code == 429 and response.headers["retry-after"] == "0.5"
+    client.post("/_stub/faults", json={"throttle_rate": 0, "error_rate": 1.0, "error_status": 500})
+    assert client.get("/openai/v1/models").status_code == 500
+    assert client.post("/_stub/faults", json={"bogus": 1}).status_code == 400
+    assert client.get("/_stub/stats").json()["stats"] == {"requests": 3, "errors": 1, "throttled": 1,
+                                                         "delay_seconds": 0.0}
+
+
+def test_real_clients_against_live_stubs(live_stubs):
+    zilliz = ZillizClient(api_key="stub", cluster_id=None, base_url=live_stubs["zilliz_url"], backoff_base=0.0,
+                          hedge=False)
+    vector = unit_vectors(20)[11].tolist()
+    hits = zilliz.search_vectors("diary", vector)["data"]
+    assert hits[0]["id"] == 12
+    assert zilliz.get_entities_by_ids("diary", ["12"])["data"][0]["text"] == "chunk 12"
+    assert len(zilliz.get_all_entities("diary", batch_size=6)) == 20
+
+    # 5xx vira exceção do requests e passa pelos retries do cliente
+    live_stubs["zilliz_faults"].configure(error_rate=1.0)
+    with pytest.raises(requests.exceptions.HTTPError):
+        zilliz.search_vectors("diary", vector)
+    assert zilliz.get_metrics()["retries"] > 0
+
+    groq = GroqProxyRestAPI(api_key="stub", base_url=live_stubs["groq_url"],
+                            rate_limiter=RateLimiter(requests_per_minute=6000, tokens_per_minute=10**7,
+                                                     max_retries=3))
+    groq.ping()
+    assert groq.generate_response("q?", "Day 1. Fog.") == "Day 1."
+    live_stubs["groq_faults"].configure(throttle_rate=1.0, retry_after=0.01)
+    assert groq.generate_response("q?", "Day 1. Fog.") == FALLBACK_RESPONSE
+    assert live_stubs["groq_faults"].stats["throttled"] == 4
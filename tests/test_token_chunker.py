@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("tokenizers")
+
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+
+from src.token_chunker import TokenWindowChunker, padding_fraction
+
+DIARY = ("1st Day of Frostfall 1855 - Arrival\n"
+         + " ".join(f"Sentence number {i} about Veridia." for i in range(40)) + "\n\n"
+         + "2nd Day of Frostfall 1855 - Rest\nA short day.")
+
+
+def word_tokenizer(text):
+    words = set(text.replace(".", " . ").replace("-", " - ").split())
+    vocab = {"[UNK]": 0, "[CLS]": 1, "[SEP]": 2}
+    vocab.update({word: i + 3 for i, word in enumerate(sorted(words))})
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 1), ("[SEP]", 2)])
+    return tokenizer
+
+
+def test_chunks_fit_model_window_and_keep_days_apart():
+    tokenizer = word_tokenizer(DIARY)
+    chunks, counts = TokenWindowChunker(tokenizer, max_tokens=64, overlap_tokens=8).chunk_with_token_counts(DIARY)
+    assert all(len(tokenizer.encode(chunk).ids) <= 64 for chunk in chunks)
+    assert [len(tokenizer.encode(chunk, add_special_tokens=False).ids) for chunk in chunks] == counts
+    assert chunks[0].startswith("1st Day of Frostfall")
+    assert chunks[-1] == "2nd Day of Frostfall 1855 - Rest\nA short day."
+    assert not any("Rest" in chunk for chunk in chunks[:-1])
+
+
+def test_windows_overlap_snap_to_sentences_and_are_balanced():
+    tokenizer = word_tokenizer(DIARY)
+    chunks, counts = TokenWindowChunker(tokenizer, max_tokens=64, overlap_tokens=8).chunk_with_token_counts(DIARY)
+    day_chunks, day_counts = chunks[:-1], counts[:-1]
+    assert len(day_chunks) > 2
+    for previous, chunk in zip(day_chunks, day_chunks[1:]):
+        assert chunk.startswith("Sentence number")
+        assert previous.endswith(".")
+        assert chunk.split(".")[0] in previous  # a primeira frase repete o fim do chunk anterior
+    assert max(day_counts) - min(day_counts) < 62 // 2
+
+
+def test_overlap_must_be_smaller_than_half_window():
+    with pytest.raises(ValueError):
+        TokenWindowChunker(word_tokenizer(DIARY), max_tokens=64, overlap_tokens=40)
+
+
+def test_padding_fraction():
+    assert padding_fraction([10, 10, 10, 10], batch_size=2) == 0.0
+    assert padding_fraction([10, 30, 10, 30], batch_size=2) == pytest.approx(1 - 80 / 120)
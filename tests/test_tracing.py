@@ -0,0 +1,110 @@
+import json
+
+import requests
+
+from scripts.milvus_db import ZillizClient
+from src import tracing
+from src.tracing import FileSpanExporter, Tracer, inject_headers, parse_traceparent, span
+
+
+class FakeResponse:
+    status_code = 200
+    content = b'{"code": 0, "data": [{"id": 1}]}'
+
+    def raise_for_status(self):
+        pass
+
+
+def read_spans(path):
+    spans = []
+    with open(path) as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    spans.extend(scope["spans"])
+    return {s["name"]: s for s in spans}
+
+
+def test_sampled_trace_exports_parent_and_children(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=1.0, exporter=FileSpanExporter(str(path)))
+    with tracer.start_trace("POST /query", **{"http.route": "/query"}) as root:
+        with span("embedding.encode", texts=1) as child:
+            child.add("attempts")
+            child.add("attempts")
+    tracer.flush()
+
+    spans = read_spans(path)
+    assert spans["embedding.encode"]["parentSpanId"] == spans["POST /query"]["spanId"] == root.span_id
+    assert spans["embedding.encode"]["traceId"] == root.trace_id
+    assert {"key": "attempts", "value": {"intValue": "2"}} in spans["embedding.encode"]["attributes"]
+    assert tracer.stats["traces"] == 1 and tracer.stats["spans"] == 2
+
+
+def test_unsampled_trace_records_nothing(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=0.0, exporter=FileSpanExporter(str(path)))
+    with tracer.start_trace("POST /query") as root:
+        with span("child") as child:
+            assert not child.recording
+        assert inject_headers({"a": "b"}) == {"a": "b"}
+    tracer.flush()
+    assert not root.recording and not path.exists()
+
+
+def test_incoming_traceparent_is_continued_and_errors_are_recorded(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=0.0, exporter=FileSpanExporter(str(path)))
+    incoming = "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+    try:
+        with tracer.start_trace("POST /query", incoming):
+            with span("child"):
+                raise ValueError("boom")
+    except ValueError:
+        pass
+    tracer.flush()
+    spans = read_spans(path)
+    assert spans["POST /query"]["traceId"] == "ab" * 16
+    assert spans["POST /query"]["parentSpanId"] == "cd" * 8
+    assert spans["POST /query"]["kind"] == 2 and spans["child"]["kind"] == 1  # SERVER mesmo com pai remoto
+    assert spans["child"]["status"] == {"code": 2, "message": "ValueError: boom"}
+    assert parse_traceparent("garbage") is None
+
+
+def test_zilliz_calls_get_spans_with_sizes_and_propagate_context(tmp_path, monkeypatch):
+    sent_headers = []
+
+    def fake_request(headers=None, **kwargs):
+        sent_headers.append(headers)
+        return FakeResponse()
+
+    monkeypatch.setattr(requests, "request", fake_request)
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=1.0, exporter=FileSpanExporter(str(path)))
+    client = ZillizClient(api_key="test", cluster_id=None, base_url="http://zilliz.test/v2", hedge=False)
+    with tracer.start_trace("POST /query") as root:
+        client.search_vectors("dr_voss", [0.1] * 4)
+    tracer.flush()
+
+    search = read_spans(path)["zilliz vectordb/entities/search"]
+    attributes = {a["key"]: a["value"] for a in search["attributes"]}
+    assert attributes["zilliz.attempts"] == {"intValue": "1"}
+    assert int(attributes["http.response.bytes"]["intValue"]) == len(FakeResponse.content)
+    assert sent_headers[0]["traceparent"] == f"00-{root.trace_id}-{search['spanId']}-01"
+    assert search["kind"] == 3  # CLIENT
+    assert tracing.current_span() is tracing.NON_RECORDING_SPAN
+
+
+def test_file_exporter_rotates_past_max_bytes(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(str(path), max_bytes=25)
+    for payload in (b"a" * 10, b"b" * 10, b"c" * 10):
+        exporter.export(payload)
+    assert path.read_bytes() == b"c" * 10 + b"\n"
+    assert (tmp_path / "traces.jsonl.1").read_bytes() == b"a" * 10 + b"\n" + b"b" * 10 + b"\n"
+
+
+def test_tracing_is_off_unless_an_exporter_is_configured(monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORTER", raising=False)
+    tracer = Tracer.from_env()
+    assert tracer.exporter is None and tracer.sample_rate == 0.0